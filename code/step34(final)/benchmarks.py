@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from test_depth import DepthProcessor, process_depth_sections, display_depth_sections
+from test_detect import YOLODetector, compute_tile_layout, merge_tile_detections
+from test_hand import HandDetection
+from tts import TextToSpeech, FlagMonitor
+from stub_stages import StubTensor
+
+# 실제 파이프라인 해상도
+FRAME_SIZE = (720, 1280)  # 웹캠 프레임 (height, width)
+DEPTH_SIZE = (256, 256)  # MiDaS_small 출력
+
+
+def make_inputs(seed=0):
+    """고정 시드 합성 입력 (매 실행 동일)"""
+    rng = np.random.default_rng(seed)
+    depth_result = rng.random((1, *DEPTH_SIZE), dtype=np.float32) * 500
+    # 왼쪽 아래에 가까운 장애물이 있는 정규화 뎁스 맵
+    depth_map = rng.random(DEPTH_SIZE, dtype=np.float32) * 0.5
+    depth_map[128:, :96] = 0.95
+    depth_image = rng.integers(0, 256, (*DEPTH_SIZE, 3), dtype=np.uint8)
+
+    hand = rng.random((21, 3), dtype=np.float32)
+    hand_proto = SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in hand])
+    hands = rng.random((2, 21, 3), dtype=np.float32)
+
+    n = 20  # 프레임당 감지 수
+    xy = rng.random((n, 2), dtype=np.float32) * [1000, 500]
+    boxes = np.hstack([xy, xy + rng.random((n, 2), dtype=np.float32) * 200 + 20])
+    yolo_result = SimpleNamespace(boxes=SimpleNamespace(
+        xyxy=StubTensor(boxes),
+        cls=StubTensor(rng.integers(0, 5, n).astype(np.float32)),
+        conf=StubTensor(rng.random(n, dtype=np.float32)),
+    ))
+    layout = compute_tile_layout(FRAME_SIZE[1], FRAME_SIZE[0])
+    tile_boxes = [boxes[i::len(layout)] * 0.3 for i in range(len(layout))]
+    tile_classes = [np.arange(len(b)) % 5 for b in tile_boxes]
+    tile_scores = [rng.random(len(b), dtype=np.float32) for b in tile_boxes]
+
+    return SimpleNamespace(
+        depth_result=depth_result, depth_map=depth_map, depth_image=depth_image,
+        hand_proto=hand_proto, hands=hands, yolo_result=yolo_result,
+        tiles=(tile_boxes, tile_classes, tile_scores, layout),
+    )
+
+
+def build_cases(inputs):
+    """벤치마크 이름 -> 인자 없는 호출 함수"""
+    processor = DepthProcessor(backend=None)  # 후처리만 측정 (모델 불필요)
+    hand_detection = HandDetection()
+    tts = TextToSpeech(speak_aloud=False)
+    devnull = open(os.devnull, "w")
+    flag_monitor = FlagMonitor(tts, redirect_stdout=False)
+    flag_monitor.original_stdout = devnull  # 터미널 출력 없이 파싱만 측정
+
+    messages = [f"cider catch {i}" for i in range(8)]
+    counter = iter(range(10 ** 12))
+
+    def speak_new():
+        tts.queue.queue.clear()  # 소비된 큐: 중복 검사 후 추가 경로
+        tts.speak(messages[next(counter) % len(messages)])
+
+    duplicate_tts = TextToSpeech(speak_aloud=False)
+    for message in messages:
+        duplicate_tts.speak(message)
+
+    def speak_duplicate():
+        duplicate_tts.speak(messages[next(counter) % len(messages)])  # 8개가 찬 큐: 중복으로 추가하지 않는 경로
+
+    lines = [
+        "[2024-01-01 12:00:00] Detected: cider (0.91)\n",
+        "catch flag - hold\n",
+        "class detect flag - 5s\n",
+        "Depth duty: 50% (10 inferred / 20 frames)\n",
+    ]
+
+    def write():
+        flag_monitor.write(lines[next(counter) % len(lines)])
+
+    return {
+        'process_depth_sections/full': lambda: process_depth_sections(inputs.depth_map, tie_break="Avoid to Left"),
+        'process_depth_sections/corridor': lambda: process_depth_sections(
+            inputs.depth_map, region='corridor', tie_break="Avoid to Left"),
+        'display_depth_sections': lambda: display_depth_sections(inputs.depth_image, inputs.depth_map),
+        'convert_result_to_image': lambda: processor.convert_result_to_image(inputs.depth_result),
+        'normalize_minmax': lambda: processor.normalize_minmax(inputs.depth_result),
+        'hand.detect_catch': lambda: hand_detection.detect_catch(inputs.hand_proto),
+        'hand.detect_catches/2': lambda: hand_detection.detect_catches(inputs.hands),
+        'yolo.result_arrays': lambda: YOLODetector._result_arrays(inputs.yolo_result),
+        'yolo.merge_tile_detections': lambda: merge_tile_detections(*inputs.tiles),
+        'tts.speak/new': speak_new,
+        'tts.speak/duplicate': speak_duplicate,
+        'flag_monitor.write': write,
+    }
+
+
+def run_case(fn, min_time=0.5, warmup=3):
+    """min_time초 이상 반복해 초당 실행 횟수와, tracemalloc으로 한 번 실행의 할당량을 측정합니다."""
+    for _ in range(warmup):
+        fn()
+
+    # 처리량: 반복 횟수를 늘려가며 min_time 이상 측정 (tracemalloc 없이)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+
+    # 할당: 한 번 실행 중 최대 추가 메모리와 할당 블록 수
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'lineno'))
+
+    return {
+        'ops_per_sec': loops / elapsed,
+        'mean_us': elapsed / loops * 1e6,
+        'alloc_peak_kb': (peak - base) / 1024,
+        'alloc_blocks': blocks,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, previous=None):
+    print(f"{'benchmark':<34} {'ops/s':>12} {'mean us':>10} {'peak KB':>9} {'blocks':>7}"
+          + (f" {'vs prev':>8}" if previous else ""))
+    for name, r in results.items():
+        line = (f"{name:<34} {r['ops_per_sec']:12.0f} {r['mean_us']:10.1f} "
+                f"{r['alloc_peak_kb']:9.1f} {r['alloc_blocks']:7d}")
+        if previous and name in previous:
+            line += f" {(r['ops_per_sec'] / previous[name]['ops_per_sec'] - 1) * 100:+7.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="파이프라인 핫 패스 마이크로벤치마크")
+    parser.add_argument("--filter", default="", help="이름에 이 문자열이 포함된 벤치마크만 실행")
+    parser.add_argument("--min-time", type=float, default=0.5, help="벤치마크당 최소 측정 시간 (초)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: benchmarks/<커밋>.json)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    cases = build_cases(make_inputs())
+    results = {}
+    for name, fn in cases.items():
+        if args.filter in name:
+            results[name] = run_case(fn, args.min_time)
+
+    previous = None
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))['results']
+    print_results(results, previous)
+
+    commit = git_commit()
+    output = Path(args.output or f"benchmarks/{commit or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'commit': commit,
+        'machine': f"{platform.node()} {platform.machine()} {platform.processor()} ({os.cpu_count()} cpu)",
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'results': results,
+    }, indent=2), encoding="utf-8")
+    print(f"Results saved at: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class GateRule:
+    """단계 실행 규칙
+
+    wake_on의 신호 중 하나라도 살아 있으면 active_interval 간격으로 실행하고,
+    아니면 idle_interval 간격으로 실행합니다. (idle_interval이 None이면 실행하지 않음)
+    """
+
+    def __init__(self, wake_on=(), active_interval=0.0, idle_interval=0.0):
+        self.wake_on = tuple(wake_on)
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+
+
+# 기본 규칙: 뎁스는 안전을 위해 항상, YOLO는 손이 보일 때만 최대 속도 (그 외 2Hz),
+# 손 추적은 YOLO 감지가 살아 있을 때만 실행
+DEFAULT_RULES = {
+    'depth': GateRule(),
+    'yolo': GateRule(wake_on=('hand',), idle_interval=0.5),
+    'hand': GateRule(wake_on=('object',), idle_interval=None),
+}
+
+# 신호 유지 시간 (초)
+DEFAULT_SIGNAL_TTL = {
+    'object': 1.5,
+    'hand': 1.0,
+}
+
+
+class CascadeScheduler:
+    """값싼 단계의 결과 신호로 비싼 단계의 실행 여부를 결정하고 단계별 duty cycle을 집계합니다."""
+
+    def __init__(self, rules=None, signal_ttl=None, clock=time.monotonic):
+        self.clock = clock  # 리플레이 시 가상 시계
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.signal_ttl = dict(DEFAULT_SIGNAL_TTL if signal_ttl is None else signal_ttl)
+        self.signals = {}  # 신호 이름 -> 만료 시각
+
+        self.last_run = {stage: 0.0 for stage in self.rules}  # 마지막 실행 시작 시각
+        self.busy_time = {stage: 0.0 for stage in self.rules}  # 누적 작업 시간 (working 구간만)
+        self.run_count = {stage: 0 for stage in self.rules}
+        self.window_start = self.clock()
+
+    def signal(self, name, ttl=None):
+        """신호를 갱신합니다. (예: YOLO 감지 -> 'object', 손 감지 -> 'hand')"""
+        ttl = self.signal_ttl.get(name, 1.0) if ttl is None else ttl
+        self.signals[name] = self.clock() + ttl
+
+    def is_live(self, name, now=None):
+        now = self.clock() if now is None else now
+        return self.signals.get(name, 0.0) > now
+
+    def should_run(self, stage):
+        """이번 루프에서 단계를 실행할지 판단합니다."""
+        now = self.clock()
+        rule = self.rules.get(stage)
+        if rule is None:
+            return True
+
+        active = any(self.is_live(name, now) for name in rule.wake_on) if rule.wake_on else True
+        interval = rule.active_interval if active else rule.idle_interval
+        if interval is None or now - self.last_run[stage] < interval:
+            return False
+
+        self.last_run[stage] = now
+        self.run_count[stage] += 1
+        return True
+
+    @contextmanager
+    def working(self, stage):
+        """단계의 실제 작업 (추론/판단) 구간만 실행 시간으로 누적합니다.
+
+        화면 출력, 프레임 대기, 이벤트 루프에서 다른 단계가 실행된 시간은 포함하지 않습니다.
+        duty_cycles의 집계 구간과 같은 시계로 재야 비율이 맞습니다. (리플레이 시 가상 시계)
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.busy_time[stage] = self.busy_time.get(stage, 0.0) + self.clock() - start
+
+    def duty_cycles(self):
+        """집계 구간 동안의 단계별 (실행 시간 비율, 초당 실행 횟수)를 반환하고 집계를 초기화합니다."""
+        now = self.clock()
+        elapsed = max(now - self.window_start, 1e-6)
+        report = {
+            stage: (self.busy_time[stage] / elapsed, self.run_count[stage] / elapsed)
+            for stage in self.rules
+        }
+        self.busy_time = {stage: 0.0 for stage in self.rules}
+        self.run_count = {stage: 0 for stage in self.rules}
+        self.window_start = now
+        return report
+
+    async def report_loop(self, shared_data, interval=10):
+        """주기적으로 단계별 duty cycle을 출력합니다."""
+        while shared_data['running']:
+            await asyncio.sleep(interval)
+            summary = ", ".join(
+                f"{stage} {duty * 100:.0f}% ({rate:.1f}/s)"
+                for stage, (duty, rate) in self.duty_cycles().items()
+            )
+            print(f"Cascade duty: {summary}")
+
+
+def gate_allows(shared_data, stage):
+    """공유 데이터에 스케줄러가 있으면 실행 여부를 묻고, 없으면 항상 실행합니다."""
+    scheduler = shared_data.get('scheduler')
+    return scheduler is None or scheduler.should_run(stage)
+
+
+def stage_work(shared_data, stage):
+    """공유 데이터에 스케줄러가 있으면 단계 작업 시간을 재는 컨텍스트, 없으면 아무것도 하지 않는 컨텍스트"""
+    scheduler = shared_data.get('scheduler')
+    return nullcontext() if scheduler is None else scheduler.working(stage)
+
+
+def cascade_signal(shared_data, name):
+    """공유 데이터에 스케줄러가 있으면 신호를 갱신합니다."""
+    scheduler = shared_data.get('scheduler')
+    if scheduler is not None:
+        scheduler.signal(name)
@@ -0,0 +1,210 @@
+import argparse
+import resource
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MODEL_FOLDER = Path("model/midas")
+
+
+class OpenVINOBackend:
+    """OpenVINO IR 뎁스 모델 백엔드"""
+    name = "openvino"
+
+    def __init__(self, model_path, device="GPU", input_size=None, performance_hint=None):
+        import openvino as ov  # 선택 의존성 (ORT/cv2.dnn/stub만 쓰는 기기에는 없어도 됨)
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        if input_size is not None:
+            model.reshape({model.input(0): [1, 3, input_size, input_size]})
+        config = {} if performance_hint is None else {"PERFORMANCE_HINT": performance_hint}  # 오프라인: "THROUGHPUT"
+        self.compiled_model = core.compile_model(model=model, device_name=device, config=config)
+        self.input_key = self.compiled_model.input(0)
+        self.output_key = self.compiled_model.output(0)
+        self.input_shape = tuple(self.input_key.shape)  # (N, C, H, W)
+        self.infer_queue = None  # infer_batch에서 처음 사용할 때 생성
+
+    def infer(self, input_image):
+        return self.compiled_model([input_image])[self.output_key]
+
+    def infer_batch(self, input_batch):
+        """(N, C, H, W) 입력을 여러 추론 요청에 나눠 동시에 실행하고 순서대로 (N, H, W)를 반환합니다."""
+        if self.infer_queue is None:
+            import openvino as ov
+
+            self.infer_queue = ov.AsyncInferQueue(self.compiled_model)  # 장치 최적 요청 수
+            self.infer_queue.set_callback(self._on_done)
+        results = [None] * len(input_batch)
+        for i in range(len(input_batch)):
+            self.infer_queue.start_async({0: input_batch[i:i + 1]}, (results, i))
+        self.infer_queue.wait_all()
+        return np.concatenate(results)
+
+    @staticmethod
+    def _on_done(request, userdata):
+        results, i = userdata
+        results[i] = request.get_output_tensor(0).data.copy()  # 요청 버퍼는 재사용되므로 복사
+
+
+class OnnxRuntimeBackend:
+    """ONNX Runtime (CPU) 뎁스 모델 백엔드"""
+    name = "onnxruntime"
+
+    def __init__(self, model_path, input_size=None, mean=None, std=None, threads=None):
+        import onnxruntime as ort  # 선택 의존성
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # 동적 축이면 input_size (기본 256) 사용. 고정 크기 모델은 입력 크기를 바꿀 수 없으므로 다르면 오류
+        height, width = model_input.shape[2:4]
+        if not isinstance(height, int) or not isinstance(width, int):
+            height = width = input_size or 256
+        elif input_size is not None and (height, width) != (input_size, input_size):
+            raise ValueError(
+                f"고정 입력 크기 ({height}x{width}) ONNX 모델은 input_size={input_size}로 실행할 수 없습니다. "
+                "동적 축으로 내보낸 모델을 사용하세요."
+            )
+        self.input_shape = (1, 3, height, width)
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.mean = None if mean is None else np.asarray(mean, np.float32).reshape(1, 3, 1, 1)
+        self.std = None if std is None else np.asarray(std, np.float32).reshape(1, 3, 1, 1)
+
+    def infer(self, input_image):
+        input_image = input_image.astype(np.float32)
+        if self.mean is not None:
+            input_image = (input_image - self.mean) / self.std
+        result = self.session.run(None, {self.input_name: input_image})[0]
+        return result.reshape(result.shape[0], result.shape[-2], result.shape[-1])
+
+    def infer_batch(self, input_batch):
+        """배치 축이 동적인 모델이면 한 번에, 아니면 프레임별로 추론합니다."""
+        if self.dynamic_batch:
+            return self.infer(input_batch)
+        return np.concatenate([self.infer(input_batch[i:i + 1]) for i in range(len(input_batch))])
+
+
+class OpenCVDNNBackend:
+    """cv2.dnn 뎁스 모델 백엔드 (ONNX 모델)"""
+    name = "opencv"
+
+    def __init__(self, model_path, input_size=256, mean=None, std=None, target="cpu"):
+        self.net = cv2.dnn.readNet(str(model_path))
+        if target == "opencl":
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+        self.input_shape = (1, 3, input_size, input_size)
+        self.mean = None if mean is None else np.asarray(mean, np.float32).reshape(1, 3, 1, 1)
+        self.std = None if std is None else np.asarray(std, np.float32).reshape(1, 3, 1, 1)
+
+    def infer(self, input_image):
+        input_image = input_image.astype(np.float32)
+        if self.mean is not None:
+            input_image = (input_image - self.mean) / self.std
+        self.net.setInput(input_image)
+        result = self.net.forward()
+        return result.reshape(result.shape[0], result.shape[-2], result.shape[-1])
+
+    def infer_batch(self, input_batch):
+        return self.infer(input_batch)  # cv2.dnn은 N > 1 블롭을 그대로 처리
+
+
+DEPTH_BACKENDS = {
+    OpenVINOBackend.name: OpenVINOBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenCVDNNBackend.name: OpenCVDNNBackend,
+}  # stub_stages를 import하면 'stub' 백엔드가 추가됨
+
+# 백엔드별 기본 로컬 모델 파일
+DEFAULT_MODEL_FILES = {
+    "openvino": MODEL_FOLDER / "MiDaS_small.xml",
+    "onnxruntime": MODEL_FOLDER / "MiDaS_small.onnx",
+    "opencv": MODEL_FOLDER / "MiDaS_small.onnx",
+}
+
+
+def create_depth_backend(backend="openvino", model_path=None, **options):
+    """이름으로 뎁스 백엔드를 생성합니다. 모델은 로컬 파일에서 읽습니다."""
+    if backend not in DEPTH_BACKENDS:
+        raise ValueError(f"지원하지 않는 뎁스 백엔드입니다: {backend}")
+    if not getattr(DEPTH_BACKENDS[backend], 'requires_model_file', True):
+        return DEPTH_BACKENDS[backend](model_path, **options)
+    model_path = Path(model_path or DEFAULT_MODEL_FILES[backend])
+    if not model_path.exists():
+        raise FileNotFoundError(f"뎁스 모델 파일을 찾을 수 없습니다: {model_path}")
+    return DEPTH_BACKENDS[backend](model_path, **options)
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS (MB)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # 최대 RSS로 대체
+
+
+def benchmark_backend(backend, frame, iterations=50, warmup=5):
+    """한 백엔드의 전처리 포함 추론 지연 (ms) 통계와 처리량 (FPS)을 측정합니다."""
+    from test_depth import DepthProcessor
+
+    processor = DepthProcessor(backend)
+    for _ in range(warmup):
+        processor.process_frame(frame)
+
+    latencies = np.empty(iterations, dtype=np.float64)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        processor.process_frame(frame)
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - start
+
+    latencies *= 1000
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': iterations / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="뎁스 백엔드 비교 벤치마크")
+    parser.add_argument("--backends", nargs="+", default=list(DEPTH_BACKENDS), choices=list(DEPTH_BACKENDS))
+    parser.add_argument("--device", default="CPU", help="OpenVINO 장치 (CPU, GPU, ...)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+
+    print(f"{'backend':<12} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'FPS':>7} {'RSS MB':>8} {'+RSS MB':>8}")
+    for name in args.backends:
+        rss_before = current_rss_mb()
+        try:
+            options = {'device': args.device} if name == "openvino" else {}
+            backend = create_depth_backend(name, **options)
+            stats = benchmark_backend(backend, frame, args.iterations)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+        rss = current_rss_mb()
+        print(f"{name:<12} {stats['mean_ms']:8.1f} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} "
+              f"{stats['fps']:7.1f} {rss:8.0f} {rss - rss_before:8.0f}")
+        del backend
+
+
+if __name__ == "__main__":
+    main()
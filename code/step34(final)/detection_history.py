@@ -0,0 +1,92 @@
+import time
+import numpy as np
+
+
+class DetectionHistory:
+    """고정 크기 배열 기반 감지 이력 (링 버퍼)
+
+    frame_seq, 시간, 클래스, 신뢰도, 박스를 미리 할당한 배열에 O(1)로 기록하고,
+    최근 구간에 대한 질의는 배열 연산으로 한 번에 계산합니다.
+    """
+
+    def __init__(self, capacity=512, class_names=None):
+        self.capacity = capacity
+        self.class_names = class_names  # 클래스 ID -> 이름 (YOLO model.names)
+
+        # 미리 할당한 이력 배열
+        self.frame_seq = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.classes = np.zeros(capacity, dtype=np.int32)
+        self.confidences = np.zeros(capacity, dtype=np.float32)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+
+        self.head = 0  # 다음에 기록할 위치
+        self.count = 0  # 유효한 기록 수
+
+    def append(self, frame_seq, class_id, confidence, box, timestamp=None):
+        """감지 결과 하나를 기록합니다."""
+        i = self.head
+        self.frame_seq[i] = frame_seq
+        self.timestamps[i] = time.monotonic() if timestamp is None else timestamp
+        self.classes[i] = class_id
+        self.confidences[i] = confidence
+        self.boxes[i] = box
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, frame_seq, class_ids, confidences, boxes, timestamp=None):
+        """한 프레임의 감지 결과 여러 개를 한 번에 기록합니다."""
+        n = len(class_ids)
+        if n == 0:
+            return
+        if n > self.capacity:  # 용량보다 많으면 마지막 부분만 유지
+            class_ids, confidences, boxes = class_ids[-self.capacity:], confidences[-self.capacity:], boxes[-self.capacity:]
+            n = self.capacity
+
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.frame_seq[idx] = frame_seq
+        self.timestamps[idx] = time.monotonic() if timestamp is None else timestamp
+        self.classes[idx] = class_ids
+        self.confidences[idx] = confidences
+        self.boxes[idx] = boxes
+        self.head = int((self.head + n) % self.capacity)
+        self.count = min(self.count + n, self.capacity)
+
+    def clear(self):
+        """이력을 비웁니다."""
+        self.head = 0
+        self.count = 0
+
+    def window_mask(self, window_ms, now=None):
+        """최근 window_ms 이내 기록의 마스크를 반환합니다."""
+        now = time.monotonic() if now is None else now
+        mask = self.timestamps >= now - window_ms / 1000.0
+        if self.count < self.capacity:
+            mask[self.count:] = False
+        return mask
+
+    def class_scores(self, window_ms=1500, now=None):
+        """최근 구간의 클래스별 신뢰도 합을 계산합니다."""
+        mask = self.window_mask(window_ms, now)
+        if not mask.any():
+            return np.zeros(0, dtype=np.float64)
+        return np.bincount(self.classes[mask], weights=self.confidences[mask])
+
+    def dominant_class(self, window_ms=1500, now=None, min_score=0.0):
+        """최근 구간에서 신뢰도 가중 투표로 가장 우세한 클래스 ID를 반환합니다. (없으면 None)"""
+        scores = self.class_scores(window_ms, now)
+        if scores.size == 0:
+            return None
+        class_id = int(scores.argmax())
+        if scores[class_id] <= min_score:
+            return None
+        return class_id
+
+    def dominant_class_name(self, window_ms=1500, now=None, min_score=0.0):
+        """dominant_class의 결과를 클래스 이름으로 반환합니다."""
+        class_id = self.dominant_class(window_ms, now, min_score)
+        if class_id is None:
+            return None
+        if self.class_names is None:
+            return str(class_id)
+        return self.class_names[class_id]
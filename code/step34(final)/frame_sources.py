@@ -0,0 +1,194 @@
+import asyncio
+import re
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import metrics
+from session_recorder import record_output
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """WebcamProcessor와 같은 인터페이스의 프레임 소스 기반 클래스
+
+    하위 클래스는 next_frame()에서 (프레임, 원본 타임스탬프 초)를 반환하고, 끝나면 None을 반환합니다.
+    realtime이면 원본 타임스탬프 간격에 맞춰 공급하고, 아니면 가능한 한 빨리 공급합니다.
+    """
+
+    def __init__(self, realtime=True, motion_estimator=None):
+        self.realtime = realtime
+        self.motion_estimator = motion_estimator  # 장면 변화 추정기 (MotionEstimator)
+        self.current_frame = None
+        self.current_time = None  # 현재 프레임의 원본 타임스탬프 (초)
+        self.frame_seq = -1  # 공급한 프레임 번호
+
+    def next_frame(self):
+        raise NotImplementedError
+
+    def read_frame(self):
+        """다음 프레임을 읽어옵니다."""
+        item = self.next_frame()
+        if item is None:
+            raise ValueError("프레임 소스가 끝났습니다.")
+        self.current_frame, self.current_time = item
+        self.frame_seq += 1
+        return self.current_frame
+
+    async def async_frame_provider(self, shared_data):
+        """비동기적으로 프레임을 읽어 공유 메모리에 저장합니다. (프레임 번호, 원본 타임스탬프, 캡처 시각 포함)"""
+        clock_start = source_start = None
+        last_published = None
+        while shared_data['running']:
+            try:
+                frame = self.read_frame()
+            except ValueError as e:
+                print(e)
+                shared_data['running'] = False
+                break
+
+            if self.realtime:
+                if clock_start is None:
+                    clock_start, source_start = time.monotonic(), self.current_time
+                delay = (self.current_time - source_start) - (time.monotonic() - clock_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            published = time.perf_counter()
+            if last_published is not None:
+                metrics.observe('pipeline_capture_interval_seconds', published - last_published)
+            last_published = published
+            metrics.inc('pipeline_frames_total')
+
+            shared_data['frame'] = frame.copy()
+            shared_data['frame_seq'] = self.frame_seq
+            shared_data['frame_time'] = self.current_time
+            shared_data['frame_capture'] = published  # 공급 시각 (perf_counter, 종단 간 지연 추적 기준)
+            if shared_data.get('tracer') is not None:
+                shared_data['tracer'].capture((self.frame_seq, published))
+            record_output(shared_data, 'frame', self.current_time, frame)  # 원본 프레임 (단계들이 그리지 않는 쪽)
+            if self.motion_estimator is not None:
+                self.motion_estimator.publish(frame, shared_data)
+            await asyncio.sleep(0)  # 이벤트 루프 양보
+
+    def release(self):
+        """소스 자원을 해제합니다."""
+
+
+class VideoFileSource(FrameSource):
+    """녹화 영상 파일 프레임 소스 (타임스탬프: 영상 내 재생 위치)"""
+
+    def __init__(self, path, realtime=True, loop=False, motion_estimator=None):
+        super().__init__(realtime, motion_estimator)
+        self.cap = cv2.VideoCapture(str(path))
+        if not self.cap.isOpened():
+            raise ValueError(f"영상 파일을 열 수 없습니다: {path}")
+        self.loop = loop
+        self.time_offset = 0.0  # 반복 재생 시 타임스탬프가 단조 증가하도록 더하는 값
+
+    def next_frame(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frame_seq >= 0:
+            self.time_offset = self.current_time + 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            return None
+        return frame, self.time_offset + self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+    def release(self):
+        self.cap.release()
+
+
+def natural_key(path):
+    """'name_2.jpg'가 'name_10.jpg'보다 앞에 오도록 숫자를 값으로 비교하는 정렬 키"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", path.name)]
+
+
+class ImageDirectorySource(FrameSource):
+    """이미지 폴더 프레임 소스 (Pre_work/name_change.py 형식의 name_N.jpg 데이터셋 폴더 등)
+
+    이미지에는 촬영 시각이 없으므로 fps 간격의 타임스탬프를 붙입니다.
+    """
+
+    def __init__(self, directory, fps=30.0, realtime=True, loop=False, size=None, motion_estimator=None):
+        super().__init__(realtime, motion_estimator)
+        self.paths = sorted(
+            (p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS), key=natural_key
+        )
+        if not self.paths:
+            raise ValueError(f"이미지 파일이 없습니다: {directory}")
+        self.fps = fps
+        self.loop = loop
+        self.size = size  # (width, height), None이면 원본 크기
+        self.index = 0
+
+    def next_frame(self):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return None
+        frame = cv2.imread(str(self.paths[self.index % len(self.paths)]))
+        if frame is None:
+            raise ValueError(f"이미지를 읽을 수 없습니다: {self.paths[self.index % len(self.paths)]}")
+        if self.size is not None:
+            frame = cv2.resize(frame, self.size)
+        timestamp = self.index / self.fps
+        self.index += 1
+        return frame, timestamp
+
+
+class SyntheticSource(FrameSource):
+    """카메라 없이 파이프라인을 돌리기 위한 합성 프레임 소스
+
+    바닥 그라데이션 위로 좌우를 오가는 사각형 장애물을 그립니다. seed가 같으면 같은 영상을 만듭니다.
+    """
+
+    def __init__(self, frame_width=1280, frame_height=720, fps=30.0, num_frames=None, seed=0,
+                 realtime=True, motion_estimator=None):
+        super().__init__(realtime, motion_estimator)
+        self.size = (frame_width, frame_height)
+        self.fps = fps
+        self.num_frames = num_frames  # None이면 끝없이 생성
+        self.rng = np.random.default_rng(seed)
+        self.index = 0
+
+        ys = np.linspace(40, 200, frame_height, dtype=np.float32)[:, None, None]
+        self.background = np.broadcast_to(ys, (frame_height, frame_width, 3)).astype(np.uint8)
+        self.obstacles = [
+            (self.rng.uniform(0.1, 0.3), self.rng.uniform(0, 2 * np.pi), tuple(int(c) for c in self.rng.integers(0, 256, 3)))
+            for _ in range(3)
+        ]  # (진동 주파수 Hz, 위상, 색)
+
+    def next_frame(self):
+        if self.num_frames is not None and self.index >= self.num_frames:
+            return None
+        timestamp = self.index / self.fps
+        frame = self.background.copy()
+        w, h = self.size
+        for i, (freq, phase, color) in enumerate(self.obstacles):
+            cx = int(w * (0.5 + 0.4 * np.sin(2 * np.pi * freq * timestamp + phase)))
+            half = int(w * (0.05 + 0.03 * i))
+            top = int(h * (0.3 + 0.15 * i))
+            cv2.rectangle(frame, (cx - half, top), (cx + half, h - 1), color, -1)
+        noise = self.rng.integers(0, 8, frame.shape, dtype=np.uint8)  # 센서 노이즈
+        cv2.add(frame, noise, dst=frame)
+        self.index += 1
+        return frame, timestamp
+
+
+def create_frame_source(source="webcam", realtime=True, loop=False, motion_estimator=None, camera_id=0):
+    """'webcam', 'synthetic', 영상 파일 경로, 이미지 폴더 경로로 프레임 소스를 만듭니다."""
+    if source == "webcam":
+        from test_webcam import WebcamProcessor
+        return WebcamProcessor(camera_id=camera_id, motion_estimator=motion_estimator)
+    if source == "synthetic":
+        return SyntheticSource(realtime=realtime, motion_estimator=motion_estimator)
+    path = Path(source)
+    if path.is_dir():
+        return ImageDirectorySource(path, realtime=realtime, loop=loop, size=(1280, 720), motion_estimator=motion_estimator)
+    if path.is_file():
+        return VideoFileSource(path, realtime=realtime, loop=loop, motion_estimator=motion_estimator)
+    raise ValueError(f"알 수 없는 프레임 소스입니다: {source}")
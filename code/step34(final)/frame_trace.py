@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+import metrics
+
+# 트랙 (Perfetto에서 스레드 한 줄) 표시 순서
+TRACKS = ('capture', 'depth', 'hand', 'yolo', 'fusion', 'tts', 'glass-to-voice')
+
+
+class Tracer:
+    """프레임 번호와 캡처 시각을 단 이벤트를 모아 Chrome trace / Perfetto JSON으로 내보냅니다.
+
+    시각은 모두 time.perf_counter() 초입니다. 프레임의 출처 (origin)는 (프레임 번호, 캡처 시각) 튜플로,
+    단계 결과와 플래그, TTS 메시지를 거쳐 음성 출력 시작 시점까지 전달됩니다.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.start = time.perf_counter()
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0  # max_events를 넘어 버린 이벤트 수
+        self.announcements = []  # {'text', 'frame_id', 'latency_ms'} (캡처 -> 음성 출력 시작)
+        self.lock = threading.Lock()
+
+    def _ts(self, t):
+        return round((t - self.start) * 1e6, 1)  # 마이크로초
+
+    def _add(self, event):
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append(event)
+
+    def span(self, track, name, start, end, origin=None, **args):
+        """완료 이벤트 (ph X)"""
+        self._add({
+            'name': name, 'ph': "X", 'pid': 1, 'tid': TRACKS.index(track) + 1,
+            'ts': self._ts(start), 'dur': round((end - start) * 1e6, 1), 'args': _args(origin, args),
+        })
+
+    def instant(self, track, name, t, origin=None, **args):
+        """순간 이벤트 (ph i)"""
+        self._add({
+            'name': name, 'ph': "i", 's': "t", 'pid': 1, 'tid': TRACKS.index(track) + 1,
+            'ts': self._ts(t), 'args': _args(origin, args),
+        })
+
+    def capture(self, origin):
+        """프레임 캡처 이벤트"""
+        self.instant('capture', "frame", origin[1], origin)
+
+    def announcement(self, text, origin, onset, end):
+        """음성 출력 한 건: 캡처 -> 음성 시작 구간과 발화 구간을 기록하고 지연을 반환합니다. (초)"""
+        frame_id, capture_time = origin
+        latency = onset - capture_time
+        self.span('glass-to-voice', text, capture_time, onset, origin, latency_ms=round(latency * 1000, 1))
+        self.span('tts', "speech", onset, end, origin, text=text)
+        # 캡처 프레임에서 음성 시작까지 흐름 화살표
+        self._add({'name': "glass-to-voice", 'cat': "frame", 'ph': "s", 'id': frame_id, 'pid': 1,
+                   'tid': TRACKS.index('capture') + 1, 'ts': self._ts(capture_time)})
+        self._add({'name': "glass-to-voice", 'cat': "frame", 'ph': "f", 'bp': "e", 'id': frame_id, 'pid': 1,
+                   'tid': TRACKS.index('tts') + 1, 'ts': self._ts(onset)})
+        with self.lock:
+            self.announcements.append({'text': text, 'frame_id': frame_id, 'latency_ms': round(latency * 1000, 1)})
+        metrics.observe('pipeline_glass_to_voice_seconds', latency)
+        return latency
+
+    def summary(self):
+        """안내 음성의 캡처 -> 음성 시작 지연 요약 문자열"""
+        with self.lock:
+            latencies = [a['latency_ms'] for a in self.announcements]
+        if not latencies:
+            return "Glass-to-voice: no announcements"
+        p50, p95 = np.percentile(latencies, [50, 95])
+        return (f"Glass-to-voice: {len(latencies)} announcements, p50 {p50:.0f} ms, "
+                f"p95 {p95:.0f} ms, max {max(latencies):.0f} ms")
+
+    def export(self, path):
+        """Chrome trace (JSON object format) 파일로 저장합니다. chrome://tracing 또는 ui.perfetto.dev에서 열 수 있습니다."""
+        metadata = [{'name': "process_name", 'ph': "M", 'pid': 1, 'args': {'name': "pipeline"}}]
+        for i, track in enumerate(TRACKS):
+            metadata.append({'name': "thread_name", 'ph': "M", 'pid': 1, 'tid': i + 1, 'args': {'name': track}})
+            metadata.append({'name': "thread_sort_index", 'ph': "M", 'pid': 1, 'tid': i + 1, 'args': {'sort_index': i}})
+        with self.lock:
+            trace = {
+                'traceEvents': metadata + self.events,
+                'displayTimeUnit': "ms",
+                'otherData': {'announcements': self.announcements, 'dropped_events': self.dropped},
+            }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(trace), encoding="utf-8")
+        return path
+
+
+def _args(origin, args):
+    if origin is not None:
+        args = {'frame_id': origin[0], **args}
+    return args
+
+
+def frame_origin(shared_data):
+    """현재 공유 프레임의 출처 (프레임 번호, 캡처 시각). 캡처 시각이 없으면 None"""
+    capture_time = shared_data.get('frame_capture')
+    if capture_time is None:
+        return None
+    return shared_data.get('frame_seq'), capture_time
+
+
+def trace_span(shared_data, track, name, start, origin=None, **args):
+    """공유 메모리에 추적기가 있으면 start부터 지금까지의 구간을 기록합니다."""
+    tracer = shared_data.get('tracer')
+    if tracer is not None:
+        tracer.span(track, name, start, time.perf_counter(), origin, **args)
+
+
+def set_flag_origin(shared_data, flag, origin):
+    """플래그 ('catch'/'detect')를 켠 프레임의 출처를 FlagMonitor가 보도록 기록합니다."""
+    if origin is not None:
+        shared_data.setdefault('flag_origins', {})[flag] = origin
+
+
+def trace_instant(shared_data, track, name, origin=None, **args):
+    """공유 메모리에 추적기가 있으면 지금 시각의 순간 이벤트를 기록합니다."""
+    tracer = shared_data.get('tracer')
+    if tracer is not None:
+        tracer.instant(track, name, time.perf_counter(), origin, **args)
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import cv2
+import numpy as np
+from hand_track import NUM_LANDMARKS
+from model_registry import fetch_variant, get_variant
+
+# 손 랜드마크 연결 (mp.solutions.hands.HAND_CONNECTIONS와 같음, 그리기에 mediapipe가 필요 없도록 고정)
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),  # 엄지
+    (0, 5), (5, 6), (6, 7), (7, 8),  # 검지
+    (5, 9), (9, 10), (10, 11), (11, 12),  # 중지
+    (9, 13), (13, 14), (14, 15), (15, 16),  # 약지
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),  # 새끼, 손바닥
+)
+
+
+def empty_hand_arrays():
+    """손이 없을 때의 (landmarks, handedness, scores) 배열"""
+    return (
+        np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32),
+        np.empty(0, dtype='<U5'),
+        np.empty(0, dtype=np.float32),
+    )
+
+
+def legacy_result_to_array(results):
+    """mp.solutions.hands 결과를 (hands, 21, 3) float32 배열과 handedness, score 배열로 변환합니다."""
+    if not results.multi_hand_landmarks:
+        return empty_hand_arrays()
+
+    landmarks = np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in results.multi_hand_landmarks],
+        dtype=np.float32,
+    )
+    classifications = [h.classification[0] for h in results.multi_handedness]
+    handedness = np.array([c.label for c in classifications], dtype='<U5')
+    scores = np.array([c.score for c in classifications], dtype=np.float32)
+    return landmarks, handedness, scores
+
+
+def tasks_result_to_array(result):
+    """MediaPipe Tasks HandLandmarkerResult를 같은 배열 형식으로 변환합니다."""
+    if not result.hand_landmarks:
+        return empty_hand_arrays()
+
+    landmarks = np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand] for hand in result.hand_landmarks],
+        dtype=np.float32,
+    )
+    categories = [h[0] for h in result.handedness]
+    handedness = np.array([c.category_name for c in categories], dtype='<U5')
+    scores = np.array([c.score for c in categories], dtype=np.float32)
+    return landmarks, handedness, scores
+
+
+class LegacyHandEngine:
+    """mp.solutions.hands 기반 동기 손 추론 엔진 (submit 시 바로 추론)"""
+
+    def __init__(self, max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.5):
+        import mediapipe as mp  # 실제 엔진에서만 필요 (stub 엔진은 mediapipe 없이 실행)
+
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+        self.result = None
+
+    def process(self, image):
+        """BGR 프레임을 동기적으로 추론해 MediaPipe 원본 결과를 반환합니다."""
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return self.hands.process(image_rgb)
+
+    def submit(self, image, timestamp_ms):
+        """프레임을 추론합니다. 동기 엔진이므로 항상 수락합니다."""
+        self.result = (*legacy_result_to_array(self.process(image)), timestamp_ms)
+        return True
+
+    def poll(self):
+        """아직 가져가지 않은 최신 결과 (landmarks, handedness, scores, timestamp_ms)를 반환합니다."""
+        result, self.result = self.result, None
+        return result
+
+    def close(self):
+        self.hands.close()
+
+
+class TasksHandEngine:
+    """MediaPipe Tasks HandLandmarker LIVE_STREAM 모드 엔진
+
+    프레임을 타임스탬프와 함께 비동기로 제출하고, 결과는 MediaPipe 스레드의 콜백에서
+    asyncio 이벤트 루프로 전달됩니다. 이전 프레임을 처리 중이면 새 프레임은 버립니다.
+    """
+
+    def __init__(self, model_path=None, max_num_hands=2,
+                 min_detection_confidence=0.7, min_tracking_confidence=0.5):
+        if model_path is None:
+            # 레지스트리의 기본 HandLandmarker 모델 (없으면 내려받고 체크섬 확인)
+            model_path = str(fetch_variant("hand", get_variant("hand")))
+        else:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            model_path = os.path.join(current_dir, model_path)
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"HandLandmarker 모델 파일을 찾을 수 없습니다: {model_path}")
+
+        import mediapipe as mp
+
+        self.mp = mp
+        vision = mp.tasks.vision
+        options = vision.HandLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=max_num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_hand_presence_confidence=min_tracking_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result,
+        )
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+
+        self.loop = None  # 결과를 전달할 이벤트 루프
+        self.in_flight = False  # 추론 중인 프레임이 있는지 여부
+        self.last_timestamp_ms = -1
+        self.result = None
+        self.dropped_frames = 0  # 추론이 밀려 버린 프레임 수
+
+    def submit(self, image, timestamp_ms):
+        """프레임을 비동기 추론에 제출합니다. 이전 추론이 끝나지 않았으면 버리고 False를 반환합니다."""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        if self.in_flight:
+            self.dropped_frames += 1
+            return False
+
+        # LIVE_STREAM 모드는 단조 증가하는 타임스탬프가 필요
+        timestamp_ms = max(int(timestamp_ms), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        mp_image = self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=image_rgb)
+        self.in_flight = True
+        self.landmarker.detect_async(mp_image, timestamp_ms)
+        return True
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        """MediaPipe 스레드에서 호출되는 결과 콜백"""
+        arrays = tasks_result_to_array(result)
+        self.loop.call_soon_threadsafe(self._deliver, arrays, timestamp_ms)
+
+    def _deliver(self, arrays, timestamp_ms):
+        """이벤트 루프 스레드에서 결과를 저장합니다."""
+        self.result = (*arrays, timestamp_ms)
+        self.in_flight = False
+
+    def poll(self):
+        """아직 가져가지 않은 최신 결과를 반환합니다. (없으면 None)"""
+        result, self.result = self.result, None
+        return result
+
+    def close(self):
+        self.landmarker.close()
+
+
+HAND_ENGINES = {
+    'legacy': LegacyHandEngine,
+    'tasks': TasksHandEngine,
+}  # stub_stages를 import하면 'stub' 엔진이 추가됨
+
+
+def create_hand_engine(engine="legacy", **kwargs):
+    """이름으로 손 추론 엔진을 생성합니다. ('legacy', 'tasks', stub_stages를 불러온 경우 'stub')"""
+    if engine not in HAND_ENGINES:
+        raise ValueError(f"지원하지 않는 손 추론 엔진입니다: {engine}")
+    return HAND_ENGINES[engine](**kwargs)
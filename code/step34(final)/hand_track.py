@@ -0,0 +1,148 @@
+import numpy as np
+
+NUM_LANDMARKS = 21
+# 손가락별 (MCP, PIP, TIP) 랜드마크 인덱스 (검지, 중지, 약지, 새끼)
+FINGER_JOINTS = np.array([[5, 6, 8], [9, 10, 12], [13, 14, 16], [17, 18, 20]])
+
+# 잡기 상태
+IDLE = "idle"
+APPROACH = "approach"
+CLOSE = "close"
+HOLD = "hold"
+RELEASE = "release"
+
+
+def finger_curl_angles(landmarks):
+    """손가락마다 MCP->PIP, PIP->TIP 벡터 사이 각도 (0: 펴짐, pi: 완전히 굽힘)를 계산합니다."""
+    joints = landmarks[..., FINGER_JOINTS, :2]  # (..., 4, 3, 2)
+    a = joints[..., 1, :] - joints[..., 0, :]
+    b = joints[..., 2, :] - joints[..., 1, :]
+    cos = (a * b).sum(-1) / (np.linalg.norm(a, axis=-1) * np.linalg.norm(b, axis=-1) + 1e-6)
+    return np.arccos(np.clip(cos, -1.0, 1.0)).astype(np.float32)
+
+
+class HandTrack:
+    """한 손의 최근 랜드마크를 미리 할당한 링 버퍼에 저장하고 속도와 굽힘 각도를 누적 계산합니다."""
+
+    def __init__(self, capacity=30):
+        self.capacity = capacity
+        self.landmarks = np.zeros((capacity, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.velocities = np.zeros((capacity, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.curls = np.zeros((capacity, len(FINGER_JOINTS)), dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # 다음에 기록할 위치
+        self.count = 0  # 유효한 기록 수
+
+    @property
+    def last_index(self):
+        return (self.head - 1) % self.capacity
+
+    @property
+    def last_seen(self):
+        """마지막으로 손이 관측된 시각 (기록이 없으면 None)"""
+        return self.timestamps[self.last_index] if self.count else None
+
+    def push(self, landmarks, timestamp):
+        """새 프레임의 랜드마크를 기록하고 속도와 굽힘 각도를 갱신합니다."""
+        i = self.head
+        if self.count:
+            prev = self.last_index
+            dt = timestamp - self.timestamps[prev]
+            if dt > 0:
+                np.subtract(landmarks, self.landmarks[prev], out=self.velocities[i])
+                self.velocities[i] /= dt
+            else:
+                self.velocities[i] = self.velocities[prev]
+        else:
+            self.velocities[i] = 0.0
+
+        self.landmarks[i] = landmarks
+        self.curls[i] = finger_curl_angles(landmarks)
+        self.timestamps[i] = timestamp
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def reset(self):
+        """손이 사라졌을 때 이력을 비웁니다."""
+        self.head = 0
+        self.count = 0
+
+    def mean_curl(self, n=3):
+        """최근 n 프레임의 평균 손가락 굽힘 각도 (rad)"""
+        n = min(n, self.count)
+        if n == 0:
+            return 0.0
+        idx = (self.head - 1 - np.arange(n)) % self.capacity
+        return float(self.curls[idx].mean())
+
+    def wrist_speed(self):
+        """최근 프레임의 손목 이동 속도 (정규화 좌표/초)"""
+        if not self.count:
+            return 0.0
+        return float(np.linalg.norm(self.velocities[self.last_index, 0, :2]))
+
+
+class GraspStateMachine:
+    """손 접근 -> 쥐기 -> 잡고 있음 -> 놓기 상태를 히스테리시스로 판정합니다.
+
+    손가락이 물체 뒤로 가려져 한두 프레임만 굽힘 판정이 흔들려도 상태가 바뀌지 않도록
+    쥐기/놓기 임계값을 분리하고 연속 프레임 수와 손 소실 허용 시간을 둡니다.
+    """
+
+    def __init__(self, close_on=1.0, close_off=0.6, hold_frames=3, release_frames=5, lost_timeout=0.5):
+        self.close_on = close_on  # 쥐기 판정 평균 굽힘 각도 (rad)
+        self.close_off = close_off  # 놓기 판정 평균 굽힘 각도 (rad)
+        self.hold_frames = hold_frames  # HOLD로 가기 위한 연속 쥐기 프레임 수
+        self.release_frames = release_frames  # RELEASE로 가기 위한 연속 펴짐 프레임 수
+        self.lost_timeout = lost_timeout  # 손이 안 보여도 상태를 유지하는 시간 (초)
+
+        self.state = IDLE
+        self.closed_count = 0
+        self.open_count = 0
+
+    def update(self, track, timestamp, catch_hint=False):
+        """현재 프레임의 손 트랙으로 상태를 갱신하고, 이번 프레임의 상태 전이 (이전, 이후)를 반환합니다."""
+        previous = self.state
+        visible = track.count > 0 and track.last_seen == timestamp
+
+        if not visible:
+            # 손이 일정 시간 이상 보이지 않으면 놓은 것으로 판정
+            last_seen = track.last_seen
+            if last_seen is None or timestamp - last_seen > self.lost_timeout:
+                self.state = RELEASE if self.state == HOLD else IDLE
+                self.closed_count = self.open_count = 0
+                track.reset()
+            return previous, self.state
+
+        curl = track.mean_curl()
+        closing = catch_hint or curl >= self.close_on
+        opening = not catch_hint and curl < self.close_off
+
+        if self.state in (IDLE, RELEASE):
+            self.state = APPROACH
+            self.closed_count = self.open_count = 0
+
+        if self.state == APPROACH:
+            if closing:
+                self.state = CLOSE
+                self.closed_count = 1
+        elif self.state == CLOSE:
+            if opening:
+                self.state = APPROACH
+                self.closed_count = 0
+            elif closing:
+                self.closed_count += 1
+                if self.closed_count >= self.hold_frames:
+                    self.state = HOLD
+                    self.open_count = 0
+        elif self.state == HOLD:
+            self.open_count = self.open_count + 1 if opening else 0
+            if self.open_count >= self.release_frames:
+                self.state = RELEASE
+                self.open_count = 0
+
+        return previous, self.state
+
+    @property
+    def holding(self):
+        return self.state == HOLD
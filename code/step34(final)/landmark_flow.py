@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+
+
+class LandmarkPropagator:
+    """손 랜드마크 모델을 N 프레임마다 실행하고, 그 사이 프레임은 피라미드 Lucas-Kanade 광류로 랜드마크를 이동시킵니다.
+
+    각 랜드마크 주변의 작은 패치만 추적하며, 정방향/역방향 추적 오차가 커지거나
+    추적에 실패한 점이 많아지면 다음 프레임에서 다시 모델을 실행하도록 요청합니다.
+    """
+
+    def __init__(self, inference_interval=3, flow_scale=0.5, win_size=(15, 15), max_level=2,
+                 max_fb_error=1.5, min_valid_ratio=0.7, min_score=0.8):
+        self.inference_interval = inference_interval  # 모델 실행 주기 (프레임)
+        self.flow_scale = flow_scale  # 광류 계산용 축소 비율
+        self.lk_params = dict(
+            winSize=win_size,
+            maxLevel=max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+        )
+        self.max_fb_error = max_fb_error  # 허용 정방향/역방향 오차 (축소 영상 픽셀)
+        self.min_valid_ratio = min_valid_ratio  # 손마다 추적에 성공해야 하는 점 비율
+        self.min_score = min_score  # 이보다 낮은 손 신뢰도면 바로 재추론
+
+        self.prev_gray = None
+        self.landmarks = None  # 마지막 랜드마크 (hands, 21, 3), 정규화 좌표
+        self.frames_since_inference = 0
+        self.needs_reinference = True
+        self.last_fb_error = 0.0  # 최근 전파의 정방향/역방향 오차 중앙값
+
+        # 통계
+        self.inference_count = 0
+        self.propagated_count = 0
+
+    def prepare(self, image):
+        """광류 계산용 축소 흑백 영상을 만듭니다."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.flow_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def needs_inference(self):
+        """이번 프레임에서 랜드마크 모델을 실행해야 하는지 판단합니다."""
+        return (
+            self.needs_reinference
+            or self.landmarks is None
+            or self.frames_since_inference + 1 >= self.inference_interval
+        )
+
+    def reset(self, gray, landmarks, scores):
+        """모델 추론 결과로 추적 기준을 갱신합니다."""
+        self.prev_gray = gray
+        self.landmarks = landmarks.copy()
+        self.frames_since_inference = 0
+        self.needs_reinference = bool(len(scores) and scores.min() < self.min_score)
+        self.inference_count += 1
+
+    def propagate(self, gray):
+        """이전 프레임의 랜드마크를 현재 프레임으로 이동시킵니다. 추적 실패 시 None을 반환합니다."""
+        landmarks = self.landmarks
+        self.frames_since_inference += 1
+        if len(landmarks) == 0:
+            self.prev_gray = gray
+            self.propagated_count += 1
+            return landmarks
+
+        h, w = gray.shape[:2]
+        size = np.array([w, h], dtype=np.float32)
+        points = (landmarks[..., :2] * size).reshape(-1, 1, 2).astype(np.float32)
+
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None, **self.lk_params)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, forward, None, **self.lk_params)
+
+        fb_error = np.linalg.norm((points - backward).reshape(-1, 2), axis=1)
+        valid = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+        valid = valid.reshape(len(landmarks), -1)
+        self.last_fb_error = float(np.median(fb_error))
+
+        if (valid.mean(axis=1) < self.min_valid_ratio).any():
+            self.needs_reinference = True
+            return None
+
+        # 실패한 점은 같은 손의 성공한 점들의 중앙 이동량으로 보정
+        displacement = (forward - points).reshape(len(landmarks), -1, 2)
+        median_shift = np.stack([np.median(d[v], axis=0) for d, v in zip(displacement, valid)])
+        displacement = np.where(valid[..., None], displacement, median_shift[:, None, :])
+
+        propagated = landmarks.copy()
+        propagated[..., :2] += displacement / size
+        self.landmarks = propagated
+        self.prev_gray = gray
+        self.propagated_count += 1
+        return propagated
+
+    @property
+    def inference_ratio(self):
+        """모델을 실제로 실행한 프레임 비율"""
+        total = self.inference_count + self.propagated_count
+        return self.inference_count / total if total else 1.0
@@ -0,0 +1,396 @@
+import argparse
+import csv
+import platform
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from frame_sources import create_frame_source
+from model_registry import get_variant
+from session_recorder import SessionReader
+from stub_stages import Scenario, StubDetectorModel
+from test_depth import setup_depth_model, process_depth_sections
+from test_detect import YOLODetector
+from test_hand import HandDetection
+
+CSV_FIELDS = ['mode', 'rate', 'stage', 'offered', 'completed', 'dropped', 'drop_rate', 'throughput',
+              'mean_queue', 'max_queue', 'service_ms', 'p50_ms', 'p95_ms', 'p99_ms']
+
+# 부하 모드
+# pipeline: test_main과 같이 모든 단계가 한 스레드에서 차례로 실행되고, 프레임은 최신 프레임 슬롯
+#           (shared_data['frame'])으로 전달됩니다. 단계 비용이 더해지므로 처리 한계는 약 1 / Σ(단계 처리 시간)입니다.
+# parallel: 단계마다 스레드와 크기 제한 큐를 둡니다. 단계 비용이 겹치므로 단계를 나눠 실행했을 때의 단계별 상한입니다.
+MODES = ('pipeline', 'parallel')
+
+
+def build_stages(stub_config=None):
+    """단계 이름 -> 프레임 처리 함수 (frame, timestamp). stub_config가 있으면 스텁 단계 사용"""
+    if stub_config is not None:
+        scenario = Scenario.load(stub_config)
+        depth_processor = setup_depth_model(backend="stub", scenario=scenario)
+        detector = YOLODetector(model=StubDetectorModel(scenario))
+        hand_detection = HandDetection(engine="stub", scenario=scenario)
+    else:
+        depth_processor = setup_depth_model(variant=get_variant("depth"))
+        detection_variant = get_variant("detection")
+        detector = YOLODetector(model_path=detection_variant['path'], imgsz=detection_variant['input_size'])
+        hand_detection = HandDetection()
+
+    def run_depth(frame, timestamp):
+        depth_result = depth_processor.process_frame(frame)
+        depth_map = depth_processor.normalize_minmax(depth_result.squeeze(0))
+        return process_depth_sections(depth_map, region='corridor', tie_break="Avoid to Left")
+
+    def run_hand(frame, timestamp):
+        return hand_detection.detect(frame, timestamp * 1000)
+
+    def run_yolo(frame, timestamp):
+        return detector.detect_frame(frame)
+
+    return {'depth': run_depth, 'hand': run_hand, 'yolo': run_yolo}
+
+
+def load_frames(source, count=120):
+    """부하 생성용 프레임을 미리 메모리에 읽어 둡니다. (소스 디코딩 비용 제외)"""
+    if Path(source, "meta.json").exists():  # session_recorder 세션
+        reader = SessionReader(source)
+        return [frame for _, (_, frame, _) in zip(range(count), reader.frames())]
+    frame_source = create_frame_source(source, realtime=False, loop=True)
+    try:
+        return [frame_source.read_frame() for _ in range(count)]
+    finally:
+        frame_source.release()
+
+
+class StageWorker(threading.Thread):
+    """크기가 제한된 입력 큐에서 프레임을 꺼내 단계 함수를 실행하는 작업 스레드 (큐가 차면 생성기가 프레임을 버림)"""
+
+    def __init__(self, name, fn, tracker, queue_size=4):
+        super().__init__(daemon=True)
+        self.name = name
+        self.fn = fn
+        self.tracker = tracker
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.latencies = []  # 생성 시각부터 이 단계 완료까지 (초)
+        self.service = []  # 단계 함수 실행 시간 (초)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame_id, generated, frame, timestamp = item
+            start = time.perf_counter()
+            try:
+                self.fn(frame, timestamp)
+            except Exception as e:
+                print(f"[{self.name}] error: {e}")
+            done = time.perf_counter()
+            self.service.append(done - start)
+            self.latencies.append(done - generated)
+            self.tracker.complete(frame_id, generated, done)
+
+
+class CompletionTracker:
+    """모든 단계를 통과한 프레임의 종단 간 지연을 집계합니다."""
+
+    def __init__(self, num_stages):
+        self.num_stages = num_stages
+        self.lock = threading.Lock()
+        self.pending = {}  # frame_id -> 완료한 단계 수
+        self.latencies = []
+
+    def complete(self, frame_id, generated, done):
+        with self.lock:
+            count = self.pending.get(frame_id, 0) + 1
+            if count == self.num_stages:
+                self.pending.pop(frame_id, None)
+                self.latencies.append(done - generated)
+            else:
+                self.pending[frame_id] = count
+
+
+class LatestFrameSlot:
+    """shared_data['frame']처럼 최신 프레임 하나만 보관하는 슬롯. 읽기 전에 덮어쓴 프레임은 버려진 것으로 셉니다."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.overwritten = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.condition:
+            if self.item is not None:
+                self.overwritten += 1
+            self.item = item
+            self.condition.notify()
+
+    def take(self):
+        """새 프레임을 기다려 꺼냅니다. 닫히고 비어 있으면 None"""
+        with self.condition:
+            while self.item is None and not self.closed:
+                self.condition.wait()
+            item, self.item = self.item, None
+            return item
+
+    def occupied(self):
+        return self.item is not None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class PipelineWorker(threading.Thread):
+    """test_main의 이벤트 루프처럼 한 스레드에서 모든 단계를 차례로 실행합니다."""
+
+    def __init__(self, stages, slot):
+        super().__init__(daemon=True)
+        self.name = "pipeline"
+        self.stages = stages
+        self.slot = slot
+        self.latencies = {name: [] for name in stages}  # 생성 시각부터 단계 완료까지 (초)
+        self.service = {name: [] for name in stages}  # 단계 함수 실행 시간 (초)
+        self.completed = []  # 모든 단계를 마친 프레임의 종단 간 지연 (초)
+
+    def run(self):
+        while True:
+            item = self.slot.take()
+            if item is None:
+                break
+            frame_id, generated, frame, timestamp = item
+            for name, fn in self.stages.items():
+                start = time.perf_counter()
+                try:
+                    fn(frame, timestamp)
+                except Exception as e:
+                    print(f"[{name}] error: {e}")
+                done = time.perf_counter()
+                self.service[name].append(done - start)
+                self.latencies[name].append(done - generated)
+            self.completed.append(done - generated)
+
+
+def percentiles_ms(values):
+    if not values:
+        return [float('nan')] * 3
+    return [float(v) for v in np.percentile(np.asarray(values) * 1000, [50, 95, 99])]
+
+
+def mean_ms(values):
+    return float(np.mean(values) * 1000) if values else float('nan')
+
+
+def feed(rate, duration, frames, offer):
+    """rate FPS로 duration초 동안 offer(frame_id, generated, frame, timestamp)를 호출하고 공급 시간을 반환합니다."""
+    total = int(rate * duration)
+    start = time.perf_counter()
+    for i in range(total):
+        target = start + i / rate
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        offer(i, time.perf_counter(), frames[i % len(frames)], i / rate)
+    return total, time.perf_counter() - start
+
+
+def join_workers(workers, timeout):
+    """작업 스레드 종료를 기다립니다. 시간 안에 끝나지 않으면 다음 측정을 오염시키지 않도록 중단합니다."""
+    deadline = time.perf_counter() + timeout
+    for worker in workers:
+        worker.join(timeout=max(deadline - time.perf_counter(), 0.0))
+    alive = [worker.name for worker in workers if worker.is_alive()]
+    if alive:
+        raise RuntimeError(f"작업 스레드가 {timeout:.0f}초 안에 끝나지 않았습니다: {', '.join(alive)} "
+                           f"(--drain-timeout을 늘리거나 입력 속도를 낮추세요)")
+
+
+def run_rate_pipeline(stages, frames, rate, duration, drain_timeout=30.0):
+    """pipeline 모드: 최신 프레임 슬롯과 단일 작업 스레드로 rate FPS를 공급하고 단계별 통계 행 목록을 반환합니다."""
+    slot = LatestFrameSlot()
+    worker = PipelineWorker(stages, slot)
+    worker.start()
+    occupancy = []
+
+    def offer(*item):
+        occupancy.append(int(slot.occupied()))
+        slot.put(item)
+
+    start = time.perf_counter()
+    offered, feed_time = feed(rate, duration, frames, offer)
+    slot.close()
+    join_workers([worker], drain_timeout)
+    elapsed = time.perf_counter() - start
+
+    taken = offered - slot.overwritten
+    samples = occupancy or [0]
+    rows = []
+    for name in stages:
+        rows.append(dict(zip(CSV_FIELDS, [
+            'pipeline', rate, name, offered, len(worker.latencies[name]), offered - taken, (offered - taken) / max(offered, 1),
+            len(worker.latencies[name]) / elapsed, float(np.mean(samples)), int(np.max(samples)),
+            mean_ms(worker.service[name]), *percentiles_ms(worker.latencies[name]),
+        ])))
+    rows.append(dict(zip(CSV_FIELDS, [
+        'pipeline', rate, 'pipeline', offered, len(worker.completed), offered - taken, (offered - taken) / max(offered, 1),
+        len(worker.completed) / elapsed, float(np.mean(samples)), int(np.max(samples)),
+        sum(mean_ms(worker.service[name]) for name in stages), *percentiles_ms(worker.completed),
+    ])))
+    return rows, feed_time
+
+
+def run_rate_parallel(stages, frames, rate, duration, queue_size=4, drain_timeout=30.0):
+    """parallel 모드: 단계별 스레드와 크기 제한 큐로 rate FPS를 공급하고 단계별 통계 행 목록을 반환합니다."""
+    tracker = CompletionTracker(len(stages))
+    workers = {name: StageWorker(name, fn, tracker, queue_size) for name, fn in stages.items()}
+    for worker in workers.values():
+        worker.start()
+
+    dropped = {name: 0 for name in workers}
+    depth_samples = {name: [] for name in workers}
+    expected = {}  # frame_id -> 실제로 넣은 단계 수 (버린 단계는 종단 간 집계에서 제외)
+
+    def offer(frame_id, generated, frame, timestamp):
+        accepted = 0
+        for name, worker in workers.items():
+            depth_samples[name].append(worker.queue.qsize())
+            try:
+                worker.queue.put_nowait((frame_id, generated, frame, timestamp))
+                accepted += 1
+            except queue.Full:
+                dropped[name] += 1
+        expected[frame_id] = accepted
+
+    start = time.perf_counter()
+    offered, feed_time = feed(rate, duration, frames, offer)
+    for worker in workers.values():
+        worker.queue.put(None)  # 남은 큐를 처리한 뒤 종료
+    join_workers(list(workers.values()), drain_timeout)
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for name, worker in workers.items():
+        completed = len(worker.latencies)
+        samples = depth_samples[name] or [0]
+        rows.append(dict(zip(CSV_FIELDS, [
+            'parallel', rate, name, offered, completed, dropped[name], dropped[name] / max(offered, 1),
+            completed / elapsed, float(np.mean(samples)), int(np.max(samples)),
+            mean_ms(worker.service), *percentiles_ms(worker.latencies),
+        ])))
+    full = sum(1 for count in expected.values() if count == len(stages))
+    rows.append(dict(zip(CSV_FIELDS, [
+        'parallel', rate, 'pipeline', offered, len(tracker.latencies), offered - full, (offered - full) / max(offered, 1),
+        len(tracker.latencies) / elapsed, float('nan'), 0,
+        max(mean_ms(worker.service) for worker in workers.values()), *percentiles_ms(tracker.latencies),
+    ])))
+    return rows, feed_time
+
+
+def run_rate(stages, frames, rate, duration, queue_size=4, drain_timeout=30.0, mode='pipeline'):
+    """rate FPS로 duration초 동안 프레임을 공급하고 단계별 통계 행 목록을 반환합니다."""
+    if mode == 'pipeline':
+        rows, feed_time = run_rate_pipeline(stages, frames, rate, duration, drain_timeout)
+    else:
+        rows, feed_time = run_rate_parallel(stages, frames, rate, duration, queue_size, drain_timeout)
+    print(f"  {rate:6.1f} FPS offered, fed in {feed_time:.1f} s: " + ", ".join(
+        f"{r['stage']} {r['throughput']:.1f}/s drop {r['drop_rate'] * 100:.0f}% p95 {r['p95_ms']:.0f} ms" for r in rows))
+    return rows
+
+
+def serialized_capacity(rows):
+    """가장 낮은 입력 속도에서 잰 단계 처리 시간 합으로 구한 단일 루프 처리 한계 (FPS)"""
+    lowest = min(r['rate'] for r in rows)
+    service = sum(r['service_ms'] for r in rows if r['rate'] == lowest and r['stage'] != 'pipeline')
+    return 1000.0 / service if service > 0 else float('inf')
+
+
+def find_knees(rows, max_drop=0.01, latency_factor=2.0):
+    """단계별 최대 지속 가능 입력 속도: 버림 비율이 max_drop 이하이고 p95 지연이
+    가장 낮은 입력 속도의 latency_factor배 이하인 가장 높은 입력 속도. 넘는 첫 속도를 무릎 (knee)으로 봅니다."""
+    knees = {}
+    for stage in dict.fromkeys(r['stage'] for r in rows):
+        stage_rows = sorted((r for r in rows if r['stage'] == stage), key=lambda r: r['rate'])
+        base_p95 = stage_rows[0]['p95_ms']
+        sustainable, knee = None, None
+        for r in stage_rows:
+            if r['drop_rate'] <= max_drop and not r['p95_ms'] > base_p95 * latency_factor:
+                sustainable = r['rate']
+            else:
+                knee = r['rate']
+                break
+        knees[stage] = (sustainable, knee)
+    return knees
+
+
+def format_summary(rows, knees, machine, args):
+    setup = "latest-frame slot, one loop" if args.mode == 'pipeline' else f"thread per stage, queue size {args.queue_size}"
+    lines = [
+        f"Saturation load test ({args.mode} mode: {setup}) - {machine}",
+        f"source: {args.source}, {'stub ' + args.stub_config if args.stub_config else 'real models'}, "
+        f"{args.duration:.0f} s per rate",
+        f"Serialized capacity (1 / sum of stage service time): {serialized_capacity(rows):.1f} FPS",
+        "",
+        f"{'stage':<10} {'max sustainable FPS':>20} {'knee FPS':>10}",
+    ]
+    for stage, (sustainable, knee) in knees.items():
+        lines.append(f"{stage:<10} {sustainable if sustainable is not None else '-':>20} "
+                     f"{knee if knee is not None else '> tested':>10}")
+    if args.mode == 'pipeline':
+        # 한 루프에서 단계가 같은 프레임을 차례로 처리하므로 버림과 무릎은 모든 단계가 같음: 처리 시간 비중으로 병목 판단
+        lowest = min(r['rate'] for r in rows)
+        service = {r['stage']: r['service_ms'] for r in rows if r['rate'] == lowest and r['stage'] != 'pipeline'}
+        bottleneck = max(service, key=service.get)
+        lines += ["", f"Bottleneck: {bottleneck} ({service[bottleneck]:.1f} of {sum(service.values()):.1f} ms per frame)"]
+        return "\n".join(lines)
+    limits = {s: v[0] for s, v in knees.items() if s != 'pipeline' and v[1] is not None}
+    if limits:
+        bottleneck = min(limits, key=lambda s: limits[s] or 0)
+        lines += ["", f"Bottleneck: {bottleneck} (sustains {limits[bottleneck]} FPS)"]
+    else:
+        lines += ["", "No stage saturated in the tested range."]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="단계별 최대 지속 가능 FPS를 찾는 포화 부하 테스트")
+    parser.add_argument("--source", default="synthetic", help="synthetic, 영상 파일, 이미지 폴더 또는 기록 세션 폴더")
+    parser.add_argument("--stub-config", default=None, help="스텁 단계 설정 JSON (없으면 실제 모델)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 10, 15, 20, 30, 45, 60])
+    parser.add_argument("--duration", type=float, default=10.0, help="입력 속도마다 공급하는 시간 (초)")
+    parser.add_argument("--mode", choices=MODES, default='pipeline',
+                        help="pipeline: test_main처럼 한 루프에서 단계를 차례로 실행 (기본), parallel: 단계별 스레드와 큐")
+    parser.add_argument("--queue-size", type=int, default=4, help="parallel 모드의 단계별 큐 크기")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="입력 속도마다 남은 작업을 기다리는 최대 시간 (초)")
+    parser.add_argument("--frames", type=int, default=120, help="미리 읽어 둘 프레임 수")
+    parser.add_argument("--output-dir", default="load_test")
+    args = parser.parse_args()
+
+    machine = f"{platform.node()} {platform.machine()} {platform.processor()}".strip()
+    frames = load_frames(args.source, args.frames)
+    stages = build_stages(args.stub_config)
+
+    rows = []
+    for rate in sorted(args.rates):
+        rows += run_rate(stages, frames, rate, args.duration, args.queue_size, args.drain_timeout, args.mode)
+    knees = find_knees(rows)
+    summary = format_summary(rows, knees, machine, args)
+    print(summary)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{platform.node() or 'machine'}_{args.mode}_{time.strftime('%Y%m%d_%H%M%S')}"
+    with open(output_dir / f"{stem}.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    (output_dir / f"{stem}.txt").write_text(summary + "\n", encoding="utf-8")
+    print(f"Report saved at: {output_dir / stem}.csv / .txt")
+
+
+if __name__ == "__main__":
+    main()
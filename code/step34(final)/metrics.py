@@ -0,0 +1,231 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 지표 이름과 설명 (Prometheus HELP)
+METRIC_HELP = {
+    'pipeline_frames_total': "Frames published by the frame source",
+    'pipeline_capture_interval_seconds': "Time between consecutive captured frames",
+    'pipeline_frames_skipped_total': "Frames a stage never saw because a newer frame replaced them",
+    'pipeline_stage_seconds': "Per-model preprocess / inference / postprocess time",
+    'pipeline_render_seconds': "Time spent drawing a stage's display image",
+    'pipeline_fusion_seconds': "Delay from the later of catch/detect flag to the fused announcement decision",
+    'pipeline_tts_queue_wait_seconds': "Time a message waited in the TTS queue before speech started",
+    'pipeline_tts_speech_seconds': "Speech duration of a TTS message",
+    'pipeline_glass_to_voice_seconds': "Frame capture to audio onset of the announcement it caused",
+}
+
+# Prometheus로 내보낼 누적 버킷 경계 (초)
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """HDR 방식 히스토그램: 2배 구간마다 sub_buckets개의 선형 칸 (상대 오차 약 1/sub_buckets)
+
+    기록은 칸 번호 계산과 정수 증가뿐이라 단계마다 매 프레임 호출해도 부담이 작습니다.
+    """
+
+    def __init__(self, lowest=1e-6, highest=100.0, sub_buckets=16):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self.num_buckets = (math.ceil(math.log2(highest / lowest)) + 1) * sub_buckets
+        self.counts = [0] * self.num_buckets
+        self.export_counts = [0] * (len(EXPORT_BUCKETS) + 1)  # Prometheus 버킷별 개수 (마지막은 +Inf)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def _index(self, value):
+        ratio = value / self.lowest
+        if ratio < 1.0:
+            return 0
+        mantissa, exponent = math.frexp(ratio)  # ratio = mantissa * 2 ** exponent, 0.5 <= mantissa < 1
+        index = (exponent - 1) * self.sub_buckets + int((mantissa * 2.0 - 1.0) * self.sub_buckets)
+        return min(index, self.num_buckets - 1)
+
+    def upper_bound(self, index):
+        """칸의 위쪽 경계 (초)"""
+        major, sub = divmod(index, self.sub_buckets)
+        return self.lowest * 2.0 ** major * (1.0 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value):
+        index = self._index(value)
+        export_index = bisect.bisect_left(EXPORT_BUCKETS, value)  # value <= 경계인 첫 버킷
+        with self.lock:
+            self.counts[index] += 1
+            self.export_counts[export_index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """q (0~100) 백분위수 (초). 기록이 없으면 None"""
+        with self.lock:
+            counts, count, maximum = list(self.counts), self.count, self.max
+        if count == 0:
+            return None
+        target = max(1, math.ceil(q / 100.0 * count))
+        seen = 0
+        for index, c in enumerate(counts):
+            seen += c
+            if seen >= target:
+                return min(self.upper_bound(index), maximum)
+        return maximum
+
+    def cumulative(self):
+        """EXPORT_BUCKETS 경계별 누적 개수 (Prometheus le 버킷, 기록 시 정확히 센 값)"""
+        with self.lock:
+            counts = self.export_counts[:-1]
+        result, seen = [], 0
+        for count in counts:
+            seen += count
+            result.append(seen)
+        return result
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """이름과 레이블로 히스토그램과 카운터를 관리하고 Prometheus 텍스트와 요약 로그를 만듭니다."""
+
+    def __init__(self):
+        self.histograms = {}  # (이름, 레이블) -> Histogram
+        self.counters = {}  # (이름, 레이블) -> Counter
+        self.lock = threading.Lock()
+        self.last_seq = {}  # 단계 -> 마지막으로 본 프레임 번호 (건너뛴 프레임 집계)
+
+    def _get(self, table, factory, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = table.get(key)
+        if metric is None:
+            with self.lock:
+                metric = table.setdefault(key, factory())
+        return metric
+
+    def histogram(self, name, **labels):
+        return self._get(self.histograms, Histogram, name, labels)
+
+    def counter(self, name, **labels):
+        return self._get(self.counters, Counter, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).record(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        self.counter(name, **labels).inc(amount)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with 블록의 소요 시간을 히스토그램에 기록합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def frame_seen(self, stage, seq):
+        """단계가 처리한 프레임 번호로 건너뛴 프레임 수를 집계합니다."""
+        if seq is None:
+            return
+        last = self.last_seq.get(stage)
+        if last is not None and seq > last + 1:
+            self.inc('pipeline_frames_skipped_total', seq - last - 1, stage=stage)
+        self.last_seq[stage] = seq
+
+    def prometheus_text(self):
+        """Prometheus 텍스트 형식 (0.0.4)"""
+        lines = []
+        for table, kind in ((self.counters, "counter"), (self.histograms, "histogram")):
+            names = sorted({name for name, _ in list(table)})
+            for name in names:
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric_name, labels), metric in sorted(table.items(), key=lambda item: item[0]):
+                    if metric_name != name:
+                        continue
+                    if kind == "counter":
+                        lines.append(f"{name}{_labels(labels)} {metric.value}")
+                        continue
+                    for bound, count in zip(EXPORT_BUCKETS, metric.cumulative()):
+                        lines.append(f"{name}_bucket{_labels(labels, le=repr(bound))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {metric.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {metric.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self):
+        """히스토그램별 p50/p95 (ms)와 카운터 값을 한 줄로 요약합니다."""
+        parts = []
+        for (name, labels), metric in sorted(self.histograms.items(), key=lambda item: item[0]):
+            if metric.count == 0:
+                continue
+            label = ".".join(value for _, value in labels) or name
+            short = name.replace("pipeline_", "").replace("_seconds", "")
+            parts.append(f"{short}[{label}] p50 {metric.percentile(50) * 1000:.1f} "
+                         f"p95 {metric.percentile(95) * 1000:.1f} ms")
+        for (name, labels), metric in sorted(self.counters.items(), key=lambda item: item[0]):
+            label = ".".join(value for _, value in labels)
+            parts.append(f"{name.replace('pipeline_', '')}{f'[{label}]' if label else ''} {metric.value}")
+        return ", ".join(parts)
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+# 파이프라인 전체가 공유하는 기본 레지스트리
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+timer = REGISTRY.timer
+frame_seen = REGISTRY.frame_seen
+
+
+def start_metrics_server(port=9108, host="127.0.0.1", registry=REGISTRY):
+    """/metrics에서 Prometheus 텍스트를 제공하는 로컬 HTTP 서버를 백그라운드 스레드로 시작합니다."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # 요청 로그는 출력하지 않음 (FlagMonitor가 stdout을 파싱)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics endpoint: http://{host}:{port}/metrics")
+    return server
+
+
+async def report_loop(shared_data, interval=10, registry=REGISTRY):
+    """주기적으로 지표 요약을 출력합니다."""
+    while shared_data['running']:
+        await asyncio.sleep(interval)
+        summary = registry.summary_line()
+        if summary:
+            print(f"Metrics: {summary}")
@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+MODULE_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_PATH = MODULE_DIR / "model_registry.json"
+CACHE_PATH = Path("model/selected_models.json")  # 기기별 선택 결과 캐시
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """모델 레지스트리 매니페스트를 읽습니다."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_variant(task, name=None, manifest=None):
+    """이름으로 모델 변형을 찾습니다. 이름이 없으면 매니페스트의 첫 번째 (기본) 변형을 반환합니다."""
+    variants = (manifest or load_manifest())[task]
+    if name is None:
+        return variants[0]
+    for variant in variants:
+        if variant['name'] == name:
+            return variant
+    raise KeyError(f"레지스트리에 없는 {task} 모델입니다: {name}")
+
+
+def variant_path(task, variant):
+    """모델 파일 경로 (뎁스는 작업 디렉터리 기준, 감지와 손은 모듈 디렉터리 기준)"""
+    path = Path(variant['path'])
+    return path if task == "depth" else MODULE_DIR / path
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_files(task, variant):
+    """변형을 이루는 모델 파일 경로 목록 (OpenVINO IR은 .xml과 가중치 .bin)"""
+    path = variant_path(task, variant)
+    return [path, path.with_suffix(".bin")] if variant.get('backend') == "openvino" else [path]
+
+
+def verify_file(variant, path, name=None):
+    """파일의 sha256이 매니페스트에 기록된 값 (파일 이름 -> 해시)과 같은지 확인합니다. 기록이 없으면 경고 후 통과"""
+    name = name or path.name
+    expected = (variant.get('sha256') or {}).get(name)
+    if expected is None:
+        print(f"[registry] {variant['name']}: {name}의 체크섬이 기록되어 있지 않아 검증하지 않습니다.")
+        return True
+    return file_sha256(path) == expected
+
+
+def verify_variant(task, variant):
+    """모델 파일이 모두 있고 체크섬이 (등록된 경우) 일치하는지 확인합니다."""
+    files = variant_files(task, variant)
+    return all(path.exists() for path in files) and all(verify_file(variant, path) for path in files)
+
+
+def fetch_variant(task, variant):
+    """없는 모델 파일을 변형의 URL에서 내려받고 바로 체크섬을 확인합니다. 모델 파일 경로를 반환합니다."""
+    for path in variant_files(task, variant):
+        if path.exists():
+            continue
+        if variant.get('url') is None:
+            raise FileNotFoundError(f"모델 파일이 없고 다운로드 URL도 없습니다: {path}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        print(f"[registry] downloading {variant['url'] + path.name}")
+        urllib.request.urlretrieve(variant['url'] + path.name, partial)
+        if not verify_file(variant, partial, path.name):
+            partial.unlink()
+            raise ValueError(f"내려받은 파일의 체크섬이 매니페스트와 다릅니다: {path.name}")
+        partial.replace(path)
+    return variant_path(task, variant)
+
+
+def machine_id():
+    """선택 결과 캐시 키로 쓰는 기기 식별 문자열"""
+    return f"{platform.node()}|{platform.machine()}|{platform.processor()}|{os.cpu_count()}"
+
+
+def load_variant(task, variant):
+    """모델 변형을 불러와 프레임 하나를 추론하는 함수를 반환합니다."""
+    if task == "depth":
+        from test_depth import setup_depth_model
+        processor = setup_depth_model(variant=variant)
+        return processor.process_frame
+
+    from ultralytics import YOLO
+    model = YOLO(str(variant_path(task, variant)))
+    return lambda frame: model(frame, imgsz=variant['input_size'], verbose=False)
+
+
+def measure_latency(infer, frame, runs=10, warmup=2):
+    """추론 함수의 지연 중앙값 (ms)을 측정합니다."""
+    for _ in range(warmup):
+        infer(frame)
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        infer(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies))
+
+
+def calibrate(task, budget_ms, manifest=None, runs=10):
+    """정확도 순으로 변형을 측정해 지연 예산 안에 드는 가장 정확한 변형을 고릅니다. (없으면 가장 빠른 변형)"""
+    manifest = manifest or load_manifest()
+    frame = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+    fastest = None
+    for variant in sorted(manifest[task], key=lambda v: v['accuracy'], reverse=True):
+        downloadable = variant.get('url') is not None and not all(p.exists() for p in variant_files(task, variant))
+        if not downloadable and not verify_variant(task, variant):
+            print(f"[registry] {variant['name']}: 모델 파일이 없거나 체크섬이 다릅니다. 건너뜀")
+            continue
+        try:
+            latency = measure_latency(load_variant(task, variant), frame, runs)
+        except Exception as e:
+            print(f"[registry] {variant['name']}: 측정 실패 ({e})")
+            continue
+        print(f"[registry] {variant['name']}: {latency:.1f} ms (예산 {budget_ms} ms)")
+        if latency <= budget_ms:
+            return variant, latency
+        if fastest is None or latency < fastest[1]:
+            fastest = (variant, latency)
+
+    if fastest is None:
+        raise RuntimeError(f"사용할 수 있는 {task} 모델이 없습니다.")
+    return fastest
+
+
+def select_variant(task, budget_ms, refresh=False, cache_path=CACHE_PATH):
+    """기기별 캐시를 확인하고, 없으면 온디바이스 측정으로 모델 변형을 선택해 캐시에 저장합니다."""
+    manifest = load_manifest()
+    manifest_hash = file_sha256(MANIFEST_PATH)
+    cache_path = Path(cache_path)
+    cache = json.loads(cache_path.read_text(encoding="utf-8")) if cache_path.exists() else {}
+    key = f"{task}@{budget_ms}"
+
+    entry = cache.get(machine_id(), {}).get(key)
+    if entry and not refresh and entry['manifest'] == manifest_hash:
+        try:
+            variant = get_variant(task, entry['name'], manifest)
+            print(f"[registry] cached {task} model: {variant['name']} ({entry['latency_ms']:.1f} ms)")
+            return variant
+        except KeyError:
+            pass
+
+    variant, latency = calibrate(task, budget_ms, manifest)
+    cache.setdefault(machine_id(), {})[key] = {
+        'name': variant['name'], 'latency_ms': latency, 'manifest': manifest_hash,
+    }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+    print(f"[registry] selected {task} model: {variant['name']} ({latency:.1f} ms)")
+    return variant
+
+
+def update_checksums(path=MANIFEST_PATH):
+    """로컬에 있는 모델 파일 (IR은 .xml과 .bin 모두)의 sha256을 매니페스트에 기록합니다."""
+    manifest = load_manifest(path)
+    for task, variants in manifest.items():
+        for variant in variants:
+            hashes = {p.name: file_sha256(p) for p in variant_files(task, variant) if p.exists()}
+            if hashes:
+                variant['sha256'] = {**(variant.get('sha256') or {}), **hashes}
+                print(f"{variant['name']}: {hashes}")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 레지스트리: 변형 선택 / 체크섬 갱신")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    select = subparsers.add_parser("select", help="지연 예산에 맞는 변형을 측정해 선택")
+    select.add_argument("--task", choices=["depth", "detection"], required=True)
+    select.add_argument("--budget-ms", type=float, required=True)
+    select.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 측정")
+    subparsers.add_parser("checksums", help="로컬 모델 파일의 sha256을 매니페스트에 기록")
+    args = parser.parse_args()
+
+    if args.command == "select":
+        select_variant(args.task, args.budget_ms, refresh=args.refresh)
+    else:
+        update_checksums()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+
+class MotionEstimator:
+    """축소한 흑백 프레임의 프레임 간 차이로 장면 변화 정도와 머리 회전 (yaw)을 추정합니다."""
+
+    def __init__(self, size=(160, 90), fov_deg=70.0):
+        self.size = size  # 비교용 축소 해상도 (width, height)
+        self.fov_deg = fov_deg  # 카메라 수평 화각 (도)
+        self.prev_small = None
+        self.score = 0.0  # 최근 프레임의 움직임 점수 (0~1)
+        self.accumulated = 0.0  # 누적 움직임 점수 (소비자가 구간별 차이로 사용)
+        self.head_yaw = 0.0  # 누적 머리 회전 각도 (도, 오른쪽이 양수)
+        self.window = cv2.createHanningWindow(size, cv2.CV_32F)  # 위상 상관용 창 함수
+
+    def update(self, frame):
+        """새 프레임의 움직임 점수를 계산합니다."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)  # 센서 노이즈 억제
+
+        if self.prev_small is None:
+            self.score = 0.0
+        else:
+            self.score = float(cv2.absdiff(small, self.prev_small).mean()) / 255.0
+            # 전역 수평 이동량으로 머리 회전 추정 (장면이 왼쪽으로 밀리면 오른쪽으로 회전)
+            (dx, _), response = cv2.phaseCorrelate(
+                self.prev_small.astype(np.float32), small.astype(np.float32), self.window
+            )
+            if response > 0.1:
+                self.head_yaw -= dx / self.size[0] * self.fov_deg
+        self.prev_small = small
+        self.accumulated += self.score
+        return self.score
+
+    def publish(self, frame, shared_data):
+        """움직임 점수를 계산해 공유 데이터에 기록합니다."""
+        shared_data['motion_score'] = self.update(frame)
+        shared_data['motion_accum'] = self.accumulated
+        shared_data['head_yaw'] = self.head_yaw
+        return self.score
+
+
+class EgoMotionWarper:
+    """키프레임과 현재 프레임 사이의 희소 특징점 광류로 전역 어파인 변환을 추정해 이전 뎁스 맵을 워핑합니다."""
+
+    def __init__(self, size=(320, 180), max_corners=200, min_inliers=20):
+        self.size = size  # 특징점 추적용 축소 해상도 (width, height)
+        self.max_corners = max_corners
+        self.min_inliers = min_inliers  # 변환을 신뢰하기 위한 최소 RANSAC inlier 수
+        self.lk_params = dict(
+            winSize=(21, 21),
+            maxLevel=3,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.key_gray = None
+        self.key_points = None
+
+    def _prepare(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def set_keyframe(self, frame):
+        """뎁스 추론에 사용한 프레임을 기준 프레임으로 설정합니다."""
+        self.key_gray = self._prepare(frame)
+        self.key_points = cv2.goodFeaturesToTrack(
+            self.key_gray, maxCorners=self.max_corners, qualityLevel=0.01, minDistance=8
+        )
+
+    def estimate(self, frame):
+        """기준 프레임 -> 현재 프레임의 2x3 어파인 변환 (축소 해상도 기준)을 추정합니다. 실패 시 None"""
+        if self.key_points is None or len(self.key_points) < self.min_inliers:
+            return None
+
+        gray = self._prepare(frame)
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self.key_gray, gray, self.key_points, None, **self.lk_params)
+        good = status.ravel() == 1
+        if good.sum() < self.min_inliers:
+            return None
+
+        affine, inliers = cv2.estimateAffinePartial2D(
+            self.key_points[good], points[good], method=cv2.RANSAC, ransacReprojThreshold=2.0
+        )
+        if affine is None or inliers.sum() < self.min_inliers:
+            return None
+        return affine
+
+    def warp_depth(self, depth_map, affine):
+        """축소 해상도 기준 어파인 변환을 뎁스 맵 해상도로 옮겨 뎁스 맵을 워핑합니다."""
+        h, w = depth_map.shape[:2]
+        sx, sy = w / self.size[0], h / self.size[1]
+        scaled = affine.astype(np.float32).copy()
+        scaled[0, 1] *= sx / sy
+        scaled[1, 0] *= sy / sx
+        scaled[0, 2] *= sx
+        scaled[1, 2] *= sy
+        return cv2.warpAffine(depth_map, scaled, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
@@ -0,0 +1,49 @@
+from collections import namedtuple
+import numpy as np
+
+# angle: 조향 각도 (도, 음수는 왼쪽), clearance: 통로의 여유도 (0~1, 클수록 멀리 비어 있음),
+# start/end: 통로의 좌우 경계 (영상 폭 대비 비율)
+SteeringDecision = namedtuple('SteeringDecision', ['angle', 'clearance', 'start', 'end'])
+
+
+class FreeSpaceScanner:
+    """정규화 뎁스 맵을 열 단위 최근접 장애물 프로파일로 줄여 가장 넓은 빈 통로와 조향 각도를 구합니다."""
+
+    def __init__(self, threshold=0.8, fov_deg=70.0, band=(0.2, 0.7), min_width=0.1, smooth=5):
+        self.threshold = threshold  # 이 값 이상이면 가까운 장애물 (MiDaS: 클수록 가까움)
+        self.fov_deg = fov_deg  # 카메라 수평 화각 (도)
+        # 프로파일에 사용할 세로 구간 (비율). 위쪽 천장 (corridor 영역의 제외 행)과 아래쪽 발밑 바닥을 제외:
+        # 발밑 바닥은 항상 가깝게 나와 최댓값을 쓰면 모든 열이 막힌 것으로 판정됨
+        self.band = band
+        self.min_width = min_width  # 통로로 인정할 최소 폭 (영상 폭 대비 비율)
+        self.kernel = np.ones(smooth, dtype=np.float32) / smooth  # 프로파일 평활화 커널
+
+    def column_profile(self, depth_map):
+        """열마다 세로 구간 안의 최근접 장애물 값 (최댓값)을 계산합니다."""
+        h = depth_map.shape[0]
+        y1, y2 = int(h * self.band[0]), int(h * self.band[1])
+        profile = depth_map[y1:y2].max(axis=0)
+        return np.convolve(profile, self.kernel, mode='same')
+
+    def scan(self, depth_map):
+        """가장 넓은 빈 통로를 찾아 SteeringDecision을 반환합니다. 통로가 없으면 None"""
+        profile = self.column_profile(depth_map)
+        width = profile.shape[0]
+
+        free = np.concatenate(([False], profile < self.threshold, [False]))
+        edges = np.diff(free.astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if starts.size == 0:
+            return None
+
+        widths = ends - starts
+        best = int(widths.argmax())
+        if widths[best] < self.min_width * width:
+            return None
+
+        start, end = starts[best], ends[best]
+        center = (start + end - 1) / 2.0
+        angle = (center / max(width - 1, 1) - 0.5) * self.fov_deg
+        clearance = 1.0 - float(profile[start:end].mean())
+        return SteeringDecision(float(angle), clearance, start / width, end / width)
@@ -0,0 +1,56 @@
+import time
+import numpy as np
+
+
+class PolarOccupancyMemory:
+    """머리 기준 방위각 극좌표 점유 메모리
+
+    고정 크기 float32 배열에 방위각별 장애물 근접도 (0~1)를 저장하고 시간에 따라 감쇠시킵니다.
+    시야 안의 방위각은 현재 뎁스 관측으로 덮어쓰고, 시야 밖은 기억을 유지하므로
+    고개를 돌린 뒤에도 "왼쪽으로 돌아도 안전한가?"를 추론 없이 답할 수 있습니다.
+    """
+
+    def __init__(self, num_bins=72, half_life=3.0, fov_deg=70.0):
+        self.num_bins = num_bins
+        self.bin_deg = 360.0 / num_bins
+        self.half_life = half_life  # 기억이 절반으로 줄어드는 시간 (초)
+        self.fov_deg = fov_deg  # 카메라 수평 화각 (도)
+        self.bins = np.zeros(num_bins, dtype=np.float32)  # 세계 기준 방위각별 장애물 근접도
+        self.bin_centers = (np.arange(num_bins, dtype=np.float32) + 0.5) * self.bin_deg
+        self.last_update = None
+
+    def _relative_angles(self, head_yaw):
+        """현재 머리 방향 기준 각 방위각 칸의 상대 각도 (-180~180도)"""
+        return (self.bin_centers - head_yaw + 180.0) % 360.0 - 180.0
+
+    def decay(self, now=None):
+        """마지막 갱신 이후 경과 시간만큼 기억을 감쇠시킵니다."""
+        now = time.monotonic() if now is None else now
+        if self.last_update is not None:
+            self.bins *= np.float32(0.5 ** ((now - self.last_update) / self.half_life))
+        self.last_update = now
+
+    def update(self, column_occupancy, head_yaw, now=None):
+        """시야를 나눈 열별 장애물 근접도 (왼쪽 -> 오른쪽)로 시야 안의 방위각을 갱신합니다."""
+        self.decay(now)
+        column_occupancy = np.asarray(column_occupancy, dtype=np.float32)
+        rel = self._relative_angles(head_yaw)
+        visible = np.abs(rel) < self.fov_deg / 2
+        n = column_occupancy.shape[0]
+        cols = ((rel[visible] + self.fov_deg / 2) / self.fov_deg * n).astype(int).clip(0, n - 1)
+        self.bins[visible] = column_occupancy[cols]
+
+    def occupancy(self, head_yaw, start_deg, end_deg, now=None):
+        """현재 머리 방향 기준 [start_deg, end_deg] 구간의 최대 장애물 근접도"""
+        self.decay(now)
+        rel = self._relative_angles(head_yaw)
+        in_range = (rel >= start_deg) & (rel <= end_deg)
+        return float(self.bins[in_range].max()) if in_range.any() else 0.0
+
+    def is_safe(self, direction, head_yaw, threshold=0.8, span=(20.0, 90.0), now=None):
+        """'left' 또는 'right'로 span 각도만큼 돌아도 안전한지 기억으로 판단합니다."""
+        if direction == 'left':
+            start, end = -span[1], -span[0]
+        else:
+            start, end = span[0], span[1]
+        return self.occupancy(head_yaw, start, end, now) < threshold
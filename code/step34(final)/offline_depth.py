@@ -0,0 +1,108 @@
+import argparse
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from test_depth import process_depth_sections, section_means, setup_depth_model
+
+# 판단 결과 코드 (npz의 decisions 배열)
+DECISION_LABELS = ("none", "Avoid to Left", "Avoid to Right", "tie")
+
+
+def read_video(path, stride=1, max_queue=64):
+    """별도 스레드에서 영상을 디코딩해 (프레임 번호, 타임스탬프 ms, 프레임)을 내보냅니다. 디코딩과 추론이 겹쳐 실행됩니다."""
+    frames = queue.Queue(maxsize=max_queue)
+    done = object()
+
+    def reader():
+        cap = cv2.VideoCapture(str(path))
+        index = 0
+        try:
+            while cap.grab():
+                if index % stride == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    frames.put((index, cap.get(cv2.CAP_PROP_POS_MSEC), frame))
+                index += 1
+        finally:
+            cap.release()
+            frames.put(done)
+
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        item = frames.get()
+        if item is done:
+            return
+        yield item
+
+
+def analyze_video(processor, path, batch_size=8, stride=1, num_rows=5, num_cols=5,
+                  threshold=0.85, region='full'):
+    """영상 전체를 배치 추론해 프레임별 섹션 평균 격자와 회피 판단을 배열로 모읍니다."""
+    indices, timestamps, grids, decisions = [], [], [], []
+    batch_inputs = []
+
+    def flush():
+        for result in processor.process_batch(batch_inputs):
+            depth_map = processor.normalize_minmax(result)
+            means, _ = section_means(depth_map, num_rows, num_cols, region)
+            decision = process_depth_sections(depth_map, num_rows, num_cols, threshold, region, tie_break="tie")
+            grids.append(means.astype(np.float16))
+            decisions.append(0 if decision is None else DECISION_LABELS.index(decision))
+        batch_inputs.clear()
+
+    for index, timestamp, frame in read_video(path, stride, max_queue=batch_size * 4):
+        indices.append(index)
+        timestamps.append(timestamp)
+        batch_inputs.append(processor.preprocess(frame))
+        if len(batch_inputs) == batch_size:
+            flush()
+    if batch_inputs:
+        flush()
+
+    return {
+        'frame_index': np.asarray(indices, dtype=np.int32),
+        'timestamp_ms': np.asarray(timestamps, dtype=np.float64),
+        'grid': np.asarray(grids, dtype=np.float16).reshape(-1, num_rows, num_cols),
+        'decisions': np.asarray(decisions, dtype=np.int8),
+        'decision_labels': np.asarray(DECISION_LABELS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화 영상 오프라인 뎁스 분석 (배치 추론)")
+    parser.add_argument("videos", nargs="+", help="분석할 영상 파일")
+    parser.add_argument("--output-dir", default="depth_analysis")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--stride", type=int, default=1, help="N 프레임마다 하나씩 분석")
+    parser.add_argument("--device", default="CPU", help="OpenVINO 장치 (CPU, GPU, ...)")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--region", default="full", choices=["full", "corridor"])
+    args = parser.parse_args()
+
+    processor = setup_depth_model(device=args.device, performance_hint="THROUGHPUT")
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for video in args.videos:
+        start = time.perf_counter()
+        result = analyze_video(processor, video, args.batch_size, args.stride,
+                               threshold=args.threshold, region=args.region)
+        elapsed = time.perf_counter() - start
+
+        output_path = output_dir / f"{Path(video).stem}_depth.npz"
+        np.savez_compressed(output_path, **result)
+
+        count = len(result['frame_index'])
+        duration = result['timestamp_ms'][-1] / 1000 if count else 0.0
+        print(f"{video}: {count} frames in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.1f} FPS, "
+              f"x{duration / max(elapsed, 1e-9):.1f} real time) -> {output_path}")
+
+
+if __name__ == "__main__":
+    main()
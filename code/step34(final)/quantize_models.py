@@ -0,0 +1,311 @@
+import argparse
+import json
+import shutil
+import time
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import nncf
+import openvino as ov
+
+from model_registry import MANIFEST_PATH, MODULE_DIR, file_sha256, get_variant, load_manifest, variant_files
+from session_recorder import SessionReader
+from test_depth import download_midas_model, process_depth_sections
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _video_frames(video, indices):
+    """영상에서 indices (오름차순) 프레임만 디코딩합니다. 나머지는 grab()으로 건너뜁니다."""
+    cap = cv2.VideoCapture(str(video))
+    frames, position = [], 0
+    for index in indices:
+        while position < index and cap.grab():
+            position += 1
+        ret, frame = cap.read()
+        if not ret:
+            break
+        position += 1
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _video_frame_count(video):
+    cap = cv2.VideoCapture(str(video))
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if count <= 0:  # 메타데이터가 없는 컨테이너: 디코딩 결과를 저장하지 않고 세기만 함
+        count = 0
+        while cap.grab():
+            count += 1
+    cap.release()
+    return count
+
+
+def _zip_images(archive, names):
+    with zipfile.ZipFile(archive) as zf:
+        return [cv2.imdecode(np.frombuffer(zf.read(name), dtype=np.uint8), cv2.IMREAD_COLOR) for name in names]
+
+
+def load_calibration_frames(videos=(), image_dirs=(), zips=(), sessions=(), max_frames=300):
+    """녹화 영상, 이미지 폴더, 이미지 압축 파일 (예: cider/cider.zip), 기록 세션 (session_recorder)에서
+    보정용 프레임을 고르게 모읍니다.
+
+    먼저 소스별 프레임 수만 세어 전체에서 max_frames개의 위치를 고른 뒤, 고른 프레임만 디코딩합니다.
+    (긴 녹화도 max_frames개 분량의 메모리만 사용)
+    """
+    sources = []  # (프레임 수, 고른 위치 목록 -> 프레임 목록)
+    for video in videos:
+        sources.append((_video_frame_count(video), lambda idx, video=video: _video_frames(video, idx)))
+    for image_dir in image_dirs:
+        paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        sources.append((len(paths), lambda idx, paths=paths: [cv2.imread(str(paths[i])) for i in idx]))
+    for archive in zips:
+        with zipfile.ZipFile(archive) as zf:
+            names = sorted(name for name in zf.namelist() if name.lower().endswith(IMAGE_EXTENSIONS))
+        sources.append((len(names), lambda idx, archive=archive, names=names: _zip_images(archive, [names[i] for i in idx])))
+    for session in sessions:
+        reader = SessionReader(session)
+        seqs = reader.frame_indices
+        sources.append((len(seqs), lambda idx, reader=reader, seqs=seqs: [reader.frame(int(seqs[i]))[0] for i in idx]))
+
+    total = sum(count for count, _ in sources)
+    if total == 0:
+        raise ValueError("보정용 프레임을 찾을 수 없습니다.")
+    selected = np.unique(np.linspace(0, total - 1, min(max_frames, total)).astype(int))
+
+    frames, offset = [], 0
+    for count, load in sources:
+        local = selected[(selected >= offset) & (selected < offset + count)] - offset
+        if len(local):
+            frames += load([int(i) for i in local])
+        offset += count
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        raise ValueError("보정용 프레임을 디코딩할 수 없습니다.")
+    return frames
+
+
+def depth_input(frame, size):
+    """DepthProcessor와 같은 방식의 MiDaS 입력 (1, 3, H, W)"""
+    resized = cv2.resize(frame, (size, size))
+    return np.expand_dims(np.transpose(resized, (2, 0, 1)), 0).astype(np.float32)
+
+
+def yolo_input(frame, size):
+    """YOLO OpenVINO 모델 입력 (RGB, 0~1, 1x3xHxW)"""
+    resized = cv2.resize(frame, (size, size))
+    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    return np.expand_dims(np.transpose(rgb, (2, 0, 1)), 0).astype(np.float32) / 255.0
+
+
+def quantize_depth(frames, output_path, subset_size):
+    """MiDaS IR을 NNCF로 INT8 양자화합니다."""
+    fp32_path = download_midas_model()
+    model = ov.Core().read_model(fp32_path)
+    size = model.input(0).shape[2]
+    dataset = nncf.Dataset(frames, lambda frame: depth_input(frame, size))
+    quantized = nncf.quantize(model, dataset, subset_size=min(subset_size, len(frames)))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    ov.save_model(quantized, output_path)
+    print(f"INT8 depth model saved at: {output_path}")
+    return fp32_path, output_path
+
+
+def quantize_detector(frames, pt_path, imgsz, subset_size):
+    """YOLO 체크포인트를 OpenVINO로 내보낸 뒤 NNCF로 INT8 양자화합니다. (float, int8 모델 폴더 반환)"""
+    from ultralytics import YOLO
+
+    float_dir = Path(YOLO(str(pt_path)).export(format="openvino", imgsz=imgsz))
+    model_xml = next(float_dir.glob("*.xml"))
+    model = ov.Core().read_model(model_xml)
+    dataset = nncf.Dataset(frames, lambda frame: yolo_input(frame, imgsz))
+    quantized = nncf.quantize(
+        model, dataset,
+        subset_size=min(subset_size, len(frames)),
+        preset=nncf.QuantizationPreset.MIXED,
+        # 검출 헤드의 좌표 디코딩 연산은 FP로 유지
+        ignored_scope=nncf.IgnoredScope(types=["Multiply", "Subtract", "Sigmoid"]),
+    )
+
+    int8_dir = float_dir.with_name(float_dir.name.replace("_openvino_model", "_int8_openvino_model"))
+    int8_dir.mkdir(exist_ok=True)
+    ov.save_model(quantized, int8_dir / model_xml.name)
+    for extra in float_dir.glob("*.yaml"):  # ultralytics 메타데이터
+        shutil.copy(extra, int8_dir / extra.name)
+    print(f"INT8 detection model saved at: {int8_dir}")
+    return float_dir, int8_dir
+
+
+def timed(fn, frames):
+    """프레임별 결과와 평균 지연 (ms)"""
+    outputs, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.append(fn(frame))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, float(np.mean(latencies))
+
+
+def compare_depth(fp32_path, int8_path, frames, device="CPU"):
+    """FP32/INT8 뎁스 모델의 지연과 정규화 뎁스 맵 오차, 회피 판단 일치율을 비교합니다."""
+    core = ov.Core()
+    results = {}
+    for label, path in (("fp32", fp32_path), ("int8", int8_path)):
+        compiled = core.compile_model(core.read_model(path), device)
+        size = compiled.input(0).shape[2]
+        output_key = compiled.output(0)
+
+        def infer(frame):
+            result = compiled([depth_input(frame, size)])[output_key].squeeze(0)
+            return (result - result.min()) / (result.max() - result.min())
+
+        results[label] = timed(infer, frames)
+
+    (fp32_maps, fp32_ms), (int8_maps, int8_ms) = results["fp32"], results["int8"]
+    errors = [float(np.abs(a - b).mean()) for a, b in zip(fp32_maps, int8_maps)]
+    agree = [
+        process_depth_sections(a, threshold=0.8, tie_break="tie") == process_depth_sections(b, threshold=0.8, tie_break="tie")
+        for a, b in zip(fp32_maps, int8_maps)
+    ]
+    return {
+        'fp32_ms': fp32_ms, 'int8_ms': int8_ms,
+        'mean_abs_error': float(np.mean(errors)), 'decision_agreement': float(np.mean(agree)),
+    }
+
+
+def box_iou(a, b):
+    """(N, 4), (M, 4) xyxy 박스의 IoU 행렬"""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def compare_detector(float_dir, int8_dir, frames, imgsz):
+    """float/INT8 YOLO의 지연과, float 결과를 기준으로 한 INT8 감지의 정밀도/재현율을 비교합니다."""
+    from ultralytics import YOLO
+
+    results = {}
+    for label, model_dir in (("fp32", float_dir), ("int8", int8_dir)):
+        model = YOLO(str(model_dir), task="detect")
+
+        def infer(frame):
+            boxes = model(frame, imgsz=imgsz, verbose=False)[0].boxes
+            return boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
+
+        infer(frames[0])  # 워밍업
+        results[label] = timed(infer, frames)
+
+    (ref, fp32_ms), (test, int8_ms) = results["fp32"], results["int8"]
+    matched = ref_total = test_total = 0
+    for (ref_boxes, ref_cls), (test_boxes, test_cls) in zip(ref, test):
+        ref_total += len(ref_boxes)
+        test_total += len(test_boxes)
+        if len(ref_boxes) and len(test_boxes):
+            iou = box_iou(ref_boxes, test_boxes) * (ref_cls[:, None] == test_cls[None, :])
+            matched += int((iou.max(axis=1) >= 0.5).sum())
+    return {
+        'fp32_ms': fp32_ms, 'int8_ms': int8_ms,
+        'precision': matched / test_total if test_total else 1.0,
+        'recall': matched / ref_total if ref_total else 1.0,
+    }
+
+
+def register_variants(depth_report=None, depth_path=None, detection_report=None, detection_dir=None, imgsz=640):
+    """INT8 모델을 모델 레지스트리에 등록합니다. 정확도 순위는 float 대비 일치율로 낮춥니다."""
+    manifest = load_manifest()
+
+    def upsert(task, entry):
+        manifest[task] = [v for v in manifest[task] if v['name'] != entry['name']] + [entry]
+
+    if depth_report is not None:
+        base = get_variant("depth", manifest=manifest)
+        entry = {
+            'name': "MiDaS_small_int8", 'backend': "openvino", 'path': str(depth_path), 'url': None,
+            'input_size': base['input_size'], 'precision': "INT8",
+            'accuracy': round(base['accuracy'] * depth_report['decision_agreement'], 3),
+        }
+        entry['sha256'] = {p.name: file_sha256(p) for p in variant_files("depth", entry)}  # 방금 만든 .xml/.bin 고정
+        upsert("depth", entry)
+    if detection_report is not None:
+        base = get_variant("detection", manifest=manifest)
+        upsert("detection", {
+            'name': f"{Path(detection_dir).name}_{imgsz}", 'path': str(Path(detection_dir).relative_to(MODULE_DIR)),
+            'url': None, 'input_size': imgsz, 'precision': "INT8", 'sha256': {},
+            'accuracy': round(base['accuracy'] * detection_report['recall'], 3),
+        })
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+def format_report(depth_report, detection_report):
+    lines = ["INT8 quantization report", ""]
+    if depth_report:
+        r = depth_report
+        lines += [
+            "[MiDaS_small]",
+            f"  latency  FP32 {r['fp32_ms']:.1f} ms -> INT8 {r['int8_ms']:.1f} ms (x{r['fp32_ms'] / r['int8_ms']:.2f})",
+            f"  depth map mean abs error (normalized): {r['mean_abs_error']:.4f}",
+            f"  avoid decision agreement: {r['decision_agreement'] * 100:.1f}%",
+            "",
+        ]
+    if detection_report:
+        r = detection_report
+        lines += [
+            "[YOLO]",
+            f"  latency  FP32 {r['fp32_ms']:.1f} ms -> INT8 {r['int8_ms']:.1f} ms (x{r['fp32_ms'] / r['int8_ms']:.2f})",
+            f"  detections vs FP32: precision {r['precision'] * 100:.1f}%, recall {r['recall'] * 100:.1f}%",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MiDaS / YOLO INT8 사후 양자화 (NNCF)")
+    parser.add_argument("--video", nargs="*", default=[], help="녹화 영상 파일")
+    parser.add_argument("--images", nargs="*", default=[], help="이미지 폴더")
+    parser.add_argument("--zip", nargs="*", default=[], help="이미지 압축 파일 (예: ../../cider/cider.zip)")
+    parser.add_argument("--session", nargs="*", default=[], help="session_recorder로 기록한 세션 폴더")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--subset-size", type=int, default=300, help="NNCF 보정 샘플 수")
+    parser.add_argument("--eval-ratio", type=float, default=0.2, help="비교 평가용으로 떼어 둘 프레임 비율")
+    parser.add_argument("--skip-depth", action="store_true")
+    parser.add_argument("--skip-detector", action="store_true")
+    parser.add_argument("--yolo", default="best_v4.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--register", action="store_true", help="INT8 모델을 model_registry.json에 등록")
+    parser.add_argument("--report", default="quantization_report.txt")
+    args = parser.parse_args()
+
+    frames = load_calibration_frames(args.video, args.images, args.zip, args.session, args.max_frames)
+    n_eval = max(1, int(len(frames) * args.eval_ratio))
+    calib_frames, eval_frames = frames[:-n_eval] or frames, frames[-n_eval:]
+    print(f"Calibration frames: {len(calib_frames)}, evaluation frames: {len(eval_frames)}")
+
+    depth_report = detection_report = None
+    depth_int8 = detection_int8 = None
+    if not args.skip_depth:
+        fp32_path, depth_int8 = quantize_depth(calib_frames, Path("model/midas/MiDaS_small_int8.xml"), args.subset_size)
+        depth_report = compare_depth(fp32_path, depth_int8, eval_frames)
+    if not args.skip_detector:
+        float_dir, detection_int8 = quantize_detector(calib_frames, MODULE_DIR / args.yolo, args.imgsz, args.subset_size)
+        detection_report = compare_detector(float_dir, detection_int8, eval_frames, args.imgsz)
+
+    report = format_report(depth_report, detection_report)
+    print(report)
+    Path(args.report).write_text(report, encoding="utf-8")
+
+    if args.register:
+        register_variants(depth_report, depth_int8, detection_report, detection_int8, args.imgsz)
+        print(f"Registered INT8 variants in {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
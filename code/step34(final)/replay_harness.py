@@ -0,0 +1,251 @@
+import argparse
+import contextlib
+import difflib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cascade import CascadeScheduler, gate_allows, cascade_signal
+from detection_history import DetectionHistory
+from hand_engine import empty_hand_arrays
+from model_registry import get_variant
+from motion import MotionEstimator
+from session_recorder import SessionReader
+from test_detect import YOLODetector
+from test_hand import HandDetection
+from test_main import create_depth_with_tts
+from tts import TextToSpeech, FlagMonitor
+
+STAGES = ('depth', 'hand', 'yolo')
+
+
+class VirtualClock:
+    """기록된 프레임 타임스탬프를 현재 시각으로 돌려주는 가상 시계 (clock 인자로 전달)"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, timestamp):
+        self.now = max(self.now, timestamp)  # 단조 증가 유지
+
+
+class VirtualSpeaker:
+    """TextToSpeech 큐를 가상 시계 기준으로 소비합니다.
+
+    발화 시간은 글자 수로 근사하고 (pyttsx3 rate 150 기준), 메시지 사이에 _process_queue와 같은 0.5초 간격을 둡니다.
+    """
+
+    def __init__(self, tts, clock, seconds_per_char=0.07, gap=0.5):
+        self.tts = tts
+        self.clock = clock
+        self.seconds_per_char = seconds_per_char
+        self.gap = gap
+        self.speaking_until = 0.0
+        self.next_start = 0.0
+
+    def update(self):
+        """이번 시각에 발화를 시작한 메시지를 반환합니다. (없으면 None)"""
+        now = self.clock()
+        self.tts.is_tts_busy = now < self.speaking_until
+        if now < self.next_start or self.tts.queue.empty():
+            return None
+        text = self.tts.queue.get_nowait()
+        self.speaking_until = now + len(text) * self.seconds_per_char
+        self.next_start = self.speaking_until + self.gap
+        self.tts.is_tts_busy = True
+        return text
+
+
+def replay(session_path, depth_threshold=0.8, pinky_threshold=None, max_frames=None, quiet=True):
+    """기록된 세션을 고정된 프레임 순서와 가상 시계로 전체 파이프라인에 통과시킵니다.
+
+    반환: {'frames', 'events': [[프레임 번호, 종류, 내용], ...], 'latency': {단계: 지연 통계}}
+    종류는 'decision' (회피 판단이 바뀐 순간), 'catch' (on/off), 'announcement' (TTS 발화)입니다.
+    """
+    random.seed(0)  # 좌우 동점 무작위 판단 고정
+    np.random.seed(0)
+    reader = SessionReader(session_path)
+    clock = VirtualClock()
+
+    tts = TextToSpeech(clock=clock, speak_aloud=False)
+    speaker = VirtualSpeaker(tts, clock)
+    depth_with_tts = create_depth_with_tts(tts, get_variant("depth"), threshold=depth_threshold, clock=clock)
+    history = DetectionHistory(capacity=512)
+    detection_variant = get_variant("detection")
+    detector = YOLODetector(
+        model_path=detection_variant['path'], imgsz=detection_variant['input_size'], history=history
+    )
+    hand_detection = HandDetection()
+    if pinky_threshold is not None:
+        hand_detection.PINKY_THRESHOLD = pinky_threshold
+    flag_monitor = FlagMonitor(tts, history=history, redirect_stdout=False)  # 아래에서 stdout으로 직접 연결
+    motion = MotionEstimator()
+    shared_data = {'frame': None, 'running': True, 'scheduler': CascadeScheduler(clock=clock)}
+
+    events = []
+    latencies = {stage: [] for stage in STAGES}
+    last_decision = None
+    last_catch = False
+    frames = 0
+
+    # 실제 파이프라인처럼 단계 출력 (catch / class detect flag 문구)을 FlagMonitor가 파싱해 플래그를 설정
+    flag_monitor.original_stdout = io.StringIO() if quiet else sys.stdout  # 단계별 터미널 출력 숨김
+    with contextlib.redirect_stdout(flag_monitor):
+        for seq, frame, timestamp in reader.frames():
+            if max_frames is not None and frames >= max_frames:
+                break
+            frames += 1
+            clock.set(timestamp)
+            shared_data.update(frame=frame, frame_seq=seq, frame_time=timestamp)
+            motion.publish(frame, shared_data)
+
+            # 뎁스: 회피 판단
+            if gate_allows(shared_data, 'depth'):
+                start = time.perf_counter()
+                decision, _ = depth_with_tts.step(frame.copy(), shared_data)
+                latencies['depth'].append(time.perf_counter() - start)
+                if decision != last_decision:
+                    events.append([seq, 'decision', decision])
+                    last_decision = decision
+
+            # 손: 잡기 상태
+            if gate_allows(shared_data, 'hand'):
+                start = time.perf_counter()
+                detection = hand_detection.detect(frame.copy(), timestamp * 1000)
+                if detection is not None:
+                    landmarks, handedness, _ = detection
+                    hand_detection.update_grasp(landmarks, handedness, timestamp)
+                    if len(landmarks):
+                        cascade_signal(shared_data, 'hand')
+                latencies['hand'].append(time.perf_counter() - start)
+            else:
+                landmarks, handedness, _ = empty_hand_arrays()
+                hand_detection.update_grasp(landmarks, handedness, timestamp)
+
+            # YOLO: 감지 이력과 감지 플래그 (YOLODetector.update_detection_flag, 가상 시계 기준 만료)
+            detected = False
+            if gate_allows(shared_data, 'yolo'):
+                start = time.perf_counter()
+                _, _, classes, scores, frame_boxes = detector.detect_frame(frame.copy())
+                detector.frame_count += 1
+                history.extend(detector.frame_count, classes, scores, frame_boxes, timestamp)
+                latencies['yolo'].append(time.perf_counter() - start)
+                if len(classes):
+                    cascade_signal(shared_data, 'object')
+                    detected = True
+            detector.update_detection_flag(detected, timestamp)
+
+            # 플래그 모니터와 음성 출력
+            if hand_detection.catch_flag != last_catch:
+                last_catch = hand_detection.catch_flag
+                events.append([seq, 'catch', "on" if last_catch else "off"])
+            flag_monitor.update(timestamp)
+            spoken = speaker.update()
+            if spoken:
+                events.append([seq, 'announcement', spoken])
+
+    hand_detection.engine.close()
+    return {
+        'frames': frames,
+        'events': events,
+        'latency': {stage: latency_stats(values) for stage, values in latencies.items()},
+    }
+
+
+def latency_stats(seconds):
+    """단계 지연 통계 (ms)"""
+    if not seconds:
+        return {'runs': 0, 'mean_ms': None, 'p95_ms': None}
+    values = np.asarray(seconds) * 1000
+    return {'runs': len(values), 'mean_ms': float(values.mean()), 'p95_ms': float(np.percentile(values, 95))}
+
+
+def diff_events(golden, actual):
+    """골든 이벤트와 리플레이 이벤트의 차이 (unified diff 줄 목록, 같으면 빈 목록)"""
+    def lines(events):
+        return [f"{seq:>6} {kind:<12} {text}" for seq, kind, text in events]
+    return list(difflib.unified_diff(lines(golden), lines(actual), "golden", "replay", n=1, lineterm=""))
+
+
+def compare_latency(baseline, latency, tolerance=0.2):
+    """기준 대비 단계별 평균 지연 변화. (stage, 기준 ms, 현재 ms, 변화율, 회귀 여부) 목록"""
+    rows = []
+    for stage in STAGES:
+        base = baseline.get(stage, {}).get('mean_ms')
+        now = latency[stage]['mean_ms']
+        if base is None or now is None:
+            continue
+        delta = now / base - 1.0
+        rows.append((stage, base, now, delta, delta > tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기록된 세션 리플레이 회귀 검사 (판단/잡기/안내 골든 비교와 단계별 지연)")
+    parser.add_argument("sessions", nargs="+", help="session_recorder로 기록한 세션 폴더")
+    parser.add_argument("--golden-dir", default="golden", help="세션별 골든 출력 폴더 (<세션 이름>.json)")
+    parser.add_argument("--update-golden", action="store_true", help="현재 결과로 골든 출력을 갱신")
+    parser.add_argument("--baseline", default="golden/latency_baseline.json", help="단계별 지연 기준 파일")
+    parser.add_argument("--update-baseline", action="store_true", help="현재 지연으로 기준을 갱신")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용하는 평균 지연 증가율")
+    parser.add_argument("--depth-threshold", type=float, default=0.8)
+    parser.add_argument("--pinky-threshold", type=float, default=None)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="단계별 터미널 출력 표시")
+    args = parser.parse_args()
+
+    golden_dir = Path(args.golden_dir)
+    if args.update_golden:
+        golden_dir.mkdir(parents=True, exist_ok=True)
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+
+    failed = False
+    for session in args.sessions:
+        name = Path(session).name
+        result = replay(session, args.depth_threshold, args.pinky_threshold, args.max_frames, quiet=not args.verbose)
+        print(f"[{name}] {result['frames']} frames, {len(result['events'])} events")
+
+        golden_path = golden_dir / f"{name}.json"
+        if args.update_golden:
+            golden_path.write_text(json.dumps({'events': result['events']}, ensure_ascii=False, indent=1), encoding="utf-8")
+            print(f"  golden saved: {golden_path}")
+        elif not golden_path.exists():
+            failed = True
+            print(f"  GOLDEN MISSING: {golden_path} (--update-golden으로 생성)")
+        else:
+            golden = json.loads(golden_path.read_text(encoding="utf-8"))['events']
+            diff = diff_events(golden, result['events'])
+            if diff:
+                failed = True
+                print(f"  BEHAVIOR CHANGED ({golden_path}):")
+                for line in diff[:40]:
+                    print(f"    {line}")
+            else:
+                print("  behavior: match")
+
+        if name not in baseline and not args.update_baseline:
+            print(f"  latency: no baseline for {name} (--update-baseline으로 기록)")
+        for stage, base, now, delta, regressed in compare_latency(baseline.get(name, {}), result['latency'], args.tolerance):
+            failed |= regressed
+            print(f"  {stage:<6} {base:7.1f} ms -> {now:7.1f} ms ({delta * 100:+.0f}%){'  REGRESSION' if regressed else ''}")
+        if args.update_baseline:
+            baseline[name] = result['latency']
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baseline, indent=1), encoding="utf-8")
+        print(f"Latency baseline saved: {baseline_path}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
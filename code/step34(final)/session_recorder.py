@@ -0,0 +1,256 @@
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 세션 폴더 구조
+#   meta.json                     세션 설정 (청크 크기, 프레임/뎁스 저장 형식)
+#   chunk_00000/                  chunk_size 프레임마다 하나 (완성된 청크만 이름이 바뀌어 보임)
+#     frame_index.npy, timestamps.npy     프레임 번호, 원본 타임스탬프 (초)
+#     frames.npy                          원본 프레임 (N, H, W, 3) uint8          - jpeg_quality가 None일 때
+#     frames.bin, frame_offsets.npy       JPEG 바이트를 이어 붙인 파일과 오프셋 (N + 1) - JPEG 압축일 때
+#     depth_index.npy, depth.npy          정규화 뎁스 맵 (M, h, w) uint16 또는 float16
+#     hands_index.npy, hands.npy, handedness.npy    손 랜드마크 (K, 21, 3), 손 구분 (K,)
+#     detections_index.npy, detections.npy          YOLO 감지 (D, 6): cls, conf, x1, y1, x2, y2
+#     events.json                         [프레임 번호, 기록 시각, 종류, 내용] 목록 (판단, TTS 등)
+# .npy 배열은 np.load(mmap_mode='r')로, frames.bin은 np.memmap으로 필요한 부분만 읽습니다.
+
+STREAMS = ('depth', 'hands', 'detections')
+
+
+class SessionRecorder:
+    """프레임과 단계별 출력을 백그라운드 스레드에서 청크 단위로 저장하는 세션 기록기
+
+    record()는 배열 참조를 큐에 넣기만 하므로 파이프라인 지연이 거의 없고, 큐는 크기 제한이 없어
+    프레임을 버리지 않습니다. 기록한 배열은 이후에 수정하지 않아야 합니다.
+    """
+
+    def __init__(self, path, chunk_size=64, jpeg_quality=90, depth_size=(256, 256), depth_dtype="uint16"):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.jpeg_quality = jpeg_quality  # None이면 원본 그대로 저장
+        self.depth_size = depth_size  # 뎁스 맵 저장 해상도 (width, height), 스크리닝 맵도 같은 크기로 맞춤
+        self.depth_dtype = depth_dtype  # "uint16" (0~1을 0~65535로) 또는 "float16"
+        self.last_seq = -1  # 마지막으로 기록한 프레임 번호 (프레임 번호를 모르는 TTS 이벤트에 사용)
+
+        meta = {
+            'chunk_size': chunk_size, 'jpeg_quality': jpeg_quality,
+            'depth_size': list(depth_size), 'depth_dtype': depth_dtype, 'created': time.time(),
+        }
+        (self.path / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        self.queue = queue.Queue()
+        self.chunk_id = 0
+        self._new_chunk()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def record(self, stream, seq, *payload):
+        """stream: 'frame' (timestamp, frame), 'depth' (depth_map), 'hands' (landmarks, handedness),
+        'detections' (classes, scores, boxes), 'event' (kind, text)"""
+        if seq is None:
+            seq = self.last_seq
+        elif stream == 'frame':
+            self.last_seq = seq
+        self.queue.put((stream, seq, time.time(), payload))
+
+    @property
+    def pending(self):
+        """아직 저장되지 않은 기록 수"""
+        return self.queue.qsize()
+
+    def close(self):
+        """남은 기록을 모두 저장하고 기록 스레드를 종료합니다."""
+        self.queue.put(None)
+        self.writer.join()
+
+    def _new_chunk(self):
+        self.chunk = {
+            'frame_index': [], 'timestamps': [], 'frames': [], 'events': [],
+            **{f"{name}_index": [] for name in STREAMS}, **{name: [] for name in STREAMS}, 'handedness': [],
+        }
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            stream, seq, wall_time, payload = item
+            chunk = self.chunk
+            if stream == 'frame':
+                timestamp, frame = payload
+                chunk['frame_index'].append(seq)
+                chunk['timestamps'].append(timestamp)
+                if self.jpeg_quality is None:
+                    chunk['frames'].append(frame)
+                else:
+                    _, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    chunk['frames'].append(data.tobytes())
+            elif stream == 'depth':
+                depth_map = cv2.resize(np.asarray(payload[0], dtype=np.float32), self.depth_size)
+                if self.depth_dtype == "uint16":
+                    depth_map = np.round(np.clip(depth_map, 0.0, 1.0) * 65535).astype(np.uint16)
+                chunk['depth_index'].append(seq)
+                chunk['depth'].append(depth_map.astype(self.depth_dtype))
+            elif stream == 'hands':
+                landmarks, handedness = payload
+                chunk['hands_index'].extend([seq] * len(landmarks))
+                chunk['hands'].extend(np.asarray(landmarks, dtype=np.float32))
+                chunk['handedness'].extend(handedness)
+            elif stream == 'detections':
+                classes, scores, boxes = payload
+                chunk['detections_index'].extend([seq] * len(classes))
+                chunk['detections'].extend(np.column_stack((classes, scores, boxes)).astype(np.float32))
+            elif stream == 'event':
+                kind, text = payload
+                chunk['events'].append([seq, wall_time, kind, text])
+
+            if len(chunk['frame_index']) >= self.chunk_size:
+                self._flush()
+        self._flush()
+
+    def _flush(self):
+        """현재 청크를 임시 폴더에 쓰고 완성되면 이름을 바꿉니다."""
+        chunk = self.chunk
+        if not chunk['frame_index'] and not chunk['events'] and not any(chunk[name] for name in STREAMS):
+            return
+        final_dir = self.path / f"chunk_{self.chunk_id:05d}"
+        tmp_dir = final_dir.with_suffix(".tmp")
+        tmp_dir.mkdir(exist_ok=True)
+
+        np.save(tmp_dir / "frame_index.npy", np.asarray(chunk['frame_index'], dtype=np.int64))
+        np.save(tmp_dir / "timestamps.npy", np.asarray(chunk['timestamps'], dtype=np.float64))
+        if self.jpeg_quality is None:
+            if chunk['frames']:
+                np.save(tmp_dir / "frames.npy", np.stack(chunk['frames']))
+        else:
+            offsets = np.zeros(len(chunk['frames']) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(data) for data in chunk['frames']])
+            np.save(tmp_dir / "frame_offsets.npy", offsets)
+            with open(tmp_dir / "frames.bin", "wb") as f:
+                for data in chunk['frames']:
+                    f.write(data)
+
+        shapes = {'depth': (0, self.depth_size[1], self.depth_size[0]), 'hands': (0, 21, 3), 'detections': (0, 6)}
+        dtypes = {'depth': self.depth_dtype, 'hands': np.float32, 'detections': np.float32}
+        for name in STREAMS:
+            np.save(tmp_dir / f"{name}_index.npy", np.asarray(chunk[f"{name}_index"], dtype=np.int64))
+            data = np.stack(chunk[name]) if chunk[name] else np.empty(shapes[name], dtype=dtypes[name])
+            np.save(tmp_dir / f"{name}.npy", data)
+        np.save(tmp_dir / "handedness.npy", np.asarray(chunk['handedness'], dtype='<U5'))
+        (tmp_dir / "events.json").write_text(json.dumps(chunk['events'], ensure_ascii=False), encoding="utf-8")
+
+        tmp_dir.rename(final_dir)
+        self.chunk_id += 1
+        self._new_chunk()
+
+
+class SessionReader:
+    """기록된 세션을 전체를 읽지 않고 프레임 번호로 임의 접근합니다."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.chunk_dirs = sorted(self.path.glob("chunk_?????"))
+        self._arrays = {}
+
+        # 스트림별 (프레임 번호, 청크, 청크 내 행) 색인 - 작은 색인 배열만 읽음
+        self.index = {}
+        for name, index_file in (('frames', "frame_index.npy"),
+                                 *((name, f"{name}_index.npy") for name in STREAMS)):
+            seqs, chunks, rows = [], [], []
+            for chunk_id, chunk_dir in enumerate(self.chunk_dirs):
+                seq = np.load(chunk_dir / index_file)
+                seqs.append(seq)
+                chunks.append(np.full(len(seq), chunk_id, dtype=np.int32))
+                rows.append(np.arange(len(seq), dtype=np.int64))
+            seq = np.concatenate(seqs) if seqs else np.empty(0, dtype=np.int64)
+            order = np.argsort(seq, kind='stable')
+            self.index[name] = (
+                seq[order],
+                np.concatenate(chunks)[order] if chunks else np.empty(0, dtype=np.int32),
+                np.concatenate(rows)[order] if rows else np.empty(0, dtype=np.int64),
+            )
+
+    def __len__(self):
+        return len(self.index['frames'][0])
+
+    @property
+    def frame_indices(self):
+        """기록된 프레임 번호 (오름차순)"""
+        return self.index['frames'][0]
+
+    def _array(self, chunk_id, name):
+        key = (chunk_id, name)
+        if key not in self._arrays:
+            self._arrays[key] = np.load(self.chunk_dirs[chunk_id] / f"{name}.npy", mmap_mode='r')
+        return self._arrays[key]
+
+    def _rows(self, name, seq):
+        seqs, chunks, rows = self.index[name]
+        start, end = np.searchsorted(seqs, seq, 'left'), np.searchsorted(seqs, seq, 'right')
+        return list(zip(chunks[start:end], rows[start:end]))
+
+    def frame(self, seq):
+        """(프레임, 원본 타임스탬프)를 반환합니다. 없으면 KeyError"""
+        rows = self._rows('frames', seq)
+        if not rows:
+            raise KeyError(f"기록되지 않은 프레임입니다: {seq}")
+        chunk_id, row = rows[0]
+        timestamp = float(self._array(chunk_id, "timestamps")[row])
+        if self.meta['jpeg_quality'] is None:
+            return np.array(self._array(chunk_id, "frames")[row]), timestamp
+
+        offsets = self._array(chunk_id, "frame_offsets")
+        key = (chunk_id, "frames.bin")
+        if key not in self._arrays:
+            self._arrays[key] = np.memmap(self.chunk_dirs[chunk_id] / "frames.bin", dtype=np.uint8, mode='r')
+        data = self._arrays[key][offsets[row]:offsets[row + 1]]
+        return cv2.imdecode(np.asarray(data), cv2.IMREAD_COLOR), timestamp
+
+    def depth(self, seq):
+        """정규화 뎁스 맵 (float32, 0~1). 그 프레임에 뎁스 추론이 없었으면 None"""
+        rows = self._rows('depth', seq)
+        if not rows:
+            return None
+        depth_map = np.asarray(self._array(rows[0][0], "depth")[rows[0][1]], dtype=np.float32)
+        return depth_map / 65535.0 if self.meta['depth_dtype'] == "uint16" else depth_map
+
+    def hands(self, seq):
+        """(landmarks (K, 21, 3), handedness (K,))"""
+        rows = self._rows('hands', seq)
+        landmarks = np.array([self._array(c, "hands")[r] for c, r in rows], dtype=np.float32).reshape(-1, 21, 3)
+        handedness = np.array([self._array(c, "handedness")[r] for c, r in rows], dtype='<U5')
+        return landmarks, handedness
+
+    def detections(self, seq):
+        """(classes, scores, boxes) - 프레임 좌표 기준"""
+        rows = self._rows('detections', seq)
+        data = np.array([self._array(c, "detections")[r] for c, r in rows], dtype=np.float32).reshape(-1, 6)
+        return data[:, 0].astype(int), data[:, 1], data[:, 2:]
+
+    def events(self, kind=None):
+        """기록 순서대로 (프레임 번호, 기록 시각, 종류, 내용) 목록"""
+        events = []
+        for chunk_dir in self.chunk_dirs:
+            events.extend(json.loads((chunk_dir / "events.json").read_text(encoding="utf-8")))
+        return [tuple(e) for e in events if kind is None or e[2] == kind]
+
+    def frames(self, start=None, stop=None):
+        """프레임 번호 구간의 (프레임 번호, 프레임, 타임스탬프)를 차례로 읽습니다."""
+        for seq in self.frame_indices:
+            if (start is None or seq >= start) and (stop is None or seq < stop):
+                frame, timestamp = self.frame(int(seq))
+                yield int(seq), frame, timestamp
+
+
+def record_output(shared_data, stream, *payload):
+    """공유 데이터에 기록기가 있으면 현재 프레임 번호로 단계 출력을 기록합니다."""
+    recorder = shared_data.get('recorder')
+    if recorder is not None:
+        recorder.record(stream, shared_data.get('frame_seq'), *payload)
@@ -0,0 +1,243 @@
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+import metrics
+from depth_backends import DEPTH_BACKENDS
+from hand_engine import HAND_ENGINES
+from hand_track import NUM_LANDMARKS
+
+# 스텁 설정 예시 (JSON)
+# {
+#   "seed": 0,
+#   "loop": 12.0,                                     # 대본 반복 주기 (초, 없으면 한 번)
+#   "latency": {                                      # 단계별 지연 분포 (ms)
+#     "depth": {"dist": "lognormal", "mean": 35, "sigma": 0.3},
+#     "hand": {"dist": "normal", "mean": 12, "std": 3},
+#     "detector": {"dist": "uniform", "low": 20, "high": 40},
+#     "tts": {"dist": "fixed", "mean": 70}            # 글자당 발화 시간
+#   },
+#   "script": [
+#     {"t": 3.0, "until": 6.0, "event": "obstacle", "side": "left"},
+#     {"t": 4.0, "until": 9.0, "event": "object", "class": "cider", "conf": 0.9},
+#     {"t": 5.0, "until": 8.0, "event": "catch", "hand": "Right"}
+#   ]
+# }
+
+DEFAULT_CLASS_NAMES = {0: "cider"}
+
+
+class LatencyModel:
+    """지연 분포에서 표본을 뽑아 그만큼 (추론처럼 블로킹으로) 기다립니다."""
+
+    def __init__(self, spec=None, rng=None):
+        self.spec = dict(spec or {'dist': "fixed", 'mean': 0.0})
+        self.rng = rng or np.random.default_rng(0)
+
+    def sample_ms(self):
+        spec = self.spec
+        dist = spec.get('dist', "fixed")
+        if dist == "fixed":
+            value = spec.get('mean', 0.0)
+        elif dist == "normal":
+            value = self.rng.normal(spec['mean'], spec.get('std', 0.0))
+        elif dist == "lognormal":
+            sigma = spec.get('sigma', 0.25)
+            value = self.rng.lognormal(np.log(spec['mean']) - sigma ** 2 / 2, sigma)  # 평균이 mean이 되도록
+        elif dist == "uniform":
+            value = self.rng.uniform(spec['low'], spec['high'])
+        else:
+            raise ValueError(f"지원하지 않는 지연 분포입니다: {dist}")
+        return max(float(value), 0.0)
+
+    def wait(self, scale=1.0):
+        delay = self.sample_ms() * scale / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class Scenario:
+    """스텁 단계가 공유하는 대본과 지연 설정. 시각은 처음 조회한 순간부터 셉니다."""
+
+    def __init__(self, config=None, clock=time.monotonic):
+        config = config or {}
+        self.clock = clock
+        self.rng = np.random.default_rng(config.get('seed', 0))
+        self.loop = config.get('loop')
+        self.script = config.get('script', [])
+        self.latency = {
+            stage: LatencyModel(spec, self.rng) for stage, spec in config.get('latency', {}).items()
+        }
+        self.start = None
+
+    @classmethod
+    def load(cls, path, clock=time.monotonic):
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), clock)
+
+    def elapsed(self):
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+        t = now - self.start
+        return t % self.loop if self.loop else t
+
+    def active(self, event):
+        """현재 시각에 진행 중인 대본 항목 목록"""
+        t = self.elapsed()
+        return [item for item in self.script
+                if item['event'] == event and item['t'] <= t < item.get('until', item['t'] + 1.0)]
+
+    def wait(self, stage, scale=1.0):
+        model = self.latency.get(stage)
+        return model.wait(scale) if model is not None else 0.0
+
+
+class StubDepthBackend:
+    """대본의 장애물 (obstacle: left/right/center)을 그린 합성 뎁스 맵을 내는 뎁스 백엔드"""
+    name = "stub"
+    requires_model_file = False
+
+    def __init__(self, model_path=None, input_size=256, scenario=None, **_):
+        self.scenario = scenario or Scenario()
+        self.input_shape = (1, 3, input_size, input_size)
+        # 아래로 갈수록 가까워지는 바닥 (정규화 후에도 임계값 아래에 머물도록 0.6까지)
+        floor = np.linspace(0.1, 0.6, input_size, dtype=np.float32)[:, None]
+        self.background = np.repeat(floor, input_size, axis=1)
+        self.background[:4, :4] = 1.0  # 정규화 기준점 (천장 모서리)
+
+    def infer(self, input_image):
+        self.scenario.wait('depth', scale=len(input_image))
+        return np.stack([self.render() for _ in range(len(input_image))])
+
+    def infer_batch(self, input_batch):
+        return self.infer(input_batch)
+
+    def render(self):
+        depth = self.background.copy()
+        size = depth.shape[1]
+        for item in self.scenario.active('obstacle'):
+            x1, x2 = {'left': (0.0, 0.4), 'right': (0.6, 1.0), 'center': (0.3, 0.7)}[item.get('side', "center")]
+            top = item.get('top', 0.4)
+            depth[int(top * size):, int(x1 * size):int(x2 * size)] = item.get('proximity', 1.0)
+        return depth
+
+
+def stub_hand(catch=False, center=(0.5, 0.6), scale=0.25):
+    """(21, 3) 합성 손 랜드마크. catch면 새끼손가락 TIP을 MCP 근처로 접습니다."""
+    # 손목 기준 펴진 손 (x: 엄지 -> 새끼, y: 위쪽이 음수)
+    template = np.array([
+        [0.0, 0.0],
+        [-0.35, -0.15], [-0.55, -0.35], [-0.7, -0.5], [-0.8, -0.65],  # 엄지
+        [-0.25, -0.6], [-0.28, -0.85], [-0.3, -1.0], [-0.31, -1.15],  # 검지
+        [-0.05, -0.65], [-0.05, -0.95], [-0.05, -1.1], [-0.05, -1.25],  # 중지
+        [0.15, -0.6], [0.17, -0.85], [0.18, -1.0], [0.19, -1.12],  # 약지
+        [0.32, -0.5], [0.37, -0.7], [0.4, -0.82], [0.42, -0.95],  # 새끼
+    ], dtype=np.float32)
+    if catch:
+        template[18:21] = template[17] + np.array([[0.05, -0.1], [0.1, -0.05], [0.08, 0.02]], dtype=np.float32)
+    landmarks = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    landmarks[:, :2] = template * scale + center
+    return landmarks
+
+
+class StubHandEngine:
+    """대본의 손 (hand) / 잡기 (catch) 이벤트로 랜드마크 배열을 내는 손 추론 엔진 (legacy와 같은 동기 인터페이스)"""
+
+    def __init__(self, scenario=None, **_):
+        self.scenario = scenario or Scenario()
+        self.result = None
+
+    def submit(self, image, timestamp_ms):
+        self.scenario.wait('hand')
+        hands = [(item.get('hand', "Right"), True) for item in self.scenario.active('catch')]
+        hands += [(item.get('hand', "Right"), False) for item in self.scenario.active('hand')
+                  if item.get('hand', "Right") not in {label for label, _ in hands}]
+        landmarks = np.array([stub_hand(catch) for _, catch in hands], dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        handedness = np.array([label for label, _ in hands], dtype='<U5')
+        scores = np.ones(len(hands), dtype=np.float32)
+        self.result = (landmarks, handedness, scores, timestamp_ms)
+        return True
+
+    def poll(self):
+        result, self.result = self.result, None
+        return result
+
+    def close(self):
+        pass
+
+
+class StubTensor:
+    """ultralytics 결과 텐서 대역 (.cpu().numpy())"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class StubDetectorModel:
+    """ultralytics YOLO 모델 대역. 대본의 물체 (object) 이벤트를 이미지 중앙의 감지로 돌려줍니다."""
+
+    def __init__(self, scenario=None, class_names=None):
+        self.scenario = scenario or Scenario()
+        self.names = dict(class_names or DEFAULT_CLASS_NAMES)
+        self.class_ids = {name: class_id for class_id, name in self.names.items()}
+
+    def __call__(self, source, **_):
+        images = source if isinstance(source, list) else [source]
+        self.scenario.wait('detector', scale=len(images))
+        objects = self.scenario.active('object')
+        return [self.result(image, objects) for image in images]
+
+    def result(self, image, objects):
+        h, w = image.shape[:2]
+        boxes = np.array([[w * 0.3, h * 0.3, w * 0.7, h * 0.7]] * len(objects), dtype=np.float32).reshape(-1, 4)
+        classes = np.array([self.class_ids.get(item.get('class'), 0) for item in objects], dtype=np.float32)
+        scores = np.array([item.get('conf', 0.9) for item in objects], dtype=np.float32)
+        return SimpleNamespace(boxes=SimpleNamespace(
+            xyxy=StubTensor(boxes), cls=StubTensor(classes), conf=StubTensor(scores)
+        ))
+
+
+class StubSpeaker:
+    """TextToSpeech 큐를 소비하는 음성 출력 대역 (pyttsx3 대신 글자 수 x 지연 분포만큼 대기)"""
+
+    def __init__(self, tts, scenario=None):
+        self.tts = tts
+        self.scenario = scenario or Scenario()
+        self.spoken = []  # (시각, 문구)
+        self.thread = threading.Thread(target=self._process_queue, daemon=True)
+        self.thread.start()
+
+    def _process_queue(self):
+        while True:
+            text = self.tts.queue.get()
+            origin = self.tts.mark_dequeued(text)
+            self.tts.is_tts_busy = True
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{now}] TTS Output (stub): {text}")
+            self.spoken.append((time.time(), text))
+            if self.tts.recorder is not None:
+                self.tts.recorder.record('event', None, 'tts', text)
+            onset = time.perf_counter()
+            self.scenario.wait('tts', scale=len(text))
+            end = time.perf_counter()
+            metrics.observe('pipeline_tts_speech_seconds', end - onset)
+            self.tts.mark_spoken(text, origin, onset, end)
+            self.tts.is_tts_busy = False
+            time.sleep(0.5)  # 메시지 간 간격 (TextToSpeech._process_queue와 동일)
+
+
+# 실제 백엔드/엔진 레지스트리에 스텁 등록 (이 모듈을 불러온 프로그램에서만 'stub' 이름 사용 가능)
+DEPTH_BACKENDS[StubDepthBackend.name] = StubDepthBackend
+HAND_ENGINES['stub'] = StubHandEngine
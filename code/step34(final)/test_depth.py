@@ -1,34 +1,48 @@
 import cv2
 import numpy as np
-import openvino as ov
 from pathlib import Path
 import asyncio
-import matplotlib.cm
 import random
-import sys
-import os
+from functools import lru_cache
 
-# 유틸리티 경로 설정
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
-utils_dir = os.path.join(parent_dir, "utils")
-sys.path.append(utils_dir)
-import notebook_utils as utils
+try:
+    import matplotlib.cm  # 선택 의존성 (없으면 cv2 컬러맵 사용)
+except ImportError:
+    matplotlib = None
+
+from depth_backends import create_depth_backend
+from model_registry import fetch_variant, get_variant
+import metrics
 
 
 class DepthProcessor:
-    def __init__(self, compiled_model, input_key, output_key):
-        self.compiled_model = compiled_model
-        self.input_key = input_key
-        self.output_key = output_key
+    def __init__(self, backend):
+        self.backend = backend  # 뎁스 추론 백엔드 (depth_backends: OpenVINO, ONNX Runtime, cv2.dnn)
+        # 지표 레이블 (스크리닝용 저해상도 모델과 구분하도록 입력 크기 포함)
+        self.model_label = f"depth{backend.input_shape[2]}" if backend is not None else "depth"
+
+    def preprocess(self, frame):
+        """프레임을 모델 입력 크기의 (C, H, W) 배열로 변환합니다."""
+        _, _, height, width = self.backend.input_shape
+        resized_frame = cv2.resize(frame, (width, height))
+        return np.transpose(resized_frame, (2, 0, 1))
 
     def process_frame(self, frame):
         """주어진 프레임에서 뎁스 결과를 생성합니다."""
-        resized_frame = cv2.resize(frame, (self.input_key.shape[2], self.input_key.shape[3]))
-        input_image = np.expand_dims(np.transpose(resized_frame, (2, 0, 1)), 0)
-        result = self.compiled_model([input_image])[self.output_key]
+        with metrics.timer('pipeline_stage_seconds', model=self.model_label, phase="preprocess"):
+            input_image = np.expand_dims(self.preprocess(frame), 0)
+        with metrics.timer('pipeline_stage_seconds', model=self.model_label, phase="inference"):
+            result = self.backend.infer(input_image)
         return result
 
+    def process_batch(self, inputs):
+        """전처리된 (C, H, W) 입력 여러 개를 한 배치로 추론해 (N, H, W) 결과를 반환합니다."""
+        input_batch = np.stack(inputs)
+        infer_batch = getattr(self.backend, 'infer_batch', None)
+        if infer_batch is None:
+            return np.concatenate([self.backend.infer(input_batch[i:i + 1]) for i in range(len(input_batch))])
+        return infer_batch(input_batch)
+
     def visualize_result(self, result):
         """뎁스 결과를 시각화합니다."""
         result_frame = self.convert_result_to_image(result)
@@ -41,45 +55,108 @@ class DepthProcessor:
 
     def convert_result_to_image(self, result, colormap="viridis"):
         """뎁스 결과를 컬러맵으로 변환합니다."""
-        cmap = matplotlib.colormaps[colormap]
         result = result.squeeze(0)
         result = self.normalize_minmax(result)
+        if matplotlib is None:
+            colored = cv2.applyColorMap((result * 255).astype(np.uint8), getattr(cv2, f"COLORMAP_{colormap.upper()}"))
+            return cv2.cvtColor(colored, cv2.COLOR_BGR2RGB)  # matplotlib과 같은 RGB 순서
+        cmap = matplotlib.colormaps[colormap]
         result = cmap(result)[:, :, :3] * 255
         result = result.astype(np.uint8)
         return result
 
 
-def process_depth_sections(depth_map, num_rows=5, num_cols=5, threshold=0.85):
-    """깊이 맵을 섹션으로 나누고, 각 섹션의 평균 뎁스를 계산하여 방향을 결정합니다."""
+# 뎁스 판단 영역 프로파일 (REGION_BASE_ROWS행 기준, 다른 행 수의 격자는 행 위치 비율로 대응)
+#   ignore_top_rows: 판단에서 제외할 위쪽 섹션 행 수 (천장, 조명)
+#   corridor_top_width: 보행 통로 사다리꼴의 위쪽 폭 비율 (아래쪽은 전체 폭, None이면 전체 영역)
+#   row_weights: 섹션 행별 가중치 (None이면 모두 1)
+DEPTH_REGIONS = {
+    'full': dict(ignore_top_rows=0, corridor_top_width=None, row_weights=None),
+    'corridor': dict(ignore_top_rows=1, corridor_top_width=0.4, row_weights=(0.0, 0.5, 1.0, 1.0, 1.0)),
+}
+REGION_BASE_ROWS = 5
+
+
+@lru_cache(maxsize=16)
+def build_region_mask(height, width, num_rows=5, num_cols=5, region='full'):
+    """영역 프로파일의 픽셀 마스크와 섹션별 가중치를 계산합니다. (뎁스 맵 해상도별 캐시)
+
+    반환: (mask, cell_weights, cell_counts) - 전체 영역이면 mask는 None
+    """
+    config = DEPTH_REGIONS[region]
+    section_height = height // num_rows
+    section_width = width // num_cols
+
+    mask = None
+    cell_counts = np.full((num_rows, num_cols), section_height * section_width, dtype=np.float32)
+    if config['corridor_top_width'] is not None:
+        # 아래로 갈수록 넓어지는 사다리꼴 보행 통로
+        ys = (np.arange(height, dtype=np.float32) + 0.5) / height
+        half_width = 0.5 * (config['corridor_top_width'] + (1.0 - config['corridor_top_width']) * ys)
+        xs = (np.arange(width, dtype=np.float32) + 0.5) / width
+        mask = (np.abs(xs[None, :] - 0.5) <= half_width[:, None]).astype(np.float32)
+        cell_counts = mask[:section_height * num_rows, :section_width * num_cols].reshape(
+            num_rows, section_height, num_cols, section_width).sum(axis=(1, 3))
+
+    cell_weights = cell_counts / (section_height * section_width)
+    if config['row_weights'] is not None:
+        row_weights = np.asarray(config['row_weights'], dtype=np.float32)
+        base_rows = ((np.arange(num_rows) + 0.5) * len(row_weights) / num_rows).astype(int)  # 행 중심이 속한 기준 행
+        cell_weights = cell_weights * row_weights[base_rows][:, None]
+    cell_weights[:config['ignore_top_rows'] * num_rows // REGION_BASE_ROWS] = 0.0
+
+    for array in (mask, cell_weights, cell_counts):
+        if array is not None:
+            array.setflags(write=False)  # 캐시 공유 배열 보호
+    return mask, cell_weights, cell_counts
+
+
+def section_means(depth_map, num_rows=5, num_cols=5, region='full'):
+    """영역 마스크 안에서 섹션별 평균 뎁스를 한 번에 계산합니다. (가중치 0인 행은 계산하지 않음)"""
     h, w = depth_map.shape
+    mask, cell_weights, cell_counts = build_region_mask(h, w, num_rows, num_cols, region)
     section_height = h // num_rows
     section_width = w // num_cols
-    
-    left_count = 0
-    right_count = 0
-    threshold_hit = False  # 쓰레스홀드를 만족하는 섹션이 있는지 확인
 
-    for row in range(num_rows):
-        for col in range(num_cols):
-            y1, y2 = row * section_height, (row + 1) * section_height
-            x1, x2 = col * section_width, (col + 1) * section_width
-            section = depth_map[y1:y2, x1:x2]
-            mean_depth = section.mean()
-            
-            if mean_depth >= threshold:
-                threshold_hit = True
-                if col < num_cols // 2:
-                    left_count += 1
-                else:
-                    right_count += 1
-
-    if not threshold_hit:  # Threshold를 만족하는 섹션이 없으면 None 반환
+    means = np.zeros((num_rows, num_cols), dtype=np.float32)
+    active_rows = np.flatnonzero(cell_weights.any(axis=1))
+    if active_rows.size == 0:
+        return means, cell_weights
+
+    # 가중치가 있는 섹션 행 구간만 잘라서 계산
+    r1, r2 = active_rows[0], active_rows[-1] + 1
+    y1, y2 = r1 * section_height, r2 * section_height
+    region_map = depth_map[y1:y2, :section_width * num_cols]
+    if mask is not None:
+        region_map = region_map * mask[y1:y2, :section_width * num_cols]
+    sums = region_map.reshape(r2 - r1, section_height, num_cols, section_width).sum(axis=(1, 3))
+    counts = cell_counts[r1:r2]
+    np.divide(sums, counts, out=means[r1:r2], where=counts > 0)
+    return means, cell_weights
+
+
+def process_depth_sections(depth_map, num_rows=5, num_cols=5, threshold=0.85, region='full', tie_break=None):
+    """깊이 맵을 섹션으로 나누고, 각 섹션의 평균 뎁스를 계산하여 방향을 결정합니다.
+
+    region 프로파일 (DEPTH_REGIONS)의 마스크 안에서만 평균을 구하고, 섹션 가중치로 좌우를 비교합니다.
+    좌우가 같으면 tie_break를 사용합니다. (None이면 무작위)
+    """
+    means, cell_weights = section_means(depth_map, num_rows, num_cols, region)
+    hits = (means >= threshold) & (cell_weights > 0)
+
+    if not hits.any():  # Threshold를 만족하는 섹션이 없으면 None 반환
         return None
 
+    weighted_hits = np.where(hits, cell_weights, 0.0)
+    left_count = weighted_hits[:, :num_cols // 2].sum()
+    right_count = weighted_hits[:, num_cols // 2:].sum()
+
     if left_count > right_count:
         return "Avoid to Right"
     elif right_count > left_count:
         return "Avoid to Left"
+    elif tie_break is not None:
+        return tie_break
     else:
         return random.choice(["Avoid to Right", "Avoid to Left"])
 
@@ -114,22 +191,10 @@ def display_depth_sections(image, depth_map, num_rows=5, num_cols=5, output_widt
     return image
 
 
-def download_midas_model():
-    """MiDaS 모델 다운로드 및 설정"""
-    model_folder = Path("model/midas")
-    model_folder.mkdir(parents=True, exist_ok=True)
-
-    ir_model_url = "https://storage.openvinotoolkit.org/repositories/openvino_notebooks/models/depth-estimation-midas/FP32/"
-    ir_model_name_xml = "MiDaS_small.xml"
-    ir_model_name_bin = "MiDaS_small.bin"
-
-    if not (model_folder / ir_model_name_xml).exists():
-        utils.download_file(ir_model_url + ir_model_name_xml, filename=ir_model_name_xml, directory=model_folder)
-    if not (model_folder / ir_model_name_bin).exists():
-        utils.download_file(ir_model_url + ir_model_name_bin, filename=ir_model_name_bin, directory=model_folder)
-
-    model_xml_path = model_folder / ir_model_name_xml
-    print(f"MiDaS model downloaded at: {model_xml_path}")
+def download_midas_model(variant=None):
+    """MiDaS IR (.xml/.bin)이 없으면 model_registry.json 변형의 URL에서 내려받고 체크섬을 확인합니다."""
+    model_xml_path = fetch_variant("depth", variant or get_variant("depth"))
+    print(f"MiDaS model ready at: {model_xml_path}")
     return model_xml_path
 
 
@@ -180,11 +245,22 @@ async def unified_depth(shared_data):
         await asyncio.sleep(0)
 
 
-def setup_depth_model():
-    core = ov.Core()
-    model_path = download_midas_model()
-    model = core.read_model(model_path)
-    compiled_model = core.compile_model(model=model, device_name="GPU")
-    input_key = compiled_model.input(0)
-    output_key = compiled_model.output(0)
-    return DepthProcessor(compiled_model, input_key, output_key)
+def setup_depth_model(input_size=None, backend="openvino", model_path=None, variant=None, **options):
+    """MiDaS 모델을 백엔드로 불러옵니다. input_size를 주면 (정사각형) 입력 크기를 줄인 스크리닝용 모델을 만듭니다.
+
+    variant (model_registry 항목)를 주면 그 백엔드, 경로, 입력 크기를 사용합니다.
+    openvino 백엔드는 모델이 없으면 내려받고, onnxruntime/opencv 백엔드는 로컬 ONNX 파일을 사용합니다.
+    """
+    if variant is not None:
+        backend = variant['backend']
+        model_path = model_path or variant['path']
+        input_size = input_size or variant.get('input_size')
+    if backend == "openvino":
+        # IR 파일 (.xml/.bin)이 없으면 변형 (또는 기본 변형)의 URL에서 내려받음 (직접 준 경로는 내려받지 않음)
+        ir_files = [Path(model_path), Path(model_path).with_suffix(".bin")] if model_path else []
+        if (variant is not None or model_path is None) and not (ir_files and all(p.exists() for p in ir_files)):
+            model_path = download_midas_model(variant)
+        options.setdefault('device', "GPU")
+    if input_size is not None:
+        options['input_size'] = input_size
+    return DepthProcessor(create_depth_backend(backend, model_path, **options))
@@ -1,36 +1,233 @@
 import cv2
 import asyncio
-from ultralytics import YOLO
+import numpy as np
 import os
+import time
 import logging
 from datetime import datetime
+from functools import lru_cache
+import metrics
+from frame_trace import frame_origin, trace_span, set_flag_origin
+from cascade import gate_allows, cascade_signal, stage_work
+from session_recorder import record_output
 
 # 로깅 수준 설정
 logging.getLogger("ultralytics").setLevel(logging.WARNING)
 
+DETECTION_FLAG_SECONDS = 5  # 감지 플래그 유지 시간 (초)
+
+
+@lru_cache(maxsize=8)
+def compute_tile_layout(frame_width, frame_height, grid=(3, 2), overlap=0.2):
+    """프레임을 겹치는 타일로 나눌 (x1, y1, x2, y2) 좌표 목록을 계산합니다. (해상도별 캐시)"""
+    cols, rows = grid
+    # 타일 크기: cols개의 타일이 overlap 비율만큼 겹치면서 전체 폭을 덮도록 계산
+    tile_width = min(frame_width, int(np.ceil(frame_width / (cols - (cols - 1) * overlap))))
+    tile_height = min(frame_height, int(np.ceil(frame_height / (rows - (rows - 1) * overlap))))
+
+    xs = np.linspace(0, frame_width - tile_width, cols).astype(int)
+    ys = np.linspace(0, frame_height - tile_height, rows).astype(int)
+    return tuple(
+        (int(x), int(y), int(x) + tile_width, int(y) + tile_height)
+        for y in ys for x in xs
+    )
+
+
+def merge_tile_detections(tile_boxes, tile_classes, tile_scores, tile_offsets, iou_threshold=0.5):
+    """타일별 감지 결과를 프레임 좌표로 옮긴 뒤 클래스별 NMS로 타일 간 중복을 제거합니다."""
+    if not tile_boxes:
+        return np.empty((0, 4), np.float32), np.empty(0, int), np.empty(0, np.float32)
+
+    offsets = np.concatenate([
+        np.tile(np.asarray(offset[:2] * 2, np.float32), (len(boxes), 1))
+        for boxes, offset in zip(tile_boxes, tile_offsets)
+    ])
+    boxes = np.concatenate(tile_boxes).astype(np.float32) + offsets
+    classes = np.concatenate(tile_classes).astype(int)
+    scores = np.concatenate(tile_scores).astype(np.float32)
+    if len(boxes) == 0:
+        return boxes, classes, scores
+
+    # 클래스마다 좌표를 크게 띄워 한 번의 NMS 호출로 클래스별 NMS를 수행
+    shifted = boxes + (classes[:, None] * 8192).astype(np.float32)
+    xywh = np.column_stack([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]])
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, iou_threshold)
+    keep = np.asarray(keep, dtype=int).reshape(-1)
+    return boxes[keep], classes[keep], scores[keep]
+
+
 class YOLODetector:
-    def __init__(self, model_path='best_v4.pt'):
-        # 모델 파일 경로 확인 및 로드
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, model_path)
+    def __init__(self, model_path='best_v4.pt', tile_mode=False, tile_grid=(3, 2), tile_overlap=0.2,
+                 nms_iou_threshold=0.5, history=None, imgsz=None, model=None):
+        if model is not None:
+            self.model = model  # 이미 준비된 모델 (예: stub_stages.StubDetectorModel)
+        else:
+            # 모델 파일 경로 확인 및 로드
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            model_path = os.path.join(current_dir, model_path)
 
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"YOLO 모델 파일을 찾을 수 없습니다: {model_path}")
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"YOLO 모델 파일을 찾을 수 없습니다: {model_path}")
 
-        self.model = YOLO(model_path)
+            from ultralytics import YOLO  # 실제 모델에서만 필요 (stub 모델은 ultralytics 없이 실행)
+
+            self.model = YOLO(model_path)
+        self.predict_options = {'verbose': False}
+        if imgsz is not None:  # 모델 레지스트리 변형의 입력 크기
+            self.predict_options['imgsz'] = imgsz
         self.last_detection_time = 0  # 마지막 출력 시간을 기록
         self.detection_flag = False  # 감지 상태 플래그
         self.flag_reset_time = 0  # 플래그 유지 종료 시간
+        self.frame_count = 0  # 처리한 프레임 수 (감지 이력의 frame_seq)
+
+        # 감지 이력 (클래스 투표용 링 버퍼)
+        self.history = history
+        if self.history is not None and self.history.class_names is None:
+            self.history.class_names = self.model.names
+
+        # 타일 모드 설정 (작은 물체 감지용)
+        self.tile_mode = tile_mode
+        self.tile_grid = tuple(tile_grid)  # (열, 행) 타일 개수
+        self.tile_overlap = tile_overlap  # 인접 타일 간 겹침 비율
+        self.nms_iou_threshold = nms_iou_threshold  # 타일 간 NMS IoU 임계값
+
+        # 타일 처리량 통계
+        self.tile_stats = {'frames': 0, 'tiles': 0, 'seconds': 0.0}
+        self.last_throughput_time = time.time()
+
+    @staticmethod
+    def _result_arrays(result):
+        """ultralytics 결과를 (boxes, classes, scores) NumPy 배열로 변환합니다."""
+        boxes = result.boxes
+        return (
+            boxes.xyxy.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(int),
+            boxes.conf.cpu().numpy(),
+        )
+
+    @staticmethod
+    def _record_speed(results):
+        """ultralytics 결과의 단계별 시간 (speed, 이미지당 ms)을 지표에 기록합니다. (스텁 결과에는 없음)"""
+        speed = getattr(results[0], 'speed', None) if results else None
+        if not speed:
+            return
+        for phase in ('preprocess', 'inference', 'postprocess'):
+            if speed.get(phase) is not None:
+                metrics.observe('pipeline_stage_seconds', speed[phase] * len(results) / 1000.0, model="yolo", phase=phase)
+
+    def detect(self, image):
+        """단일 이미지에서 객체를 감지합니다."""
+        results = self.model(image, **self.predict_options)
+        self._record_speed(results)
+        return self._result_arrays(results[0])
+
+    def detect_tiled(self, frame):
+        """프레임을 겹치는 타일로 나눠 한 번의 배치 추론으로 감지하고 프레임 좌표로 병합합니다."""
+        height, width = frame.shape[:2]
+        layout = compute_tile_layout(width, height, self.tile_grid, self.tile_overlap)
+        tiles = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in layout]
+
+        start = time.perf_counter()
+        results = self.model(tiles, **self.predict_options)  # 타일 전체를 하나의 배치로 추론
+        elapsed = time.perf_counter() - start
+        self._record_speed(results)
+
+        self.tile_stats['frames'] += 1
+        self.tile_stats['tiles'] += len(tiles)
+        self.tile_stats['seconds'] += elapsed
+
+        per_tile = [self._result_arrays(result) for result in results]
+        return merge_tile_detections(
+            [boxes for boxes, _, _ in per_tile],
+            [classes for _, classes, _ in per_tile],
+            [scores for _, _, scores in per_tile],
+            layout,
+            self.nms_iou_threshold,
+        )
+
+    def report_tile_throughput(self, interval=5):
+        """타일 모드 처리량을 주기적으로 출력합니다."""
+        current_time = time.time()
+        if current_time - self.last_throughput_time < interval or self.tile_stats['seconds'] == 0:
+            return
+        stats = self.tile_stats
+        print(
+            f"Tiled detection: {stats['tiles'] / stats['seconds']:.1f} tiles/s, "
+            f"{stats['frames'] / stats['seconds']:.1f} frames/s "
+            f"({stats['tiles'] // max(stats['frames'], 1)} tiles/batch)"
+        )
+        self.tile_stats = {'frames': 0, 'tiles': 0, 'seconds': 0.0}
+        self.last_throughput_time = current_time
+
+    def benchmark_tiling(self, frame, repeats=10):
+        """배치 타일 추론과 타일별 순차 추론의 프레임당 소요 시간(초)을 비교합니다."""
+        height, width = frame.shape[:2]
+        layout = compute_tile_layout(width, height, self.tile_grid, self.tile_overlap)
+        tiles = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in layout]
+        self.model(tiles, **self.predict_options)  # 워밍업
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            self.model(tiles, **self.predict_options)
+        batched = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for tile in tiles:
+                self.model(tile, **self.predict_options)
+        sequential = (time.perf_counter() - start) / repeats
+
+        print(f"Tiling benchmark: batched {batched * 1000:.1f} ms, sequential {sequential * 1000:.1f} ms "
+              f"({len(tiles)} tiles, x{sequential / batched:.2f})")
+        return {'batched': batched, 'sequential': sequential, 'tiles': len(tiles)}
+
+    def update_detection_flag(self, detected, now):
+        """now 시각 기준으로 감지 플래그를 갱신합니다. 켜지면 True를 반환합니다.
+
+        켜질 때와 꺼질 때 출력하는 문구는 FlagMonitor가 파싱합니다. (리플레이 하네스도 같은 함수로 가상 시계를 사용)
+        """
+        if self.detection_flag and now >= self.flag_reset_time:
+            self.detection_flag = False
+            print("class flag end")  # 플래그 종료 출력
+        if detected and not self.detection_flag:
+            self.detection_flag = True
+            self.flag_reset_time = now + DETECTION_FLAG_SECONDS  # 현재 시간 기준 5초 후 해제
+            print("class detect flag - 5s")  # 플래그 활성화 출력
+            return True
+        return False
 
     async def manage_detection_flag(self):
         """비동기로 감지 플래그를 관리합니다."""
         # print("Starting manage_detection_flag...")  # 디버깅 출력
-        self.detection_flag = True
-        print("class detect flag - 5s")  # 플래그 활성화 출력
-        self.flag_reset_time = asyncio.get_event_loop().time() + 5  # 현재 시간 기준 5초 후 해제
-        await asyncio.sleep(5)  # 5초 유지
-        self.detection_flag = False
-        print("class flag end")  # 플래그 종료 출력
+        loop = asyncio.get_event_loop()
+        self.update_detection_flag(True, loop.time())
+        await asyncio.sleep(DETECTION_FLAG_SECONDS)  # 5초 유지
+        self.update_detection_flag(False, max(loop.time(), self.flag_reset_time))
+
+    def detect_frame(self, frame):
+        """프레임에서 감지 영역 (타일 모드: 전체, 기본: 중앙 320x480)을 추론합니다.
+
+        반환: (감지 영역 이미지, 영역 기준 boxes, classes, scores, 프레임 기준 boxes)
+        """
+        if self.tile_mode:
+            # 전체 프레임을 타일로 나눠 배치 추론
+            cropped_frame = frame.copy()
+            boxes, classes, scores = self.detect_tiled(cropped_frame)
+            self.report_tile_throughput()
+            return cropped_frame, boxes, classes, scores, boxes
+
+        # 중앙에서 320x480 크기로 자르기
+        original_height, original_width = frame.shape[:2]
+        crop_x_start = (original_width - 320) // 2
+        crop_y_start = (original_height - 480) // 2
+        crop_x_end = crop_x_start + 320
+        crop_y_end = crop_y_start + 480
+        cropped_frame = frame[crop_y_start:crop_y_end, crop_x_start:crop_x_end]
+
+        # 모델 예측
+        boxes, classes, scores = self.detect(cropped_frame)
+        frame_boxes = boxes + [crop_x_start, crop_y_start, crop_x_start, crop_y_start]
+        return cropped_frame, boxes, classes, scores, frame_boxes
 
     async def run_detection(self, shared_data):
         """비동기적으로 YOLO 모델을 사용해 객체 감지를 실행합니다."""
@@ -41,22 +238,32 @@ class YOLODetector:
                 await asyncio.sleep(0)  # 프레임이 준비될 때까지 대기
                 continue
 
-            # 중앙에서 320x480 크기로 자르기
-            original_height, original_width = frame.shape[:2]
-            crop_x_start = (original_width - 320) // 2
-            crop_y_start = (original_height - 480) // 2
-            crop_x_end = crop_x_start + 320
-            crop_y_end = crop_y_start + 480
-            cropped_frame = frame[crop_y_start:crop_y_end, crop_x_start:crop_x_end]
+            # 캐스케이드 스케줄러: 손이 보이지 않으면 낮은 주기로만 실행
+            if not gate_allows(shared_data, 'yolo'):
+                await asyncio.sleep(0.01)
+                continue
+
+            metrics.frame_seen('yolo', shared_data.get('frame_seq'))
+            origin = frame_origin(shared_data)
+            start = time.perf_counter()
+            with stage_work(shared_data, 'yolo'):
+                cropped_frame, boxes, classes, scores, frame_boxes = self.detect_frame(frame)
+            trace_span(shared_data, 'yolo', "detect", start, origin, detections=len(classes))
 
-            # 모델 예측
-            results = self.model(cropped_frame, verbose=False)
+            # 감지 이력 기록 (프레임 좌표 기준)
+            self.frame_count += 1
+            if self.history is not None:
+                self.history.extend(self.frame_count, classes, scores, frame_boxes)
+            record_output(shared_data, 'detections', classes, scores, frame_boxes)
+            if len(classes):
+                cascade_signal(shared_data, 'object')  # 손 추적 깨우기
 
             # 현재 시간
             current_time = asyncio.get_event_loop().time()
+            render_start = time.perf_counter()
 
             # YOLO의 바운딩 박스 및 확률 그대로 표시
-            for box, cls, score in zip(results[0].boxes.xyxy, results[0].boxes.cls, results[0].boxes.conf):
+            for box, cls, score in zip(boxes, classes, scores):
                 x1, y1, x2, y2 = map(int, box.tolist())
                 class_id = int(cls)  # 클래스 ID 가져오기
                 class_name = self.model.names[class_id]  # 클래스 이름 가져오기
@@ -70,6 +277,7 @@ class YOLODetector:
                 # 플래그 설정 (새로운 감지 시 비동기 관리 태스크 실행)
                 if not self.detection_flag:
                     # print("Creating detection flag task...")  # 디버깅 출력
+                    set_flag_origin(shared_data, 'detect', origin)
                     asyncio.create_task(self.manage_detection_flag())
 
                 # YOLO 바운딩 박스 및 확률 표시
@@ -86,9 +294,11 @@ class YOLODetector:
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA
                 )
 
-            # 결과 표시
-            output_frame = cv2.resize(cropped_frame, (640, 480))  # 출력창도 640x480으로 설정
+            # 결과 표시 (타일 모드는 전체 프레임 비율 유지)
+            output_size = (640, 360) if self.tile_mode else (640, 480)
+            output_frame = cv2.resize(cropped_frame, output_size)
             cv2.imshow("YOLO Detection", output_frame)
+            metrics.observe('pipeline_render_seconds', time.perf_counter() - render_start, stage="yolo")
 
             # 'q' 키로 종료
             if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -1,81 +1,165 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import asyncio
 import time
 from datetime import datetime  # 현재 시간 출력을 위한 모듈 추가
+from hand_track import HandTrack, GraspStateMachine
+from landmark_flow import LandmarkPropagator
+from hand_engine import HAND_CONNECTIONS, create_hand_engine, legacy_result_to_array, empty_hand_arrays
+import metrics
+from frame_trace import frame_origin, trace_span, set_flag_origin
+from cascade import gate_allows, cascade_signal, stage_work
+from session_recorder import record_output
+
+# MediaPipe 손 랜드마크 인덱스
+WRIST = 0
+THUMB_TIP = 4
+MIDDLE_FINGER_TIP = 12
+PINKY_MCP = 17
+PINKY_TIP = 20
+FINGER_TIPS = np.array([8, 12, 16, 20])  # 검지, 중지, 약지, 새끼 TIP
+
 
 class HandDetection:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5,
-        )
-        self.mp_drawing = mp.solutions.drawing_utils
+    def __init__(self, min_hand_length=0.0, pinch_threshold=0.1, track_capacity=30, inference_interval=1,
+                 engine="legacy", **engine_options):
+        # 손 추론 엔진: 'legacy' (mp.solutions.hands, 동기) 또는 'tasks' (HandLandmarker LIVE_STREAM, 비동기)
+        self.engine = create_hand_engine(engine, **engine_options)
 
         # 설정값
         self.PINKY_THRESHOLD = 0.05  # 새끼손가락 TIP과 MCP 사이 거리 임계값
+        self.MIN_HAND_LENGTH = min_hand_length  # 손목~중지 TIP 최소 길이 (멀리 있는 손 제외, 0이면 비활성)
+        self.PINCH_THRESHOLD = pinch_threshold  # 엄지 TIP과 다른 손가락 TIP 사이 거리 임계값
         self.last_terminal_time = 0  # 마지막 터미널 출력 시간 기록
         self.catch_flag = False  # Catch 상태 플래그
 
-    def calculate_distance(self, p1, p2):
-        """두 랜드마크 사이의 거리를 계산합니다."""
-        return np.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
+        # 손별 랜드마크 트랙과 잡기 상태 머신 (handedness 라벨 기준)
+        self.tracks = {label: HandTrack(track_capacity) for label in ("Left", "Right")}
+        self.grasps = {label: GraspStateMachine() for label in ("Left", "Right")}
 
-    def detect_catch(self, hand_landmarks):
+        # 희소 추론: N 프레임마다 모델 실행, 사이 프레임은 광류로 랜드마크 전파 (1이면 매 프레임 추론)
+        self.propagator = LandmarkPropagator(inference_interval) if inference_interval > 1 else None
+        self.pending_gray = None  # 추론에 제출한 프레임의 광류용 영상
+        self.last_landmarks, self.last_handedness, self.last_scores = empty_hand_arrays()
+
+    # MediaPipe 결과를 프레임당 한 번 (hands, 21, 3) float32 배열과 handedness, score 배열로 변환
+    landmarks_to_array = staticmethod(legacy_result_to_array)
+
+    def calculate_distance(self, p1, p2):
+        """두 랜드마크 배열 (..., 3) 사이의 2D 거리를 계산합니다."""
+        return np.linalg.norm(p1[..., :2] - p2[..., :2], axis=-1)
+
+    def hand_length(self, landmarks):
+        """손 크기 (손목 ~ 중지 TIP 거리)를 손마다 계산합니다."""
+        return self.calculate_distance(landmarks[:, WRIST], landmarks[:, MIDDLE_FINGER_TIP])
+
+    def pinky_curl_distance(self, landmarks):
+        """새끼손가락 TIP과 MCP 사이 거리를 손마다 계산합니다."""
+        return self.calculate_distance(landmarks[:, PINKY_TIP], landmarks[:, PINKY_MCP])
+
+    def pinch_distances(self, landmarks):
+        """엄지 TIP과 나머지 네 손가락 TIP 사이 거리 (hands, 4)를 계산합니다."""
+        return self.calculate_distance(landmarks[:, None, THUMB_TIP], landmarks[:, FINGER_TIPS])
+
+    def evaluate_gestures(self, landmarks):
+        """모든 손에 대해 제스처 판정을 한 번에 계산합니다."""
+        valid_size = self.hand_length(landmarks) >= self.MIN_HAND_LENGTH
+        return {
+            'valid_size': valid_size,
+            'catch': valid_size & (self.pinky_curl_distance(landmarks) < self.PINKY_THRESHOLD),
+            'pinch': valid_size & (self.pinch_distances(landmarks) < self.PINCH_THRESHOLD),
+        }
+
+    def detect_catches(self, landmarks):
         """
-        새끼손가락 TIP이 MCP (세 번째 마디)에 가까워졌을 때 catch 상태로 판별합니다.
+        새끼손가락 TIP이 MCP (세 번째 마디)에 가까워졌을 때 catch 상태로 판별합니다. (손마다 bool)
         """
+        return self.evaluate_gestures(landmarks)['catch']
+
+    def detect_catch(self, hand_landmarks):
+        """단일 MediaPipe 손 랜드마크에 대한 catch 판별 (기존 인터페이스)"""
         if hand_landmarks is None:
             return False
 
         try:
-            # 새끼손가락의 TIP과 MCP 좌표 가져오기
-            pinky_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-            pinky_mcp = hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_MCP]
-
-            # TIP과 MCP 사이 거리 계산
-            distance = self.calculate_distance(pinky_tip, pinky_mcp)
-            return distance < self.PINKY_THRESHOLD  # 임계값 이하이면 CATCH
+            landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]], dtype=np.float32)
+            return bool(self.detect_catches(landmarks)[0])
         except Exception as e:
             print(f"Error in detect_catch: {e}")
             return False
 
-    def process_frame(self, image):
-        """프레임을 처리하고 손 랜드마크 및 동작을 감지합니다."""
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(image_rgb)
-        return results
-
-    def draw_hand_landmarks(self, image, hand_landmarks):
-        """손 랜드마크를 이미지에 그립니다."""
-        self.mp_drawing.draw_landmarks(
-            image,
-            hand_landmarks,
-            self.mp_hands.HAND_CONNECTIONS,
-            self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
-            self.mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2),
-        )
-
-    async def manage_catch_flag(self):
-        """비동기로 catch 상태를 관리합니다."""
-        self.catch_flag = True
-        print("catch flag - 5s")
-        await asyncio.sleep(5)  # 5초 동안 유지
-        self.catch_flag = False
-        print("catch end")
-
-    def handle_catch_display(self, image, hand_landmarks):
-        """CATCH 상태를 처리: 오버레이와 터미널에 출력."""
-        if self.detect_catch(hand_landmarks):
-            # Catch 상태가 아니면 새로 태스크 시작
-            if not self.catch_flag:
-                asyncio.create_task(self.manage_catch_flag())
+    def process_frame(self, image, timestamp_ms=None):
+        """프레임 하나를 detect()로 처리해 (landmarks, handedness, scores)를 반환합니다. (비동기 엔진은 결과가 없으면 None)"""
+        return self.detect(image, time.time() * 1000 if timestamp_ms is None else timestamp_ms)
+
+    def detect(self, image, timestamp_ms):
+        """프레임에서 손 랜드마크 배열을 구합니다. 새 결과가 없으면 (비동기 엔진 추론 중) None을 반환합니다.
 
-            # 오버레이: CATCH 텍스트 즉시 표시
+        희소 추론 모드에서는 모델을 실행하지 않는 프레임의 랜드마크를 광류로 전파합니다.
+        """
+        with metrics.timer('pipeline_stage_seconds', model="hand", phase="preprocess"):
+            gray = self.propagator.prepare(image) if self.propagator is not None else None
+        if self.propagator is not None and not self.propagator.needs_inference():
+            with metrics.timer('pipeline_stage_seconds', model="hand", phase="propagate"):
+                landmarks = self.propagator.propagate(gray)
+            if landmarks is not None:
+                self.last_landmarks = landmarks
+                return landmarks, self.last_handedness, self.last_scores
+
+        with metrics.timer('pipeline_stage_seconds', model="hand", phase="inference"):  # 비동기 엔진은 제출/수거 시간
+            # 비동기 엔진의 결과는 이전에 제출한 프레임의 것이므로 제출 전에 먼저 수거해 그 프레임의 영상과 짝지음
+            result, result_gray = self.engine.poll(), self.pending_gray
+            if self.engine.submit(image, timestamp_ms):
+                self.pending_gray = gray
+            if result is None:
+                # 동기 엔진은 방금 제출한 프레임의 결과가 바로 나옴
+                result, result_gray = self.engine.poll(), self.pending_gray
+        if result is None:
+            return None
+
+        landmarks, handedness, scores, _ = result
+        if self.propagator is not None:
+            # 결과가 나온 프레임의 영상 기준으로 추적을 다시 시작 (다음 프레임부터 현재 위치로 전파됨)
+            self.propagator.reset(result_gray, landmarks, scores)
+        self.last_landmarks, self.last_handedness, self.last_scores = landmarks, handedness, scores
+        return landmarks, handedness, scores
+
+    def draw_hand_landmarks(self, image, landmarks):
+        """손 랜드마크 배열 (hands, 21, 3)을 이미지에 그립니다."""
+        h, w = image.shape[:2]
+        points = (landmarks[..., :2] * [w, h]).astype(int)
+        for hand_points in points:
+            for start, end in HAND_CONNECTIONS:
+                cv2.line(image, tuple(hand_points[start]), tuple(hand_points[end]), (0, 0, 255), 2)
+            for point in hand_points:
+                cv2.circle(image, tuple(point), 4, (0, 255, 0), -1)
+
+    def update_grasp(self, landmarks, handedness, timestamp):
+        """손별 트랙과 잡기 상태 머신을 갱신하고 catch 플래그를 설정합니다."""
+        gestures = self.evaluate_gestures(landmarks)
+        hints = {}
+        for hand_landmarks, label, valid, catch in zip(
+                landmarks, handedness, gestures['valid_size'], gestures['catch']):
+            if valid and label in self.tracks and label not in hints:
+                self.tracks[label].push(hand_landmarks, timestamp)
+                hints[label] = bool(catch)
+
+        for label, grasp in self.grasps.items():
+            grasp.update(self.tracks[label], timestamp, hints.get(label, False))
+
+        holding = any(grasp.holding for grasp in self.grasps.values())
+        if holding and not self.catch_flag:
+            self.catch_flag = True
+            print("catch flag - hold")
+        elif not holding and self.catch_flag:
+            self.catch_flag = False
+            print("catch end")
+        return holding
+
+    def handle_catch_display(self, image, holding):
+        """CATCH 상태를 처리: 오버레이와 터미널에 출력."""
+        if holding:
+            # 오버레이: CATCH 텍스트 표시
             cv2.putText(
                 image, "CATCH", (50, 50), cv2.FONT_HERSHEY_SIMPLEX,
                 1.0, (0, 0, 255), 2, cv2.LINE_AA
@@ -85,12 +169,19 @@ class HandDetection:
             current_time = time.time()
             if current_time - self.last_terminal_time >= 1:
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                print(f"[{now}] CATCH - Pinky TIP near MCP!")
+                print(f"[{now}] CATCH - Hand holding object!")
                 self.last_terminal_time = current_time
 
-async def run_hand_detection(shared_data):
+        # 손별 잡기 상태 표시
+        for i, (label, grasp) in enumerate(self.grasps.items()):
+            cv2.putText(
+                image, f"{label}: {grasp.state}", (50, 90 + 30 * i), cv2.FONT_HERSHEY_SIMPLEX,
+                0.6, (255, 255, 0), 1, cv2.LINE_AA
+            )
+
+async def run_hand_detection(shared_data, inference_interval=1, engine="legacy", **engine_options):
     """비동기적으로 Hand Detection 실행"""
-    hand_detection = HandDetection()
+    hand_detection = HandDetection(inference_interval=inference_interval, engine=engine, **engine_options)
 
     while shared_data['running']:
         frame = shared_data.get('frame')
@@ -98,18 +189,43 @@ async def run_hand_detection(shared_data):
             await asyncio.sleep(0)  # 이벤트 루프 양보
             continue
 
+        # 캐스케이드 스케줄러: YOLO 감지가 살아 있을 때만 실행
+        if not gate_allows(shared_data, 'hand'):
+            landmarks, handedness, _ = empty_hand_arrays()
+            hand_detection.update_grasp(landmarks, handedness, time.time())  # 손 소실로 처리해 잡기 상태 해제
+            await asyncio.sleep(0.01)
+            continue
+
         # Hand Detection 처리
+        metrics.frame_seen('hand', shared_data.get('frame_seq'))
+        origin = frame_origin(shared_data)
+        start = time.perf_counter()
         image = frame.copy()
-        results = hand_detection.process_frame(image)
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                hand_detection.draw_hand_landmarks(image, hand_landmarks)
-                hand_detection.handle_catch_display(image, hand_landmarks)
+        current_time = time.time()
+        with stage_work(shared_data, 'hand'):
+            detection = hand_detection.detect(image, current_time * 1000)
+            if detection is not None:  # 새 추론 결과가 있을 때만 잡기 상태 갱신
+                landmarks, handedness, scores = detection
+                was_catching = hand_detection.catch_flag
+                with metrics.timer('pipeline_stage_seconds', model="hand", phase="postprocess"):
+                    hand_detection.update_grasp(landmarks, handedness, current_time)
+                if hand_detection.catch_flag and not was_catching:
+                    set_flag_origin(shared_data, 'catch', origin)  # 비동기 엔진이면 실제 추론 프레임보다 약간 뒤
+                record_output(shared_data, 'hands', landmarks, handedness)
+                if len(landmarks):
+                    cascade_signal(shared_data, 'hand')  # YOLO 최대 속도로 실행
+        trace_span(shared_data, 'hand', "detect" if detection is not None else "pending", start, origin,
+                   catch=hand_detection.catch_flag)
+        render_start = time.perf_counter()
+        hand_detection.draw_hand_landmarks(image, hand_detection.last_landmarks)
+        hand_detection.handle_catch_display(image, hand_detection.catch_flag)
 
         cv2.imshow("Hand Detection", image)
+        metrics.observe('pipeline_render_seconds', time.perf_counter() - render_start, stage="hand")
         if cv2.waitKey(1) & 0xFF == ord('q'):  # 종료 키 감지
             shared_data['running'] = False
             break
         await asyncio.sleep(0)  # 이벤트 루프 양보
 
+    hand_detection.engine.close()
     cv2.destroyAllWindows()
@@ -3,19 +3,73 @@ from test_hand import *
 from test_webcam import *
 from test_detect import *
 from tts import *
+from detection_history import DetectionHistory
+from cascade import CascadeScheduler
+from motion import MotionEstimator, EgoMotionWarper
+from navigation import FreeSpaceScanner
+from occupancy import PolarOccupancyMemory
+from model_registry import select_variant
+from frame_sources import create_frame_source
+from session_recorder import SessionRecorder
+from stub_stages import Scenario, StubDetectorModel, StubSpeaker
+import metrics
+from frame_trace import Tracer
+import argparse
 import asyncio
+import time
 import cv2
 
-def initialize_components():
-    """필요한 모든 구성 요소 초기화"""
-    webcam_processor = WebcamProcessor(camera_id=0)  # 0: 일반 웹캠, 4: 리얼센스
-    shared_data = {'frame': None, 'running': True}
-    tts = TextToSpeech()
-    depth_with_tts = DepthWithTTS(tts)
-    yolo_detector = YOLODetector()
-    flag_monitor = FlagMonitor(tts)  # 플래그 모니터 초기화
+# 프레임당 지연 예산 (ms): 예산 안에서 가장 정확한 모델 변형을 기기별로 측정해 선택
+DEPTH_BUDGET_MS = 60
+DETECTION_BUDGET_MS = 40
 
-    return webcam_processor, shared_data, depth_with_tts, yolo_detector, tts, flag_monitor
+# 스텁 모드 (--stub-config)의 뎁스 변형: 가중치 없는 합성 뎁스 백엔드
+STUB_DEPTH_VARIANT = {'name': "stub", 'backend': "stub", 'path': None, 'input_size': 256}
+
+def create_depth_with_tts(tts, variant=None, threshold=0.8, clock=time.time, backend_options=None):
+    """파이프라인의 뎁스 단계 설정 (리플레이 하네스도 같은 설정 사용)"""
+    return DepthWithTTS(
+        tts, threshold=threshold, variant=variant,
+        motion_threshold=0.03, max_staleness=1.0,  # 장면 변화가 적으면 뎁스 추론 생략
+        inference_interval=2, warper=EgoMotionWarper(),  # 추론 사이 프레임은 이전 뎁스 맵 워핑
+        screen_size=128, screen_threshold=0.7,  # 저해상도 스크리닝 후 후보가 있을 때만 전체 해상도 추론
+        region='corridor',  # 보행 통로 영역만 판단 (천장/조명 제외)
+        scanner=FreeSpaceScanner(threshold=0.8),  # 가장 넓은 빈 통로 방향 안내
+        occupancy=PolarOccupancyMemory(half_life=3.0),  # 시야 밖 장애물 기억
+        clock=clock, backend_options=backend_options,
+    )
+
+def initialize_components(source="webcam", realtime=True, loop=False, camera_id=0, stub_config=None):
+    """필요한 모든 구성 요소 초기화
+
+    stub_config (stub_stages 설정 JSON 경로)를 주면 뎁스, 손, YOLO, TTS를 대본과 지연 분포를 따르는
+    스텁으로 바꿉니다. (모델 가중치와 오디오 장치 없이 오케스트레이션만 실행)
+    """
+    webcam_processor = create_frame_source(  # 웹캠, 영상 파일, 이미지 폴더, 합성 프레임
+        source, realtime=realtime, loop=loop, motion_estimator=MotionEstimator(), camera_id=camera_id  # 0: 일반 웹캠, 4: 리얼센스
+    )
+    shared_data = {'frame': None, 'running': True, 'scheduler': CascadeScheduler()}  # 캐스케이드 스케줄러 (None이면 모든 단계 상시 실행)
+    detection_history = DetectionHistory(capacity=512)  # 감지 이력 (클래스 투표용)
+    if stub_config is not None:
+        scenario = Scenario.load(stub_config)
+        tts = TextToSpeech(speak_aloud=False)
+        StubSpeaker(tts, scenario)
+        depth_with_tts = create_depth_with_tts(tts, STUB_DEPTH_VARIANT, backend_options={'scenario': scenario})
+        yolo_detector = YOLODetector(model=StubDetectorModel(scenario), history=detection_history)
+        hand_options = {'engine': "stub", 'scenario': scenario}
+    else:
+        tts = TextToSpeech()
+        depth_variant = select_variant("depth", DEPTH_BUDGET_MS)
+        detection_variant = select_variant("detection", DETECTION_BUDGET_MS)
+        depth_with_tts = create_depth_with_tts(tts, depth_variant)
+        yolo_detector = YOLODetector(
+            model_path=detection_variant['path'], imgsz=detection_variant['input_size'], history=detection_history
+        )
+        hand_options = {}
+    flag_monitor = FlagMonitor(tts, history=detection_history)  # 플래그 모니터 초기화
+    shared_data['flag_origins'] = flag_monitor.flag_origins  # 손/YOLO 단계가 플래그를 켠 프레임을 기록
+
+    return webcam_processor, shared_data, depth_with_tts, yolo_detector, tts, flag_monitor, hand_options
 
 async def cancel_all_tasks():
     """현재 실행 중인 모든 비동기 작업을 취소"""
@@ -24,9 +78,17 @@ async def cancel_all_tasks():
         task.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
 
-async def main():
+async def main(args):
     # 구성 요소 초기화
-    webcam_processor, shared_data, depth_with_tts, yolo_detector, tts, flag_monitor = initialize_components()
+    webcam_processor, shared_data, depth_with_tts, yolo_detector, tts, flag_monitor, hand_options = initialize_components(
+        args.source, realtime=not args.fast, loop=args.loop, camera_id=args.camera_id, stub_config=args.stub_config
+    )
+    if args.record:
+        # 세션 기록: 프레임, 뎁스 맵, 손 랜드마크, YOLO 감지, 판단과 TTS 이벤트
+        shared_data['recorder'] = tts.recorder = SessionRecorder(args.record)
+    if args.trace:
+        # 종단 간 추적: 프레임 캡처부터 단계 결과, 플래그 결합, 음성 출력 시작까지
+        shared_data['tracer'] = tts.tracer = Tracer()
 
     print("Starting async processes...")
 
@@ -42,9 +104,20 @@ async def main():
 
     # 개별 작업 비동기 실행
     depth_task = asyncio.create_task(depth_with_tts.run(shared_data))
-    hand_task = asyncio.create_task(run_hand_detection(shared_data))
+    hand_task = asyncio.create_task(run_hand_detection(shared_data, **hand_options))
     yolo_task = asyncio.create_task(yolo_detector.run_detection(shared_data))
 
+    # 단계별 duty cycle 보고
+    duty_report_task = None
+    if shared_data['scheduler'] is not None:
+        duty_report_task = asyncio.create_task(shared_data['scheduler'].report_loop(shared_data))
+
+    # 단계별 지연 히스토그램과 카운터: 로컬 Prometheus 엔드포인트와 주기적 요약 로그
+    metrics_server = metrics.start_metrics_server(args.metrics_port) if args.metrics_port else None
+    metrics_task = None
+    if args.metrics_interval > 0:
+        metrics_task = asyncio.create_task(metrics.report_loop(shared_data, args.metrics_interval))
+
     try:
         while shared_data['running']:
             # `q` 키가 눌렸는지 확인
@@ -59,12 +132,38 @@ async def main():
     finally:
         # 모든 작업 강제 취소
         print("Cancelling all tasks...")
+        if duty_report_task is not None:
+            duty_report_task.cancel()
         await cancel_all_tasks()
 
         # 자원 해제
         webcam_processor.release()
+        if metrics_task is not None:
+            metrics_task.cancel()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if shared_data.get('recorder') is not None:
+            print(f"Saving session ({shared_data['recorder'].pending} records pending)...")
+            shared_data['recorder'].close()
+        if shared_data.get('tracer') is not None:
+            print(shared_data['tracer'].summary())
+            print(f"Trace saved at: {shared_data['tracer'].export(args.trace)} (chrome://tracing or ui.perfetto.dev)")
         cv2.destroyAllWindows()
         print("All resources released. Exiting program.")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="보행 보조 파이프라인")
+    parser.add_argument("--source", default="webcam", help="webcam, synthetic, 영상 파일 경로 또는 이미지 폴더 경로")
+    parser.add_argument("--camera-id", type=int, default=0)
+    parser.add_argument("--fast", action="store_true", help="원본 타임스탬프 간격을 무시하고 가능한 한 빨리 공급")
+    parser.add_argument("--loop", action="store_true", help="영상/이미지 소스를 반복 재생")
+    parser.add_argument("--stub-config", help="스텁 단계 설정 JSON (stub_stages.py 참고, 보통 --source synthetic과 함께)")
+    parser.add_argument("--record", help="세션을 기록할 폴더 (session_recorder.SessionReader로 읽음)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="지표를 Prometheus 텍스트 형식으로 제공할 로컬 포트 (예: 9108, http://127.0.0.1:<포트>/metrics)")
+    parser.add_argument("--trace", help="종단 간 지연 추적을 저장할 Chrome trace / Perfetto JSON 경로")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="지표 요약 로그 주기 (초, 0이면 끔)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
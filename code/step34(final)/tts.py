@@ -1,42 +1,64 @@
-import pyttsx3
+import numpy as np
 import threading
 import cv2
 import asyncio
 import time
 from datetime import datetime  # 현재 시간 출력용
-from test_depth import setup_depth_model, process_depth_sections, display_depth_sections
+from test_depth import setup_depth_model, process_depth_sections, display_depth_sections, section_means
 import sys
 from io import StringIO
 from queue import Queue
+from cascade import gate_allows, stage_work
+from session_recorder import record_output
+import metrics
+from frame_trace import frame_origin, trace_span
 
 class TextToSpeech:
-    def __init__(self, rate=150, volume=0.9, voice_index=0):
-        """TTS 엔진 초기화 및 설정"""
-        self.engine = pyttsx3.init()
+    def __init__(self, rate=150, volume=0.9, voice_index=0, clock=time.time, speak_aloud=True):
+        """TTS 엔진 초기화 및 설정
+
+        speak_aloud가 False이면 음성 엔진과 출력 스레드 없이 큐만 채웁니다. (리플레이 하네스가 큐를 직접 소비)
+        """
         self.queue = Queue()  # TTS 메시지 관리 큐
+        self.clock = clock  # 메시지 간격 판단용 시계 (리플레이 시 가상 시계)
+        self.engine = None
+        if speak_aloud:
+            import pyttsx3  # 소리 내어 읽을 때만 필요
 
-        # 속도 및 볼륨 설정
-        self.engine.setProperty('rate', rate)
-        self.engine.setProperty('volume', volume)
+            self.engine = pyttsx3.init()
 
-        # 음성 설정
-        voices = self.engine.getProperty('voices')
-        if voice_index < len(voices):
-            self.engine.setProperty('voice', voices[voice_index].id)
-        else:
-            print("Voice index out of range. Using default voice.")
+            # 속도 및 볼륨 설정
+            self.engine.setProperty('rate', rate)
+            self.engine.setProperty('volume', volume)
+
+            # 음성 설정
+            voices = self.engine.getProperty('voices')
+            if voice_index < len(voices):
+                self.engine.setProperty('voice', voices[voice_index].id)
+            else:
+                print("Voice index out of range. Using default voice.")
+
+            # 실제 음성 출력이 시작된 시각 (캡처 -> 음성 시작 지연 측정)
+            self.engine.connect('started-utterance', self._on_utterance_started)
 
         # 상태 변수
         self.last_tts_time = 0  # 마지막 TTS 실행 시간
         self.last_avoid_time = 0  # 마지막 Avoid 메시지 큐 추가 시간
         self.is_tts_busy = False  # 현재 TTS 실행 중인지 여부
+        self.recorder = None  # 세션 기록기 (SessionRecorder, 음성 출력 이벤트 기록)
+        self.enqueued_at = {}  # 문구 -> 큐에 넣은 시각 (perf_counter, 큐 대기 시간 지표)
+        self.origins = {}  # 문구 -> 출처 (프레임 번호, 캡처 시각)
+        self.tracer = None  # 종단 간 추적기 (frame_trace.Tracer)
+        self.utterance_onset = None  # 현재 메시지의 음성 출력 시작 시각 (perf_counter)
 
         # TTS 큐 처리 스레드 시작
-        self.tts_thread = threading.Thread(target=self._process_queue, daemon=True)
-        self.tts_thread.start()
+        self.tts_thread = None
+        if self.engine is not None:
+            self.tts_thread = threading.Thread(target=self._process_queue, daemon=True)
+            self.tts_thread.start()
 
-    def speak(self, text, priority=False):
-        """주어진 텍스트를 TTS 큐에 추가"""
+    def speak(self, text, priority=False, origin=None):
+        """주어진 텍스트를 TTS 큐에 추가 (origin: 메시지를 만든 프레임의 (프레임 번호, 캡처 시각))"""
         if text is None:  # None 상태는 처리하지 않음
             return
 
@@ -44,28 +66,66 @@ class TextToSpeech:
             # 최우선 메시지는 큐를 비우고 바로 추가
             with self.queue.mutex:
                 self.queue.queue.clear()  # 기존 메시지 제거
-            self.queue.put(text)  # 최우선 메시지 추가
+                self.enqueued_at.clear()
+                self.origins.clear()
+            self.enqueue(text, origin)  # 최우선 메시지 추가
         else:
             # Avoid 메시지는 5초에 한 번만 추가
             if "Avoid" in text:
-                current_time = time.time()
+                current_time = self.clock()
                 if current_time - self.last_avoid_time < 5:
                     return  # 5초 이내에는 메시지 추가 안 함
                 self.last_avoid_time = current_time
 
             # 일반 메시지는 큐에 중복되지 않게 추가
+            # (이미 있으면 먼저 넣은 메시지의 출처 유지)
             if text not in self.queue.queue:
-                self.queue.put(text)
+                self.enqueue(text, origin)
+
+    def enqueue(self, text, origin):
+        """큐에 넣은 시각과 출처를 남기고 메시지를 추가합니다."""
+        self.enqueued_at[text] = time.perf_counter()
+        if origin is not None:
+            self.origins[text] = origin
+        self.queue.put(text)
+
+    def mark_dequeued(self, text):
+        """큐에서 꺼낸 메시지의 큐 대기 시간을 기록하고 출처를 반환합니다. (발화 직전 호출)"""
+        now = time.perf_counter()
+        enqueued = self.enqueued_at.pop(text, None)
+        origin = self.origins.pop(text, None)
+        if enqueued is not None:
+            metrics.observe('pipeline_tts_queue_wait_seconds', now - enqueued)
+            if self.tracer is not None:
+                self.tracer.span('tts', "queue", enqueued, now, origin, text=text)
+        return origin
+
+    def mark_spoken(self, text, origin, onset, end):
+        """발화가 끝난 메시지의 캡처 -> 음성 시작 지연을 추적기에 기록합니다."""
+        if self.tracer is not None and origin is not None:
+            self.tracer.announcement(text, origin, onset, end)
+
+    def _on_utterance_started(self, name):
+        self.utterance_onset = time.perf_counter()
 
     def _process_queue(self):
         """큐에서 메시지를 꺼내 순차적으로 음성 출력"""
         while True:
             text = self.queue.get()  # 메시지 가져오기
+            origin = self.mark_dequeued(text)
             self.is_tts_busy = True
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             print(f"[{now}] TTS Output: {text}")  # 터미널 출력
+            if self.recorder is not None:
+                self.recorder.record('event', None, 'tts', text)
+            self.utterance_onset = None
+            start = time.perf_counter()
             self.engine.say(text)
             self.engine.runAndWait()
+            end = time.perf_counter()
+            onset = self.utterance_onset or start  # 콜백을 지원하지 않는 드라이버는 say 호출 시각
+            metrics.observe('pipeline_tts_speech_seconds', end - onset)
+            self.mark_spoken(text, origin, onset, end)
             self.is_tts_busy = False
             time.sleep(0.5)  # 메시지 간 간격 추가
 
@@ -74,26 +134,35 @@ import asyncio
 from datetime import datetime
 
 class FlagMonitor:
-    def __init__(self, tts):
+    def __init__(self, tts, history=None, vote_window_ms=1500, redirect_stdout=True):
         self.catch_flag = False  # Catch 플래그 상태
         self.detect_flag = False  # Detect 플래그 상태
         self.previous_combined_state = False  # 이전 결합 상태
         self.tts = tts  # TTS 인스턴스
         self.last_detected_class = None  # 마지막 감지된 클래스 이름
+        self.history = history  # 감지 이력 (DetectionHistory, 클래스 투표용)
+        self.vote_window_ms = vote_window_ms  # 클래스 투표 구간 (ms)
         self.is_priority_tts_active = False  # 최우선 TTS 활성화 상태
+        self.flag_raised_at = {}  # 플래그 -> 출력으로 켜진 시각 (perf_counter, 결합 지연 지표)
+        self.flag_origins = {}  # 'catch'/'detect' -> 플래그를 켠 프레임의 출처 (각 단계가 shared_data['flag_origins']로 기록)
         self.original_stdout = sys.stdout  # 원래 stdout 저장
-        sys.stdout = self  # stdout 리다이렉트
+        if redirect_stdout:  # False이면 플래그를 직접 설정 (리플레이 하네스)
+            sys.stdout = self  # stdout 리다이렉트
 
     def write(self, text):
         """터미널 출력 감지 및 플래그 상태 업데이트"""
         # Catch 플래그 상태 업데이트
-        if "catch flag - 5s" in text:
+        if "catch flag" in text:
+            if not self.catch_flag:
+                self.flag_raised_at['catch'] = time.perf_counter()
             self.catch_flag = True
         elif "catch end" in text:
             self.catch_flag = False
 
         # Detect 플래그 상태 업데이트
         if "class detect flag - 5s" in text:
+            if not self.detect_flag:
+                self.flag_raised_at['detect'] = time.perf_counter()
             self.detect_flag = True
         elif "class flag end" in text:
             self.detect_flag = False
@@ -112,71 +181,336 @@ class FlagMonitor:
         """flush 호출을 위한 메서드 (stdout 요구사항)"""
         self.original_stdout.flush()
 
+    def voted_class(self, now=None):
+        """최근 감지 이력에서 신뢰도 가중 투표로 고른 클래스 이름 (이력이 없으면 마지막 출력 클래스)"""
+        if self.history is not None:
+            class_name = self.history.dominant_class_name(self.vote_window_ms, now)
+            if class_name:
+                return class_name
+        return self.last_detected_class
+
+    def update(self, now=None):
+        """플래그 상태를 한 번 확인하고 (둘 다 True가 된 순간 TTS 출력) 안내 문구를 반환합니다. (없으면 None)"""
+        # 현재 상태 결합
+        current_combined_state = (self.catch_flag and self.detect_flag)
+        tts_message = None
+
+        # 둘 다 True일 때만 처리
+        if current_combined_state and not self.previous_combined_state:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] Both Catch and Detect Flags are True!")
+            if len(self.flag_raised_at) == 2:  # 두 플래그가 모두 출력으로 켜졌을 때만 (직접 설정 시 제외)
+                metrics.observe('pipeline_fusion_seconds', time.perf_counter() - max(self.flag_raised_at.values()))
+
+            # TTS로 '[class name] catch' 출력 (최우선순위)
+            # 안내의 출처: 두 플래그 중 나중에 캡처된 프레임 (결합 조건을 완성한 프레임)
+            origins = [self.flag_origins.get(flag) for flag in ('catch', 'detect')]
+            origin = max(origins, key=lambda o: o[1]) if None not in origins else None
+            if self.tts.tracer is not None:
+                self.tts.tracer.instant('fusion', "catch+detect", time.perf_counter(), origin,
+                                        catch_frame=origins[0] and origins[0][0], detect_frame=origins[1] and origins[1][0])
+
+            class_name = self.voted_class(now)
+            if class_name and not self.tts.is_tts_busy:
+                tts_message = f"{class_name} catch"
+                self.tts.speak(tts_message, origin=origin)
+
+        # 상태가 False로 유지되거나 다시 False로 변경된 경우
+        self.previous_combined_state = current_combined_state
+        return tts_message
+
     async def monitor_flags(self):
         """플래그 상태를 지속적으로 모니터링 (둘 다 True일 때 TTS 출력)"""
         while True:
-            # 현재 상태 결합
-            current_combined_state = (self.catch_flag and self.detect_flag)
-
-            # 둘 다 True일 때만 처리
-            if current_combined_state and not self.previous_combined_state:
-                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                print(f"[{now}] Both Catch and Detect Flags are True!")
-
-                # TTS로 '[class name] catch' 출력 (최우선순위)
-                if self.last_detected_class and not self.tts.is_tts_busy:
-                    tts_message = f"{self.last_detected_class} catch"
-                    self.tts.speak(tts_message)
-
-            # 상태가 False로 유지되거나 다시 False로 변경된 경우
-            self.previous_combined_state = current_combined_state
-
+            self.update()
             await asyncio.sleep(0.1)  # 0.1초마다 상태 확인
 
 class DepthWithTTS:
-    def __init__(self, tts):
+    def __init__(self, tts, threshold=0.8, motion_threshold=None, max_staleness=1.0,
+                 inference_interval=1, warper=None, screen_size=None, screen_threshold=0.7, region='full',
+                 scanner=None, occupancy=None, backend="openvino", variant=None, clock=time.time,
+                 backend_options=None, fine_grid=None):
         """Depth 모델과 TTS를 결합한 클래스"""
-        self.depth_processor = setup_depth_model()
+        # 뎁스 백엔드: openvino, onnxruntime, opencv (variant: model_registry 항목이면 그 설정 사용)
+        backend_options = backend_options or {}  # 백엔드 추가 인자 (예: stub 백엔드의 scenario)
+        self.depth_processor = setup_depth_model(backend=backend, variant=variant, **backend_options)
         self.tts = tts
+        self.clock = clock  # 추론 간격과 점유 메모리 감쇠용 시계 (리플레이 시 가상 시계)
+        self.threshold = threshold  # 장애물 판정 뎁스 임계값
+        self.region = region  # 뎁스 판단 영역 프로파일 (DEPTH_REGIONS: 'full', 'corridor')
+        self.scanner = scanner  # 열 단위 빈 통로 스캐너 (FreeSpaceScanner, 조향 각도 안내)
+        self.last_steering = None
+
+        # 방위각 점유 메모리 (PolarOccupancyMemory): 시야 밖으로 나간 장애물을 기억해 회피 방향 검증
+        self.occupancy = occupancy
+        self.head_yaw = 0.0  # 최근 프레임의 누적 머리 회전 각도 (MotionEstimator)
+
+        # 움직임 적응형 추론: 마지막 추론 이후 누적 움직임이 motion_threshold 미만이면 추론을 생략하고
+        # 직전 판단을 재사용 (None이면 매 프레임 추론). 단, max_staleness초 이상 생략하지 않음
+        self.motion_threshold = motion_threshold
+        self.max_staleness = max_staleness
+        self.last_inference_time = 0.0
+        self.last_motion_accum = 0.0
+        self.last_decision = None
+        self.last_frame = None
+        self.decision_origin = None  # 직전 판단을 만든 프레임의 출처 (추론 생략 시 재사용)
+
+        # 뎁스 추론은 inference_interval 프레임마다 실행하고, 사이 프레임은 자기 움직임으로
+        # 직전 뎁스 맵을 워핑해 섹션 판단을 다시 계산 (warper: EgoMotionWarper, None이면 직전 판단 재사용)
+        self.inference_interval = inference_interval
+        self.warper = warper
+        self.frames_since_inference = 0
+        self.last_depth_map = None
+
+        # 2단계 분석: 저해상도(screen_size) 스크리닝 결과에 screen_threshold 이상 섹션이 있을 때만
+        # 전체 해상도 추론과 섹션 분석 실행 (screen_size가 None이면 항상 전체 해상도)
+        self.screen_processor = (
+            setup_depth_model(input_size=screen_size, backend=backend, variant=variant, **backend_options)
+            if screen_size else None
+        )
+        self.screen_threshold = screen_threshold
+        # 전체 해상도 판단의 섹션 격자 (행, 열): 스크리닝 (5x5)보다 촘촘하게 나눠 좁은 장애물도 판단하고,
+        # 좌우 절반의 가중 합으로 회피 방향에 대응 (기본: 스크리닝을 쓰면 10x10, 아니면 5x5)
+        self.fine_grid = tuple(fine_grid or ((10, 10) if screen_size else (5, 5)))
+        self.screen_count = 0  # 스크리닝 횟수
+        self.fine_count = 0  # 전체 해상도 추론 횟수
+        self.screen_seconds = 0.0  # 스크리닝 누적 시간
+        self.fine_latency = None  # 전체 해상도 추론 지연 (지수 이동 평균, 초)
+
+        # duty cycle 통계
+        self.inference_count = 0
+        self.skip_count = 0
+        self.last_report_time = self.clock()
+
+    def should_infer(self, shared_data):
+        """장면 변화량과 경과 시간으로 이번 프레임의 뎁스 추론 여부를 결정합니다."""
+        if self.clock() - self.last_inference_time >= self.max_staleness:
+            return True
+        if self.frames_since_inference + 1 < self.inference_interval:
+            return False
+        return not self.scene_static(shared_data)
+
+    def scene_static(self, shared_data):
+        """마지막 추론 이후 누적 움직임이 motion_threshold 미만 (정지 장면)인지 확인합니다."""
+        motion_accum = shared_data.get('motion_accum')
+        if self.motion_threshold is None or motion_accum is None:
+            return False
+        return motion_accum - self.last_motion_accum < self.motion_threshold
+
+    def screen(self, frame):
+        """저해상도 스크리닝: 가까운 후보 영역이 없으면 (None, depth_map, depth_frame), 있으면 None을 반환합니다."""
+        start = time.perf_counter()
+        screen_result = self.screen_processor.process_frame(frame)
+        screen_map = self.screen_processor.normalize_minmax(screen_result.squeeze(0))
+        candidate = process_depth_sections(screen_map, num_rows=5, num_cols=5, threshold=self.screen_threshold, region=self.region)
+        self.screen_seconds += time.perf_counter() - start
+        self.screen_count += 1
+        if candidate is not None:
+            return None
+        return None, screen_map, self.screen_processor.visualize_result(screen_result)
+
+    def infer(self, frame):
+        """뎁스 추론 후 (decision, depth_map, depth_frame)을 반환합니다."""
+        if self.screen_processor is not None:
+            screened = self.screen(frame)
+            if screened is not None:  # 후보 영역 없음: 전체 해상도 추론 생략
+                self.last_steering = None
+                self.remember(screened[1])
+                return screened
+            self.fine_count += 1
+
+        # OpenVINO 뎁스 모델 처리
+        start = time.perf_counter()
+        depth_result = self.depth_processor.process_frame(frame)
+        postprocess_start = time.perf_counter()
+        depth_map = (depth_result.squeeze(0) - depth_result.min()) / (depth_result.max() - depth_result.min())
+        depth_frame = self.depth_processor.visualize_result(depth_result)
+
+        # 깊이 섹션 분석
+        decision = self.decide(depth_map)
+        elapsed = time.perf_counter() - start
+        metrics.observe('pipeline_stage_seconds', elapsed - (postprocess_start - start),
+                        model=self.depth_processor.model_label, phase="postprocess")
+        self.fine_latency = elapsed if self.fine_latency is None else 0.9 * self.fine_latency + 0.1 * elapsed
+        return decision, depth_map, depth_frame
+
+    def decide(self, depth_map):
+        """섹션 분석으로 회피 방향을 결정하고, 스캐너가 있으면 열린 통로의 조향 각도를 덧붙입니다."""
+        steering = self.scanner.scan(depth_map) if self.scanner is not None else None
+        self.last_steering = steering
+
+        # 좌우 동점이면 무작위 대신 열린 통로 쪽으로 결정
+        tie_break = None
+        angle = None
+        if steering is not None:
+            tie_break = "Avoid to Left" if steering.angle < 0 else "Avoid to Right"
+            angle = int(round(steering.angle / 10.0)) * 10  # 10도 단위 안내
+        decision = process_depth_sections(
+            depth_map, num_rows=self.fine_grid[0], num_cols=self.fine_grid[1], threshold=self.threshold,
+            region=self.region, tie_break=tie_break
+        )
+
+        # 열린 통로가 한쪽에 있으면 회피 방향도 통로 쪽으로 (섹션 투표와 조향 각도가 서로 어긋난 안내 방지)
+        if decision and angle:
+            decision = tie_break
+
+        if self.occupancy is not None:
+            self.remember(depth_map)
+            decision = self.check_with_memory(decision)
+
+        if decision and angle is not None:
+            if angle == 0:
+                decision = f"{decision}, path ahead"
+            elif (angle < 0) == decision.startswith("Avoid to Left"):
+                decision = f"{decision}, path {abs(angle)} degrees {'left' if angle < 0 else 'right'}"
+            # 점유 메모리가 방향을 바꿔 각도와 어긋나면 각도 안내 생략
+        return decision
+
+    def remember(self, depth_map):
+        """섹션 평균의 열별 최댓값을 현재 머리 방향 기준으로 점유 메모리에 기록합니다."""
+        if self.occupancy is None:
+            return
+        means, cell_weights = section_means(depth_map, num_rows=5, num_cols=5, region=self.region)
+        column_occupancy = np.where(cell_weights > 0, means, 0.0).max(axis=0)
+        self.occupancy.update(column_occupancy, self.head_yaw, self.clock())
+
+    def check_with_memory(self, decision):
+        """회피하려는 쪽이 기억상 막혀 있고 반대쪽이 비어 있으면 반대쪽으로 바꿉니다."""
+        if not decision:
+            return decision
+        side, other = ('left', 'right') if decision.startswith("Avoid to Left") else ('right', 'left')
+        now = self.clock()
+        if (not self.occupancy.is_safe(side, self.head_yaw, self.threshold, now=now)
+                and self.occupancy.is_safe(other, self.head_yaw, self.threshold, now=now)):
+            return f"Avoid to {other.capitalize()}"
+        return decision
+
+    def estimate_between(self, frame):
+        """추론 사이 프레임: 직전 뎁스 맵을 현재 시점으로 워핑해 (decision, depth_map, depth_frame)을 반환합니다."""
+        if self.warper is None or self.last_depth_map is None:
+            return None
+        affine = self.warper.estimate(frame)
+        if affine is None:
+            return None
+
+        depth_map = self.warper.warp_depth(self.last_depth_map, affine)
+        depth_frame = self.depth_processor.convert_result_to_image(depth_map[None])
+        decision = self.decide(depth_map)
+        return decision, depth_map, depth_frame
+
+    def render(self, depth_frame, depth_map, decision):
+        """섹션과 판단 결과가 표시된 뎁스 이미지를 만듭니다."""
+        depth_frame_with_sections = display_depth_sections(
+            depth_frame.copy(), depth_map, num_rows=5, num_cols=5, output_width=1280, output_height=720
+        )
+
+        # 텍스트 출력
+        if decision:
+            cv2.putText(
+                depth_frame_with_sections,
+                decision,
+                (50, 50),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1.0, (0, 0, 255), 2, cv2.LINE_AA
+            )
+
+        # 빈 통로 경계와 조향 각도 표시
+        steering = self.last_steering
+        if steering is not None:
+            h, w = depth_frame_with_sections.shape[:2]
+            for x in (int(steering.start * w), int(steering.end * w) - 1):
+                cv2.line(depth_frame_with_sections, (x, 0), (x, h), (255, 0, 255), 2)
+            cv2.putText(
+                depth_frame_with_sections,
+                f"Steer {steering.angle:+.0f} deg, clearance {steering.clearance:.2f}",
+                (50, 90),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.8, (255, 0, 255), 2, cv2.LINE_AA
+            )
+        return depth_frame_with_sections
+
+    def report_duty(self, interval=10):
+        """뎁스 추론 비율을 주기적으로 출력합니다."""
+        current_time = self.clock()
+        total = self.inference_count + self.skip_count
+        if current_time - self.last_report_time < interval or total == 0:
+            return
+        print(f"Depth duty: {self.inference_count / total * 100:.0f}% "
+              f"({self.inference_count} inferred / {total} frames)")
+        if self.screen_count and self.fine_latency is not None:
+            # 절약 시간 = 생략한 전체 해상도 추론 시간 - 스크리닝에 쓴 시간
+            saved = (self.screen_count - self.fine_count) * self.fine_latency - self.screen_seconds
+            print(f"Depth two-tier: fine path {self.fine_count / self.screen_count * 100:.0f}% "
+                  f"({self.fine_count}/{self.screen_count}), saved {saved * 1000:.0f} ms")
+        self.inference_count = self.skip_count = 0
+        self.screen_count = self.fine_count = 0
+        self.screen_seconds = 0.0
+        self.last_report_time = current_time
+
+    def step(self, frame, shared_data):
+        """프레임 하나의 회피 판단을 갱신하고 TTS로 출력합니다. (판단, 화면에 표시할 이미지 또는 None)을 반환"""
+        self.last_frame = frame
+        self.head_yaw = shared_data.get('head_yaw', 0.0)
+        origin = frame_origin(shared_data)
+        start = time.perf_counter()
+        view = None
+        if self.should_infer(shared_data):
+            span = "infer"
+            self.last_inference_time = self.clock()
+            self.last_motion_accum = shared_data.get('motion_accum', 0.0)
+            decision, depth_map, depth_frame = self.infer(frame)
+            record_output(shared_data, 'depth', depth_map)
+            self.last_decision = decision
+            self.decision_origin = origin
+            self.last_depth_map = depth_map
+            self.frames_since_inference = 0
+            if self.warper is not None:
+                self.warper.set_keyframe(frame)
+            self.inference_count += 1
+            with metrics.timer('pipeline_render_seconds', stage="depth"):
+                view = self.render(depth_frame, depth_map, decision)
+        else:
+            self.frames_since_inference += 1
+            self.skip_count += 1
+            # 정지 장면이면 워핑해도 직전 뎁스 맵과 같으므로 광류, 워핑, 렌더링을 모두 생략
+            estimate = None if self.scene_static(shared_data) else self.estimate_between(frame)
+            if estimate is not None:
+                # 워핑한 뎁스 맵으로 섹션 판단 재계산
+                span = "warp"
+                decision, depth_map, depth_frame = estimate
+                view = self.render(depth_frame, depth_map, decision)
+            else:
+                # 정지 장면이거나 워핑할 수 없으면 직전 판단과 화면 재사용 (출처도 직전 판단의 프레임)
+                span = "reuse"
+                decision = self.last_decision
+                origin = self.decision_origin
+        trace_span(shared_data, 'depth', span, start, frame_origin(shared_data), decision=decision)
+
+        # TTS로 결과 출력
+        if decision:
+            record_output(shared_data, 'event', 'decision', decision)
+            self.tts.speak(decision, origin=origin)
+        self.report_duty()
+        return decision, view
 
     async def run(self, shared_data):
         """비동기적으로 뎁스 모델을 실행하고 결과를 TTS로 출력"""
         while shared_data['running']:
             frame = shared_data['frame']
-            if frame is None:
-                await asyncio.sleep(0)  # 이벤트 루프 양보
+            if frame is None or frame is self.last_frame:
+                await asyncio.sleep(0)  # 이벤트 루프 양보 (새 프레임 대기)
+                continue
+
+            if not gate_allows(shared_data, 'depth'):
+                await asyncio.sleep(0.01)
                 continue
 
             try:
-                # OpenVINO 뎁스 모델 처리
-                depth_result = self.depth_processor.process_frame(frame)
-                depth_map = (depth_result.squeeze(0) - depth_result.min()) / (depth_result.max() - depth_result.min())
-                depth_frame = self.depth_processor.visualize_result(depth_result)
-
-                # 깊이 섹션 분석
-                decision = process_depth_sections(depth_map, num_rows=5, num_cols=5, threshold=0.8)
-
-                # TTS로 결과 출력
-                if decision:
-                    self.tts.speak(decision)
-
-                # 섹션이 표시된 뎁스 이미지
-                depth_frame_with_sections = display_depth_sections(
-                    depth_frame.copy(), depth_map, num_rows=5, num_cols=5, output_width=1280, output_height=720
-                )
-
-                # 텍스트 출력
-                if decision:
-                    cv2.putText(
-                        depth_frame_with_sections,
-                        decision,
-                        (50, 50),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        1.0, (0, 0, 255), 2, cv2.LINE_AA
-                    )
-
-                # 화면 출력
-                cv2.imshow("Depth Estimation", depth_frame_with_sections)
+                metrics.frame_seen('depth', shared_data.get('frame_seq'))
+                with stage_work(shared_data, 'depth'):
+                    _, view = self.step(frame, shared_data)
+                if view is not None:  # None이면 직전 화면을 그대로 둠
+                    cv2.imshow("Depth Estimation", view)  # 화면 출력
 
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     shared_data['running'] = False